@@ -189,12 +189,9 @@ class MCPResources:
             academic_year = AcademicYear.get_current_academic_year()
             
             try:
-                # Get semester for the course
-                from directory.models import Semester
-                semester = Semester.objects.filter(
-                    academic_year=academic_year,
-                    semester_type=course.semester
-                ).first()
+                # Get semester for the course (the active year's come from the calendar snapshot)
+                from directory.academic_calendar import get_semester
+                semester = get_semester(academic_year, course.semester)
                 
                 if not semester:
                     return {
@@ -293,12 +290,9 @@ class MCPResources:
             academic_year = AcademicYear.get_current_academic_year()
             
             try:
-                # Get semester for the course
-                from directory.models import Semester
-                semester = Semester.objects.filter(
-                    academic_year=academic_year,
-                    semester_type=course.semester
-                ).first()
+                # Get semester for the course (the active year's come from the calendar snapshot)
+                from directory.academic_calendar import get_semester
+                semester = get_semester(academic_year, course.semester)
                 
                 if not semester:
                     return {
@@ -14,6 +14,7 @@ from datetime import datetime
 from .models import ChatConversation, ChatMessage, Concept, ConceptMastery, CourseConcept, AgentInteraction
 from course_api.models import Course, CourseMaterial, CourseContent
 from course_content.models import CourseOutline
+from search.engine import search
 from directory.models import User
 import json
 
@@ -47,7 +48,7 @@ class MCPTools:
             },
             {
                 "name": "search_course_materials",
-                "description": "Search for course materials by keywords in title, description, or content",
+                "description": "Full-text search of a course's materials, past papers, outlines, assignments and announcements, ranked by relevance with highlighted matches",
                 "inputSchema": {
                     "type": "object",
                     "properties": {
@@ -247,31 +248,30 @@ class MCPTools:
     
     @staticmethod
     def search_course_materials(course_id: int, query: str, material_type: str = None, limit: int = 10) -> Dict[str, Any]:
-        """Search for course materials by keywords."""
+        """Search a course's published content with the shared full-text index."""
         try:
             course = Course.objects.get(id=course_id)
-            materials = CourseMaterial.objects.filter(
-                course=course,
-                title__icontains=query
-            ) | CourseMaterial.objects.filter(
-                course=course,
-                description__icontains=query
+            # Study group uploads are private to their members, so only course-wide content is searched
+            results = search(
+                query,
+                course_ids=[course.id],
+                group_ids=[],
+                material_type=material_type,
+                limit=limit,
             )
             
-            if material_type:
-                materials = materials.filter(material_type=material_type)
-            
-            materials = materials.distinct()[:limit]
-            
             materials_list = [
                 {
-                    "id": m.id,
-                    "title": m.title,
-                    "description": m.description,
-                    "material_type": m.material_type,
-                    "file_url": m.file_url
+                    "id": r["id"],
+                    "kind": r["kind"],
+                    "title": r["title"],
+                    "description": r["description"],
+                    "material_type": r["material_type"],
+                    "file_url": r["url"],
+                    "highlight": r["highlight"],
+                    "score": r["score"]
                 }
-                for m in materials
+                for r in results
             ]
             
             AgentInteraction.objects.create(
@@ -312,12 +312,9 @@ class MCPTools:
             academic_year = AcademicYear.get_current_academic_year()
             
             try:
-                # Get semester for the course
-                from directory.models import Semester
-                semester = Semester.objects.filter(
-                    academic_year=academic_year,
-                    semester_type=course.semester
-                ).first()
+                # Get semester for the course (the active year's come from the calendar snapshot)
+                from directory.academic_calendar import get_semester
+                semester = get_semester(academic_year, course.semester)
                 
                 if not semester:
                     return {"success": False, "error": "Semester not found for this course"}
@@ -362,12 +359,9 @@ class MCPTools:
             academic_year = AcademicYear.get_current_academic_year()
             
             try:
-                # Get semester for the course
-                from directory.models import Semester
-                semester = Semester.objects.filter(
-                    academic_year=academic_year,
-                    semester_type=course.semester
-                ).first()
+                # Get semester for the course (the active year's come from the calendar snapshot)
+                from directory.academic_calendar import get_semester
+                semester = get_semester(academic_year, course.semester)
                 
                 if not semester:
                     return {"success": False, "error": "Semester not found for this course"}
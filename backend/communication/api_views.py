@@ -46,38 +46,13 @@ class AnnouncementListCreateView(generics.ListCreateAPIView):
         """Create a new announcement"""
         announcement = serializer.save(sender=self.request.user)
         
-        # Send email notifications to all students in the class
+        # Email all students in the class in the background
         self._send_announcement_notifications(announcement)
     
     def _send_announcement_notifications(self, announcement):
-        """Send email notifications for new announcement"""
-        try:
-            from course_api.email_service import send_announcement_notification_email
-            from django.contrib.auth import get_user_model
-            
-            User = get_user_model()
-            
-            # Get all students in the class
-            students = User.objects.filter(
-                user_type='student',
-                student_class=announcement.student_class,
-                is_active=True
-            ).exclude(id=announcement.sender.id)  # Don't send to the sender
-            
-            # Send emails in background (you might want to use Celery for this)
-            for student in students:
-                try:
-                    send_announcement_notification_email(student, announcement)
-                except Exception as e:
-                    # Log error but continue with other students
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"Failed to send announcement email to {student.email}: {str(e)}")
-                    
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to send announcement notifications: {str(e)}")
+        """Queue email notifications for a new announcement; the run_jobs worker sends them"""
+        from course_api.job_queue import enqueue
+        enqueue('announcement_fanout', {'announcement_id': announcement.id})
 
 
 class AnnouncementDetailView(generics.RetrieveUpdateDestroyAPIView):
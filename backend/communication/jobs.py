@@ -0,0 +1,63 @@
+"""
+Background jobs for communication.
+
+Posting an announcement enqueues one ``announcement_fanout`` job. The worker
+resolves the recipients and hands them off as ``announcement_email_batch``
+jobs of ``EMAIL_BATCH_SIZE`` users each, which render the email and store it
+in the email outbox for ``drain_email_outbox`` to deliver.
+"""
+import logging
+
+from course_api.job_queue import enqueue_many, job_handler
+
+logger = logging.getLogger(__name__)
+
+EMAIL_BATCH_SIZE = 50
+
+
+@job_handler('announcement_fanout')
+def fan_out_announcement(job):
+    """Split an announcement's recipients into email batch jobs"""
+    from django.contrib.auth import get_user_model
+    from .models import Announcement
+
+    User = get_user_model()
+    announcement = Announcement.objects.filter(pk=job.payload['announcement_id']).first()
+    if announcement is None:
+        # Deleted before the worker got to it; nothing to send
+        return
+
+    recipient_ids = list(User.objects.filter(
+        user_type='student',
+        student_class_id=announcement.student_class_id,
+        is_active=True
+    ).exclude(id=announcement.sender_id).order_by('id').values_list('id', flat=True))
+
+    enqueue_many('announcement_email_batch', [
+        {'announcement_id': announcement.pk, 'user_ids': recipient_ids[i:i + EMAIL_BATCH_SIZE]}
+        for i in range(0, len(recipient_ids), EMAIL_BATCH_SIZE)
+    ], parent=job)
+    job.payload['recipients'] = len(recipient_ids)
+
+
+@job_handler('announcement_email_batch')
+def send_announcement_email_batch(job):
+    """Queue one batch of recipients in the email outbox; a retry only covers the ones that failed"""
+    from django.contrib.auth import get_user_model
+    from course_api.email_service import send_announcement_notification_emails
+    from .models import Announcement
+
+    User = get_user_model()
+    announcement = Announcement.objects.select_related(
+        'sender', 'student_class'
+    ).filter(pk=job.payload['announcement_id']).first()
+    if announcement is None:
+        return
+
+    users = User.objects.filter(id__in=job.payload['user_ids'], is_active=True)
+    results = send_announcement_notification_emails(users, announcement)
+    failed = [user_id for user_id, sent in results.items() if not sent]
+
+    if failed:
+        job.payload['user_ids'] = failed
+        raise RuntimeError(f"{len(failed)} announcement email(s) could not be queued")
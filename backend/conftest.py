@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fresh_academic_calendar():
+    """Test transactions are rolled back without signals, so start each test with no calendar snapshot"""
+    from directory.academic_calendar import reset_academic_calendar
+    reset_academic_calendar()
+    yield
+
+
+@pytest.fixture(autouse=True, scope='session')
+def job_handlers():
+    """Register every app's job handlers the way the run_jobs worker does"""
+    from course_api.job_queue import autodiscover
+    autodiscover()
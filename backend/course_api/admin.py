@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Course, TimetableEntry, CourseMaterial, Recording, Meeting
+from .models import Course, TimetableEntry, CourseMaterial, Recording, Meeting, BackgroundJob, EmailOutbox
 
 
 @admin.register(Course)
@@ -43,4 +43,43 @@ class MeetingAdmin(admin.ModelAdmin):
     list_display = ('title', 'course', 'scheduled_time', 'created_by', 'created_at')
     list_filter = ('course', 'scheduled_time', 'created_at')
     search_fields = ('title', 'description')
-    ordering = ('scheduled_time',)
\ No newline at end of file
+    ordering = ('scheduled_time',)
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    """Background job admin"""
+    list_display = ('kind', 'status', 'attempts', 'max_attempts', 'run_at', 'finished_at', 'created_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('locked_at', 'locked_by', 'last_error', 'created_at', 'updated_at', 'finished_at')
+    ordering = ('-created_at',)
+    actions = ['requeue_jobs']
+
+    @admin.action(description='Requeue selected jobs')
+    def requeue_jobs(self, request, queryset):
+        from .job_queue import requeue
+        self.message_user(request, f"Requeued {requeue(queryset)} job(s)")
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    """Email outbox admin"""
+    list_display = ('to_email', 'category', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'category')
+    search_fields = ('to_email', 'subject', 'idempotency_key')
+    # Bodies may contain live verification and reset links: never shown, never editable
+    exclude = ('text_body', 'html_body')
+    readonly_fields = (
+        'idempotency_key', 'category', 'user', 'to_email', 'subject', 'status', 'attempts', 'max_attempts',
+        'next_attempt_at', 'locked_at', 'last_error', 'sent_at', 'created_at', 'updated_at',
+    )
+    ordering = ('-created_at',)
+    actions = ['requeue_emails']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected dead emails')
+    def requeue_emails(self, request, queryset):
+        from .email_outbox import requeue
+        self.message_user(request, f"Requeued {requeue(queryset)} dead email(s)")
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CourseApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'course_api'
+
+    def ready(self):
+        import course_api.signals  # noqa F401
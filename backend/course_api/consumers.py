@@ -1,17 +1,42 @@
+import asyncio
 import json
 import logging
+from asgiref.sync import async_to_sync
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from collections import defaultdict
+from channels.layers import get_channel_layer
 from .models import StudyGroup, StudyGroupMembership, GroupMessage
-
-# Simple in-memory presence map per room. For multi-instance, migrate to Redis.
-ROOM_ONLINE_USERS = defaultdict(set)  # room_name -> set of (user_id, user_name)
+from .presence import get_presence_backend
+from .typing_indicators import get_typing_aggregator
 
 
 logger = logging.getLogger(__name__)
 
 
+def _profile_picture_url(user):
+    # Relative media URL; the frontend proxy resolves it in local development
+    return user.profile_picture.url if user.profile_picture else None
+
+
+def member_group_name(group_id, user_id):
+    """Channel layer group holding every socket one user has open in one study group"""
+    return f'study_group_{group_id}_user_{user_id}'
+
+
+def evict_member(group_id, user_id):
+    """Close a former member's open sockets for a study group"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(
+            member_group_name(group_id, user_id),
+            {'type': 'membership_revoked', 'group_id': int(group_id)}
+        )
+    except Exception:
+        logger.exception("Failed to evict member sockets: group=%s user=%s", group_id, user_id)
+
+
 class StudyGroupChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.group_id = self.scope['url_route']['kwargs']['group_id']
@@ -31,9 +56,9 @@ class StudyGroupChatConsumer(AsyncWebsocketConsumer):
             # Best-effort logging only
             pass
 
-        # Check if user is a member
-        is_member = await self.check_membership()
-        if not is_member:
+        # Resolve membership and display name once for the lifetime of the socket
+        self.is_member, self.user_display = await self._load_connection_state()
+        if not self.is_member:
             logger.warning(
                 "WS connect denied: non-member or unauthenticated. group=%s user=%s",
                 self.group_id,
@@ -42,11 +67,16 @@ class StudyGroupChatConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
-        # Join room group
+        # Join room group, plus a per-member group used to evict this user
+        self.member_group_name = member_group_name(self.group_id, self.user.id)
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
+        await self.channel_layer.group_add(
+            self.member_group_name,
+            self.channel_name
+        )
         await self.accept()
         logger.info(
             "WS connected: group=%s user=%s channel=%s",
@@ -57,9 +87,8 @@ class StudyGroupChatConsumer(AsyncWebsocketConsumer):
 
         # Identify current user to the client
         try:
-            user_display = await self._get_user_display()
-            user_data = {'id': int(self.user.id), 'name': user_display}
-            logger.info(f"Whoami event - Sending user identity: user_id={user_data['id']}, name={user_data['name']}")
+            user_data = {'id': int(self.user.id), 'name': self.user_display}
+            logger.debug(f"Whoami event - Sending user identity: user_id={user_data['id']}, name={user_data['name']}")
             await self.send(text_data=json.dumps({
                 'type': 'whoami',
                 'user': user_data
@@ -68,28 +97,28 @@ class StudyGroupChatConsumer(AsyncWebsocketConsumer):
             logger.error(f"Error sending whoami event: {e}")
             pass
 
-        # Track presence and notify
-        user_display = await self._get_user_display()
-        ROOM_ONLINE_USERS[self.room_group_name].add((self.user.id, user_display))
+        # Track presence per connection and notify
+        user_display = self.user_display
+        presence = get_presence_backend()
+        came_online = await presence.add(self.room_group_name, self.channel_name, int(self.user.id), user_display)
+        self.heartbeat_task = asyncio.create_task(self._heartbeat())
 
         # Send presence snapshot to this client
         await self.send(text_data=json.dumps({
             'type': 'snapshot',
-            'users': [
-                {'id': int(uid), 'name': uname}
-                for uid, uname in ROOM_ONLINE_USERS[self.room_group_name]
-            ]
+            'users': await presence.snapshot(self.room_group_name),
         }))
 
-        # Broadcast join to others
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'presence_event',
-                'action': 'join',
-                'user': {'id': int(self.user.id), 'name': user_display},
-            }
-        )
+        # Broadcast join to others (only for the user's first open tab)
+        if came_online:
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    'type': 'presence_event',
+                    'action': 'join',
+                    'user': {'id': int(self.user.id), 'name': user_display},
+                }
+            )
 
     async def disconnect(self, close_code):
         # Leave room group
@@ -103,42 +132,52 @@ class StudyGroupChatConsumer(AsyncWebsocketConsumer):
                 )
             except Exception:
                 pass
-            # Update presence and broadcast leave
-            try:
-                user_display = await self._get_user_display()
-                ROOM_ONLINE_USERS[self.room_group_name].discard((self.user.id, user_display))
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'presence_event',
-                        'action': 'leave',
-                        'user': {'id': int(self.user.id), 'name': user_display},
-                    }
+            heartbeat_task = getattr(self, 'heartbeat_task', None)
+            if heartbeat_task:
+                heartbeat_task.cancel()
+            if getattr(self, 'is_member', False):
+                # Clear a typing indicator left behind by a socket closed mid-word
+                get_typing_aggregator(self.room_group_name, self.channel_layer).update(
+                    int(self.user.id), self.user_display, False
                 )
+
+            # Update presence and broadcast leave once the user's last tab closes
+            try:
+                went_offline = await get_presence_backend().remove(self.room_group_name, self.channel_name)
+                if went_offline:
+                    await self.channel_layer.group_send(
+                        self.room_group_name,
+                        {
+                            'type': 'presence_event',
+                            'action': 'leave',
+                            'user': {'id': int(self.user.id), 'name': self.user_display},
+                        }
+                    )
             except Exception:
-                pass
+                logger.exception("Failed to update presence on disconnect: group=%s", self.group_id)
 
             await self.channel_layer.group_discard(
                 self.room_group_name,
                 self.channel_name
             )
+            if hasattr(self, 'member_group_name'):
+                await self.channel_layer.group_discard(
+                    self.member_group_name,
+                    self.channel_name
+                )
 
     async def receive(self, text_data):
+        # Sockets of removed members are closed; ignore anything still in flight
+        if not self.is_member:
+            return
+
         data = json.loads(text_data)
         event_type = data.get('type')
 
-        # Typing indicator event
+        # Typing indicator event: coalesced per room, broadcast in batches
         if event_type == 'typing':
-            is_typing = bool(data.get('is_typing'))
-            user_display = await self._get_user_display()
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'typing_event',
-                    'user': {'id': int(self.user.id), 'name': user_display},
-                    'is_typing': is_typing,
-                }
-            )
+            aggregator = get_typing_aggregator(self.room_group_name, self.channel_layer)
+            aggregator.update(int(self.user.id), self.user_display, bool(data.get('is_typing')))
             return
 
         # Default: chat message
@@ -148,7 +187,7 @@ class StudyGroupChatConsumer(AsyncWebsocketConsumer):
         client_id = data.get('client_id')
         reply_to = data.get('reply_to')
         
-        logger.info(f"Received message data: body='{message_body}', client_id='{client_id}', reply_to={reply_to}")
+        logger.debug(f"Received message data: body='{message_body}', client_id='{client_id}', reply_to={reply_to}")
 
         # Save message to database
         message = await self.save_message(message_body, reply_to)
@@ -164,7 +203,7 @@ class StudyGroupChatConsumer(AsyncWebsocketConsumer):
             'reply_to': message.get('reply_to'),
         }
         
-        logger.info(f"Broadcasting message: {broadcast_message}")
+        logger.debug(f"Broadcasting message: {broadcast_message}")
         
         await self.channel_layer.group_send(
             self.room_group_name,
@@ -178,20 +217,11 @@ class StudyGroupChatConsumer(AsyncWebsocketConsumer):
         # Keep legacy shape (plain message) for compatibility
         await self.send(text_data=json.dumps(event['message']))
 
-    async def typing_event(self, event):
-        # Ensure user ID is properly serialized as integer
-        user_data = {
-            'id': int(event['user']['id']),
-            'name': event['user']['name']
-        }
-        
-        # Debug logging
-        logger.info(f"Typing event - Sending typing indicator: user_id={user_data['id']}, name={user_data['name']}, is_typing={event['is_typing']}")
-        
+    async def typing_batch(self, event):
         await self.send(text_data=json.dumps({
-            'type': 'typing',
-            'user': user_data,
-            'is_typing': event['is_typing'],
+            'type': 'typing_batch',
+            'typing': event['typing'],
+            'stopped': event['stopped'],
         }))
 
     async def presence_event(self, event):
@@ -201,120 +231,78 @@ class StudyGroupChatConsumer(AsyncWebsocketConsumer):
             'user': event['user'],
         }))
 
+    async def membership_revoked(self, event):
+        self.is_member = False
+        logger.info("WS evicted: group=%s user=%s", self.group_id, getattr(self.user, 'email', str(self.user)))
+        await self.send(text_data=json.dumps({
+            'type': 'membership_revoked',
+            'group_id': event['group_id'],
+        }))
+        await self.close(code=4003)
+
+    async def _heartbeat(self):
+        """Keep this connection's presence entry alive until it disconnects"""
+        presence = get_presence_backend()
+        while True:
+            await asyncio.sleep(presence.heartbeat_interval)
+            try:
+                await presence.touch(self.room_group_name, self.channel_name)
+            except Exception:
+                logger.warning("Presence heartbeat failed: group=%s channel=%s", self.group_id, self.channel_name)
+
     @database_sync_to_async
-    def check_membership(self):
+    def _load_connection_state(self):
+        """Membership flag and display name, resolved in a single thread hop"""
         try:
-            return StudyGroupMembership.objects.filter(
+            is_member = StudyGroupMembership.objects.filter(
                 group_id=self.group_id,
                 user=self.user
             ).exists()
         except Exception:
-            return False
+            return False, ''
+        name = self.user.get_full_name()
+        return is_member, name or getattr(self.user, 'username', str(self.user.id))
 
     @database_sync_to_async
     def save_message(self, body, reply_to=None):
-        import re
-        from directory.models import User
-        from course_content.models import Material
-        
-        # Get the replied-to message if reply_to is provided
-        replied_message = None
-        if reply_to and reply_to.get('id'):
-            try:
-                replied_message = GroupMessage.objects.get(id=reply_to['id'], group_id=self.group_id)
-            except GroupMessage.DoesNotExist:
-                pass  # Reply to message not found, ignore reply
-        
-        msg = GroupMessage.objects.create(
-            group_id=self.group_id,
-            sender=self.user,
-            body=body,
-            reply_to=replied_message
-        )
-        
-        # Parse and store @mentions (format: @userId or @[userId:UserName])
-        mention_pattern = r'@\[(\d+):([^\]]+)\]|@(\d+)'
-        mention_matches = re.finditer(mention_pattern, body)
-        mentioned_user_ids = set()
-        for match in mention_matches:
-            user_id = match.group(1) or match.group(3)
-            if user_id:
-                mentioned_user_ids.add(int(user_id))
-        
-        # Add mentioned users to the message
-        if mentioned_user_ids:
-            mentioned_users = User.objects.filter(id__in=mentioned_user_ids)
-            msg.mentioned_users.set(mentioned_users)
-            logger.info(f"Message {msg.id} mentions {len(mentioned_user_ids)} users: {list(mentioned_user_ids)}")
-        
-        # Parse and store [[material]] references (format: [[materialId]] or [[materialId:MaterialTitle]])
-        material_pattern = r'\[\[(\d+):([^\]]+)\]\]|\[\[(\d+)\]\]'
-        material_matches = re.finditer(material_pattern, body)
-        material_ids = set()
-        for match in material_matches:
-            material_id = match.group(1) or match.group(3)
-            if material_id:
-                material_ids.add(int(material_id))
-        
-        # Add referenced materials to the message
-        if material_ids:
-            materials = Material.objects.filter(id__in=material_ids)
-            msg.referenced_materials.set(materials)
-            logger.info(f"Message {msg.id} references {len(material_ids)} materials: {list(material_ids)}")
-        
-        # Parse and store #topics (format: #topicname)
-        topic_pattern = r'#(\w+)'
-        topic_matches = re.finditer(topic_pattern, body)
-        topics = set()
-        for match in topic_matches:
-            topic = match.group(1)
-            if topic:
-                topics.add(topic)
-        
-        # Store topics as JSON list
-        if topics:
-            msg.topics = list(topics)
-            msg.save()
-            logger.info(f"Message {msg.id} has topics: {list(topics)}")
-        
-        # Build absolute URL for profile picture
-        def get_profile_picture_url(user):
-            if user.profile_picture:
-                from django.conf import settings
-                # Build the media URL - in Docker/production this will be the correct domain
-                # For local development, the frontend proxy will handle this
-                return user.profile_picture.url
-            return None
-        
+        reply_to_id = reply_to.get('id') if isinstance(reply_to, dict) else None
+        msg = GroupMessage.create_with_references(self.group_id, self.user, body, reply_to_id)
+
+        if msg.mentioned or msg.course_materials or msg.group_materials or msg.topics:
+            logger.debug(
+                "Message %s references: users=%s course_materials=%s group_materials=%s topics=%s",
+                msg.id,
+                [u.id for u in msg.mentioned],
+                [m.id for m in msg.course_materials],
+                [m.id for m in msg.group_materials],
+                msg.topics,
+            )
+
+        # Build the broadcast payload from what is already in memory
         result = {
             'id': msg.id,
-            'sender': msg.sender.id,
-            'sender_name': msg.sender.get_full_name(),
-            'sender_profile_picture': get_profile_picture_url(msg.sender),
+            'sender': self.user.id,
+            'sender_name': self.user.get_full_name(),
+            'sender_profile_picture': _profile_picture_url(self.user),
             'body': msg.body,
             'created_at': msg.created_at.isoformat(),
-            'mentioned_users': [{'id': u.id, 'name': u.get_full_name()} for u in msg.mentioned_users.all()],
-            'referenced_materials': [{'id': m.id, 'title': m.title} for m in msg.referenced_materials.all()],
-            'topics': msg.topics
+            'mentioned_users': [{'id': u.id, 'name': u.get_full_name()} for u in msg.mentioned],
+            'referenced_materials': (
+                [{'id': m.id, 'title': m.title, 'source': 'course'} for m in msg.course_materials]
+                + [{'id': m.id, 'title': m.title, 'source': 'group'} for m in msg.group_materials]
+            ),
+            'topics': msg.topics,
         }
-        
+
         # Add reply information if this is a reply
+        replied_message = msg.reply_to
         if replied_message:
             result['reply_to'] = {
                 'id': replied_message.id,
                 'sender_name': replied_message.sender.get_full_name(),
-                'sender_profile_picture': get_profile_picture_url(replied_message.sender),
+                'sender_profile_picture': _profile_picture_url(replied_message.sender),
                 'body': replied_message.body,
                 'created_at': replied_message.created_at.isoformat()
             }
-            logger.info(f"Message {msg.id} is a reply to message {replied_message.id}")
-        else:
-            logger.info(f"Message {msg.id} is not a reply")
-        
-        return result
-
-    @database_sync_to_async
-    def _get_user_display(self):
-        name = self.user.get_full_name()
-        return name or getattr(self.user, 'username', str(self.user.id))
 
+        return result
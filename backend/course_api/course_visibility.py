@@ -0,0 +1,129 @@
+"""
+Cached map of which courses each class can see.
+
+A class sees the first-year first-semester courses of an academic year while
+its students are in their first year of study, and otherwise only the courses
+that target it. Working that out needs the active academic year, the class's
+intake year and an M2M join, and almost every student endpoint asks for it.
+
+Results are cached per ``(class_id, academic_year_id)`` in the Django cache.
+The active academic year comes from the academic calendar snapshot and is
+part of every key, so activating another year switches to fresh entries.
+Signal handlers in ``course_api.signals`` bump a shared version stamp when
+course targeting or a class's intake year change; either can move courses
+between many classes at once, so the whole map is dropped.
+"""
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from directory.academic_calendar import get_calendar
+
+VERSION_KEY = 'course_visibility_version'
+TTL_SECONDS = 3600
+FIRST_YEAR = 1
+MAX_YEAR = 4
+
+
+def invalidate_course_visibility():
+    """Drop every cached visibility entry, in every worker"""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def _version():
+    return cache.get(VERSION_KEY) or 0
+
+
+def year_of_study(intake_year_start, current_year_start):
+    """Same rule as Class.current_year_of_study, without the queries"""
+    if intake_year_start is None or current_year_start is None:
+        return FIRST_YEAR
+    return min(max(current_year_start - intake_year_start + 1, FIRST_YEAR), MAX_YEAR)
+
+
+def _compute(class_ids, academic_year_id, current_year_start):
+    """Visible course ids for each class, in at most three queries"""
+    from school.models import Class
+    from .models import Course
+
+    intake_years = dict(Class.objects.filter(id__in=class_ids).values_list('id', 'academic_year__year_start'))
+    first_year = [c for c in intake_years if year_of_study(intake_years[c], current_year_start) == FIRST_YEAR]
+    targeted = [c for c in intake_years if c not in first_year]
+
+    visible = {class_id: frozenset() for class_id in class_ids}
+    if first_year:
+        ids = frozenset(Course.objects.filter(
+            academic_year_id=academic_year_id, year=1, semester=1
+        ).values_list('id', flat=True))
+        for class_id in first_year:
+            visible[class_id] = ids
+    if targeted:
+        grouped = defaultdict(set)
+        rows = Course.target_classes.through.objects.filter(
+            class_id__in=targeted, course__academic_year_id=academic_year_id
+        ).values_list('class_id', 'course_id')
+        for class_id, course_id in rows:
+            grouped[class_id].add(course_id)
+        for class_id in targeted:
+            visible[class_id] = frozenset(grouped[class_id])
+    return visible
+
+
+def get_visible_course_ids_for_classes(class_ids, academic_year_id=None):
+    """
+    Resolve visible course ids for many classes at once.
+
+    Args:
+        class_ids: Iterable of school.Class ids
+        academic_year_id: Academic year whose courses to list (defaults to the active one)
+
+    Returns:
+        Dict mapping each class id to a frozenset of course ids
+    """
+    class_ids = set(class_ids)
+    if not class_ids:
+        return {}
+    active_year = get_calendar().academic_year
+    active_year_id = active_year.pk if active_year else None
+    current_year_start = active_year.year_start if active_year else None
+    academic_year_id = academic_year_id or active_year_id
+    if academic_year_id is None:
+        return {class_id: frozenset() for class_id in class_ids}
+
+    # The active year decides every class's year of study, so it is part of the key
+    namespace = f'course_visibility:{_version()}:{active_year_id}-{current_year_start}'
+    keys = {class_id: f'{namespace}:{class_id}:{academic_year_id}' for class_id in class_ids}
+    cached = cache.get_many(keys.values())
+    visible = {class_id: cached[key] for class_id, key in keys.items() if key in cached}
+
+    missing = class_ids - set(visible)
+    if missing:
+        computed = _compute(missing, academic_year_id, current_year_start)
+        cache.set_many({keys[class_id]: ids for class_id, ids in computed.items()}, TTL_SECONDS)
+        visible.update(computed)
+    return visible
+
+
+def get_visible_course_ids(class_id, academic_year_id=None):
+    """Visible course ids for one class"""
+    return get_visible_course_ids_for_classes([class_id], academic_year_id)[class_id]
+
+
+def get_visible_course_ids_for_users(users, academic_year_id=None):
+    """
+    Resolve visible course ids for many users at once.
+
+    Non-students and students without a class see no courses, matching
+    Course.get_courses_for_user.
+
+    Returns:
+        Dict mapping each user id to a frozenset of course ids
+    """
+    users = list(users)
+    by_class = get_visible_course_ids_for_classes(
+        {u.student_class_id for u in users if u.is_student and u.student_class_id}, academic_year_id
+    )
+    return {
+        u.id: by_class.get(u.student_class_id, frozenset()) if u.is_student else frozenset()
+        for u in users
+    }
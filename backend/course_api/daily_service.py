@@ -1,37 +1,54 @@
-import requests
-import json
+"""
+Daily.co REST API clients.
+
+``DailyService`` talks to the API over one pooled keep-alive
+``requests.Session`` per process, so repeated calls reuse TLS connections.
+Connection failures are retried for every method; 429/5xx responses are
+retried with backoff only for idempotent methods (GET, DELETE), so a room
+or token is never created twice. ``AsyncDailyService`` offers the same calls
+over ``httpx.AsyncClient`` for Channels consumers and other async code.
+
+The API base URL and timeouts come from ``DAILY_API_BASE_URL``,
+``DAILY_CONNECT_TIMEOUT`` and ``DAILY_READ_TIMEOUT``; tests point the base
+URL at the fake server in ``course_api.tests.fake_daily``.
+"""
+import asyncio
+import logging
 import os
+import threading
 from datetime import datetime, timedelta
+
+import requests
 from django.conf import settings
-from django.utils import timezone
 
+logger = logging.getLogger(__name__)
 
-class DailyService:
-    """Service class for Daily.co API integration"""
-    
-    def __init__(self):
+POOL_SIZE = 10
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = frozenset({'GET', 'DELETE', 'HEAD', 'OPTIONS'})
+
+
+class DailyClientBase:
+    """Configuration and request payloads shared by the sync and async clients"""
+
+    def __init__(self, api_key=None, base_url=None):
         # Get Daily.co API key from environment or settings
-        self.api_key = getattr(settings, 'DAILY_API_KEY', os.getenv('DAILY_API_KEY'))
-        self.base_url = 'https://api.daily.co/v1'
+        self.api_key = api_key if api_key is not None else getattr(settings, 'DAILY_API_KEY', os.getenv('DAILY_API_KEY'))
+        self.base_url = (base_url or getattr(settings, 'DAILY_API_BASE_URL', 'https://api.daily.co/v1')).rstrip('/')
+        self.connect_timeout = getattr(settings, 'DAILY_CONNECT_TIMEOUT', 3.05)
+        self.read_timeout = getattr(settings, 'DAILY_READ_TIMEOUT', 10)
         self.headers = {
             'Authorization': f'Bearer {self.api_key}',
             'Content-Type': 'application/json'
         }
-    
-    def create_room(self, name, properties=None):
-        """
-        Create a new Daily.co room
-        
-        Args:
-            name (str): Room name (should be unique)
-            properties (dict): Room properties like max_participants, enable_recording, etc.
-        
-        Returns:
-            dict: Room creation response
-        """
+
+    def _require_api_key(self):
         if not self.api_key:
             raise ValueError("Daily.co API key not configured")
-        
+
+    def _room_payload(self, name, properties=None):
         default_properties = {
             'max_participants': 50,
             'enable_recording': 'cloud',
@@ -59,199 +76,326 @@ class DailyService:
                 'enable_virtual_background': True
             }
         }
-        
+
         if properties:
             default_properties.update(properties)
-        
-        payload = {
+
+        return {
             'name': name,
             **default_properties
         }
-        
+
+    def _token_payload(self, room_name, user_id, user_name, is_owner=False, exp=None):
+        return {
+            'properties': {
+                'room_name': room_name,
+                'user_id': user_id,
+                'is_owner': is_owner,
+                'exp': exp or self._get_expiration_timestamp(),
+                'user_name': user_name
+            }
+        }
+
+    def _get_expiration_timestamp(self):
+        """Get expiration timestamp (24 hours from now)"""
+        return int((datetime.now() + timedelta(hours=24)).timestamp())
+
+    def generate_room_name(self, course_code, day, time):
+        """
+        Generate a unique room name based on course and schedule
+
+        Args:
+            course_code (str): Course code
+            day (str): Day of week
+            time (str): Time slot
+
+        Returns:
+            str: Generated room name
+        """
+        # Clean and format the inputs
+        clean_course = course_code.lower().replace(' ', '').replace('-', '')
+        clean_day = day.lower()
+        clean_time = time.replace(':', '').replace(' ', '').replace('-', '')
+
+        # Daily.co room names must be lowercase, alphanumeric, and hyphens only
+        room_name = f"{clean_course}-{clean_day}-{clean_time}"
+
+        # Ensure it's not too long (Daily.co limit is 50 chars)
+        if len(room_name) > 50:
+            room_name = room_name[:50]
+
+        return room_name
+
+    def is_api_configured(self):
+        """Check if Daily.co API is properly configured"""
+        return bool(self.api_key)
+
+
+class DailyService(DailyClientBase):
+    """Service class for Daily.co API integration"""
+
+    def __init__(self, api_key=None, base_url=None):
+        super().__init__(api_key, base_url)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Keep-alive session shared by every call in this process"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    from requests.adapters import HTTPAdapter
+                    from urllib3.util.retry import Retry
+
+                    retry = Retry(
+                        total=MAX_RETRIES, connect=MAX_RETRIES, read=MAX_RETRIES, status=MAX_RETRIES,
+                        backoff_factor=BACKOFF_FACTOR, status_forcelist=RETRY_STATUSES,
+                        allowed_methods=IDEMPOTENT_METHODS, raise_on_status=False,
+                    )
+                    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+                    session = requests.Session()
+                    session.headers.update(self.headers)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def close(self):
+        """Close pooled connections (they are reopened on the next call)"""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _request(self, method, path, **kwargs):
+        self._require_api_key()
+        response = self.session.request(
+            method, f'{self.base_url}{path}', timeout=(self.connect_timeout, self.read_timeout), **kwargs
+        )
+        response.raise_for_status()
+        return response
+
+    def create_room(self, name, properties=None):
+        """
+        Create a new Daily.co room
+
+        Args:
+            name (str): Room name (should be unique)
+            properties (dict): Room properties like max_participants, enable_recording, etc.
+
+        Returns:
+            dict: Room creation response
+        """
+        self._require_api_key()
         try:
-            response = requests.post(
-                f'{self.base_url}/rooms',
-                headers=self.headers,
-                json=payload,
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._request('POST', '/rooms', json=self._room_payload(name, properties)).json()
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to create Daily.co room: {str(e)}")
-    
+
     def get_room(self, name):
         """
         Get room information
-        
+
         Args:
             name (str): Room name
-        
+
         Returns:
-            dict: Room information
+            dict: Room information, or None if the room does not exist
         """
-        if not self.api_key:
-            raise ValueError("Daily.co API key not configured")
-        
+        self._require_api_key()
         try:
-            response = requests.get(
-                f'{self.base_url}/rooms/{name}',
-                headers=self.headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._request('GET', f'/rooms/{name}').json()
         except requests.exceptions.RequestException as e:
-            if e.response and e.response.status_code == 404:
+            if e.response is not None and e.response.status_code == 404:
                 return None
             raise Exception(f"Failed to get Daily.co room: {str(e)}")
-    
+
     def delete_room(self, name):
         """
         Delete a Daily.co room
-        
+
         Args:
             name (str): Room name
-        
+
         Returns:
             bool: True if successful
         """
-        if not self.api_key:
-            raise ValueError("Daily.co API key not configured")
-        
+        self._require_api_key()
         try:
-            response = requests.delete(
-                f'{self.base_url}/rooms/{name}',
-                headers=self.headers,
-                timeout=10
-            )
-            response.raise_for_status()
+            self._request('DELETE', f'/rooms/{name}')
             return True
         except requests.exceptions.RequestException as e:
-            if e.response and e.response.status_code == 404:
+            if e.response is not None and e.response.status_code == 404:
                 return True  # Room already deleted
             raise Exception(f"Failed to delete Daily.co room: {str(e)}")
-    
-    def create_meeting_token(self, room_name, user_id, user_name, is_owner=False):
+
+    def create_meeting_token(self, room_name, user_id, user_name, is_owner=False, exp=None):
         """
         Create a meeting token for authentication
-        
+
         Args:
             room_name (str): Room name
             user_id (str): User ID
             user_name (str): User display name
             is_owner (bool): Whether user is room owner
-        
+            exp (int): Expiry as a Unix timestamp (default: 24 hours from now)
+
         Returns:
             dict: Token creation response
         """
-        if not self.api_key:
-            raise ValueError("Daily.co API key not configured")
-        
-        payload = {
-            'properties': {
-                'room_name': room_name,
-                'user_id': user_id,
-                'is_owner': is_owner,
-                'exp': self._get_expiration_timestamp(),
-                'user_name': user_name
-            }
-        }
-        
+        self._require_api_key()
+        payload = self._token_payload(room_name, user_id, user_name, is_owner, exp)
         try:
-            response = requests.post(
-                f'{self.base_url}/meeting-tokens',
-                headers=self.headers,
-                json=payload,
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._request('POST', '/meeting-tokens', json=payload).json()
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to create meeting token: {str(e)}")
-    
+
     def get_room_participants(self, room_name):
         """
         Get current participants in a room
-        
+
         Args:
             room_name (str): Room name
-        
+
         Returns:
             list: List of participants
         """
-        if not self.api_key:
-            raise ValueError("Daily.co API key not configured")
-        
+        self._require_api_key()
         try:
-            response = requests.get(
-                f'{self.base_url}/rooms/{room_name}/participants',
-                headers=self.headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._request('GET', f'/rooms/{room_name}/participants').json()
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to get room participants: {str(e)}")
-    
+
     def end_room_session(self, room_name):
         """
         End all active sessions in a room
-        
+
         Args:
             room_name (str): Room name
-        
+
         Returns:
             bool: True if successful
         """
-        if not self.api_key:
-            raise ValueError("Daily.co API key not configured")
-        
+        self._require_api_key()
         try:
-            response = requests.post(
-                f'{self.base_url}/rooms/{room_name}/end-session',
-                headers=self.headers,
-                timeout=10
-            )
-            response.raise_for_status()
+            self._request('POST', f'/rooms/{room_name}/end-session')
             return True
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to end room session: {str(e)}")
-    
-    def _get_expiration_timestamp(self):
-        """Get expiration timestamp (24 hours from now)"""
-        return int((datetime.now() + timedelta(hours=24)).timestamp())
-    
-    def generate_room_name(self, course_code, day, time):
-        """
-        Generate a unique room name based on course and schedule
-        
-        Args:
-            course_code (str): Course code
-            day (str): Day of week
-            time (str): Time slot
-        
-        Returns:
-            str: Generated room name
-        """
-        # Clean and format the inputs
-        clean_course = course_code.lower().replace(' ', '').replace('-', '')
-        clean_day = day.lower()
-        clean_time = time.replace(':', '').replace(' ', '').replace('-', '')
-        
-        # Daily.co room names must be lowercase, alphanumeric, and hyphens only
-        room_name = f"{clean_course}-{clean_day}-{clean_time}"
-        
-        # Ensure it's not too long (Daily.co limit is 50 chars)
-        if len(room_name) > 50:
-            room_name = room_name[:50]
-        
-        return room_name
-    
-    def is_api_configured(self):
-        """Check if Daily.co API is properly configured"""
-        return bool(self.api_key)
 
 
-# Global instance
+class AsyncDailyService(DailyClientBase):
+    """Async Daily.co client over a pooled httpx.AsyncClient, for use from Channels"""
+
+    def __init__(self, api_key=None, base_url=None):
+        super().__init__(api_key, base_url)
+        self._client = None
+        self._client_loop = None
+
+    async def get_client(self):
+        """Keep-alive client for the running event loop (clients cannot cross loops)"""
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._client_loop is loop and not self._client.is_closed:
+            return self._client
+        limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+        old, self._client = self._client, httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            # A transport passed in ignores the client's limits, so the pool cap goes on the transport.
+            # Its retries only cover failed connects, which are safe for any method.
+            transport=httpx.AsyncHTTPTransport(retries=MAX_RETRIES, limits=limits),
+        )
+        self._client_loop = loop
+        if old is not None and not old.is_closed:
+            # Release the previous loop's connections instead of leaking them
+            try:
+                await old.aclose()
+            except Exception:
+                logger.warning("Could not close the previous Daily.co client", exc_info=True)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method, path, **kwargs):
+        self._require_api_key()
+        attempt = 0
+        while True:
+            response = await (await self.get_client()).request(method, path, **kwargs)
+            if (response.status_code in RETRY_STATUSES and method in IDEMPOTENT_METHODS
+                    and attempt < MAX_RETRIES):
+                await asyncio.sleep(BACKOFF_FACTOR * 2 ** attempt)
+                attempt += 1
+                continue
+            response.raise_for_status()
+            return response
+
+    async def create_room(self, name, properties=None):
+        """Create a new Daily.co room (see DailyService.create_room)"""
+        import httpx
+        try:
+            return (await self._request('POST', '/rooms', json=self._room_payload(name, properties))).json()
+        except httpx.HTTPError as e:
+            raise Exception(f"Failed to create Daily.co room: {str(e)}")
+
+    async def get_room(self, name):
+        """Get room information, or None if the room does not exist"""
+        import httpx
+        try:
+            return (await self._request('GET', f'/rooms/{name}')).json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            raise Exception(f"Failed to get Daily.co room: {str(e)}")
+        except httpx.HTTPError as e:
+            raise Exception(f"Failed to get Daily.co room: {str(e)}")
+
+    async def delete_room(self, name):
+        """Delete a Daily.co room"""
+        import httpx
+        try:
+            await self._request('DELETE', f'/rooms/{name}')
+            return True
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return True  # Room already deleted
+            raise Exception(f"Failed to delete Daily.co room: {str(e)}")
+        except httpx.HTTPError as e:
+            raise Exception(f"Failed to delete Daily.co room: {str(e)}")
+
+    async def create_meeting_token(self, room_name, user_id, user_name, is_owner=False, exp=None):
+        """Create a meeting token for authentication"""
+        import httpx
+        payload = self._token_payload(room_name, user_id, user_name, is_owner, exp)
+        try:
+            return (await self._request('POST', '/meeting-tokens', json=payload)).json()
+        except httpx.HTTPError as e:
+            raise Exception(f"Failed to create meeting token: {str(e)}")
+
+    async def get_room_participants(self, room_name):
+        """Get current participants in a room"""
+        import httpx
+        try:
+            return (await self._request('GET', f'/rooms/{room_name}/participants')).json()
+        except httpx.HTTPError as e:
+            raise Exception(f"Failed to get room participants: {str(e)}")
+
+    async def end_room_session(self, room_name):
+        """End all active sessions in a room"""
+        import httpx
+        try:
+            await self._request('POST', f'/rooms/{room_name}/end-session')
+            return True
+        except httpx.HTTPError as e:
+            raise Exception(f"Failed to end room session: {str(e)}")
+
+
+# Global instances
 daily_service = DailyService()
+async_daily_service = AsyncDailyService()
@@ -0,0 +1,122 @@
+"""
+Cached Daily.co meeting tokens.
+
+Joining a Daily meeting needs a meeting token, and minting one is a call to
+the Daily API. ``get_meeting_token()`` keeps each token in the cache under
+(room, user, owner flag, display name) until ``REFRESH_BEFORE`` seconds
+before it expires, so a user rejoining the same room reuses their token.
+
+Concurrent requests for the same key are collapsed into one API call, both
+between threads of a process and between workers via a short cache lock. At
+most ``MAX_CONCURRENT_REQUESTS`` token calls per process are in flight at
+once, which keeps a whole class joining at the top of the hour on the
+client's pooled connections instead of opening one per student.
+"""
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+
+from django.core.cache import cache
+
+from .daily_service import POOL_SIZE
+
+TOKEN_LIFETIME = 24 * 60 * 60
+REFRESH_BEFORE = 10 * 60
+MAX_CONCURRENT_REQUESTS = POOL_SIZE
+LOCK_TIMEOUT = 15
+WAIT_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+
+def _cache_key(room_name, user_id, user_name, is_owner):
+    name_digest = hashlib.md5(user_name.encode()).hexdigest()[:12]
+    return f"daily_token:{room_name}:{user_id}:{int(bool(is_owner))}:{name_digest}"
+
+
+def _cached_token(key):
+    """Return the cached token unless it is missing or about to expire"""
+    entry = cache.get(key)
+    if entry and entry['exp'] - time.time() > REFRESH_BEFORE:
+        return entry['token']
+    return None
+
+
+def _wait_for_token(key, lock_key):
+    """Wait while another worker mints this token; None if it does not show up"""
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        token = _cached_token(key)
+        if token or cache.get(lock_key) is None:
+            return token
+    return None
+
+
+def _mint(key, room_name, user_id, user_name, is_owner):
+    from . import daily_service as daily
+
+    lock_key = f"{key}:lock"
+    locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    if not locked:
+        token = _wait_for_token(key, lock_key)
+        if token:
+            return token
+    try:
+        token = _cached_token(key)
+        if token:
+            return token
+        exp = int(time.time()) + TOKEN_LIFETIME
+        with _request_slots:
+            token = daily.daily_service.create_meeting_token(
+                room_name=room_name, user_id=user_id, user_name=user_name, is_owner=is_owner, exp=exp,
+            ).get('token')
+        if token:
+            cache.set(key, {'token': token, 'exp': exp}, TOKEN_LIFETIME - REFRESH_BEFORE)
+        return token
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def get_meeting_token(room_name, user_id, user_name, is_owner=False):
+    """
+    Get a meeting token for this user and room, minting one only when needed.
+
+    Args:
+        room_name (str): Room name
+        user_id (str): User ID
+        user_name (str): User display name
+        is_owner (bool): Whether user is room owner
+
+    Returns:
+        str: The token, or None if Daily.co returned none
+    """
+    key = _cache_key(room_name, user_id, user_name, is_owner)
+    token = _cached_token(key)
+    if token:
+        return token
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        return future.result(timeout=LOCK_TIMEOUT + WAIT_TIMEOUT)
+
+    try:
+        token = _mint(key, room_name, user_id, user_name, is_owner)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(token)
+        return token
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
@@ -0,0 +1,189 @@
+"""
+Persistent outbox for outbound email.
+
+``email_service`` renders each email and stores it here instead of talking
+to SMTP inside the request. ``manage.py drain_email_outbox`` claims due rows
+and sends them in batches of ``BATCH_SIZE`` over pooled connections, with at
+most ``MAX_CONCURRENCY`` batches (and so SMTP sessions) in flight at once.
+
+Every row has an idempotency key (e.g. ``approval:42``); queuing the same key
+again returns the existing row, so retried requests and jobs never send a
+duplicate. A failed send is retried with exponential backoff, tried once via
+SendGrid when that is configured, and marked ``dead`` after ``max_attempts``.
+``requeue()`` gives dead rows another go.
+
+Bodies can hold working verification and password reset links, so they are
+blanked as soon as a row is sent, and ``purge()`` (run by the drain worker)
+deletes sent rows after ``SENT_RETENTION`` and dead ones after
+``DEAD_RETENTION``. To send something again, queue it afresh.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_CONCURRENCY = 4
+LOCK_TIMEOUT = 10 * 60
+SENT_RETENTION = timedelta(days=7)
+DEAD_RETENTION = timedelta(days=30)
+
+
+def queue_email(idempotency_key, category, to_email, subject, text_body, html_body='', user=None):
+    """
+    Store an email for the drain worker, once per idempotency key.
+
+    Returns:
+        (EmailOutbox, created)
+    """
+    from .models import EmailOutbox
+
+    defaults = {
+        'category': category, 'to_email': to_email, 'subject': subject[:255],
+        'text_body': text_body, 'html_body': html_body, 'user': user,
+    }
+    try:
+        with transaction.atomic():
+            return EmailOutbox.objects.get_or_create(idempotency_key=idempotency_key, defaults=defaults)
+    except IntegrityError:
+        # Lost a race with another request queuing the same key
+        return EmailOutbox.objects.get(idempotency_key=idempotency_key), False
+
+
+def queue_emails(entries):
+    """
+    Store many emails with one insert, skipping keys that are already queued.
+
+    Args:
+        entries: Iterable of dicts with the queue_email() arguments
+    """
+    from .models import EmailOutbox
+
+    rows = [
+        EmailOutbox(
+            idempotency_key=e['idempotency_key'], category=e['category'], to_email=e['to_email'],
+            subject=e['subject'][:255], text_body=e['text_body'], html_body=e.get('html_body', ''),
+            user=e.get('user'),
+        )
+        for e in entries
+    ]
+    EmailOutbox.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+    return len(rows)
+
+
+def requeue(queryset):
+    """Put dead emails back in the outbox with a fresh attempt budget; sent rows have no body left"""
+    return queryset.filter(status='dead').update(
+        status='pending', attempts=0, next_attempt_at=timezone.now(), locked_at=None,
+    )
+
+
+def requeue_email(idempotency_key):
+    """Retry a dead email; returns whether there was one"""
+    from .models import EmailOutbox
+    return bool(requeue(EmailOutbox.objects.filter(idempotency_key=idempotency_key)))
+
+
+def purge(now=None):
+    """
+    Delete sent and dead emails past their retention.
+
+    Returns:
+        Number of rows deleted
+    """
+    from django.db.models import Q
+    from .models import EmailOutbox
+
+    now = now or timezone.now()
+    deleted, _ = EmailOutbox.objects.filter(
+        Q(status='sent', sent_at__lt=now - SENT_RETENTION) | Q(status='dead', updated_at__lt=now - DEAD_RETENTION)
+    ).delete()
+    return deleted
+
+
+def claim(limit):
+    """Lock up to `limit` due emails and mark them sending"""
+    from django.db.models import F, Q
+    from .models import EmailOutbox
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=LOCK_TIMEOUT)
+    with transaction.atomic():
+        rows = list(EmailOutbox.objects.filter(
+            Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', locked_at__lt=stale)
+        ).select_for_update(skip_locked=True).order_by('next_attempt_at', 'id')[:limit])
+        if rows:
+            EmailOutbox.objects.filter(pk__in=[row.pk for row in rows]).update(
+                status='sending', locked_at=now, attempts=F('attempts') + 1,
+            )
+            for row in rows:
+                row.status, row.locked_at, row.attempts = 'sending', now, row.attempts + 1
+    return rows
+
+
+def _message(row):
+    from django.conf import settings
+    from django.core.mail import EmailMultiAlternatives
+
+    message = EmailMultiAlternatives(
+        subject=row.subject, body=row.text_body, from_email=settings.DEFAULT_FROM_EMAIL, to=[row.to_email],
+    )
+    if row.html_body:
+        message.attach_alternative(row.html_body, "text/html")
+    return message
+
+
+def _send_batch(rows):
+    """Runs in a worker thread: one SMTP connection for the batch, no database access"""
+    from .email_service import send_email_via_sendgrid, send_messages_pooled
+
+    results = send_messages_pooled([(row.pk, _message(row)) for row in rows], batch_size=len(rows))
+    for row in rows:
+        if not results.get(row.pk) and send_email_via_sendgrid(row.to_email, row.subject, row.text_body):
+            results[row.pk] = True
+    return results
+
+
+def drain(limit=BATCH_SIZE * MAX_CONCURRENCY, batch_size=BATCH_SIZE, concurrency=MAX_CONCURRENCY):
+    """
+    Claim due emails and send them.
+
+    Returns:
+        (sent, failed) counts
+    """
+    from .job_queue import backoff_delay
+    from .models import EmailOutbox
+
+    rows = claim(limit)
+    if not rows:
+        return 0, 0
+
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches)))) as pool:
+        for batch_results in pool.map(_send_batch, batches):
+            results.update(batch_results)
+
+    now = timezone.now()
+    sent_ids = [row.pk for row in rows if results.get(row.pk)]
+    # The bodies are not needed once delivered, and links in them must not outlive the send
+    EmailOutbox.objects.filter(pk__in=sent_ids).update(
+        status='sent', sent_at=now, locked_at=None, last_error='', text_body='', html_body='',
+    )
+
+    failed = [row for row in rows if not results.get(row.pk)]
+    for row in failed:
+        row.locked_at, row.last_error = None, 'Delivery failed; see the worker log'
+        if row.attempts >= row.max_attempts:
+            row.status = 'dead'
+            logger.error(f"Giving up on {row.category} email to {row.to_email} after {row.attempts} attempts")
+        else:
+            row.status = 'pending'
+            row.next_attempt_at = now + timedelta(seconds=backoff_delay(row.attempts))
+    if failed:
+        EmailOutbox.objects.bulk_update(failed, ['status', 'locked_at', 'last_error', 'next_attempt_at'])
+    return len(sent_ids), len(failed)
@@ -4,6 +4,7 @@ from django.conf import settings
 from django.urls import reverse
 import logging
 import os
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -26,33 +27,68 @@ else:
     SENDGRID_API_KEY = None
     SENDGRID_FROM_EMAIL = 'noreply@riverlearn.co.ke'
 
+# Messages sent per SMTP connection by send_messages_pooled; servers drop long sessions
+BULK_BATCH_SIZE = 100
+
+
+def _default_logo_url():
+    return f"{getattr(settings, 'FRONTEND_URL', 'https://co.riverlearn.co.ke')}/assets/RiverLearn%20Logo.png"
+
+
+def _render_html(template, context):
+    if isinstance(template, str):
+        return render_to_string(template, context)
+    return template.render(context)
+
+
+def _key_digest(token):
+    """Short, stable stand-in for a secret token inside an idempotency key"""
+    import hashlib
+    return hashlib.sha256(str(token).encode()).hexdigest()[:32]
+
+
+def _event_stamp(user):
+    """
+    Identifies one status change of a user, for idempotency keys.
+
+    Retries after the same save reuse the key; a later approval or rejection
+    saves the user again and so gets a new key and a new email.
+    """
+    updated_at = getattr(user, 'updated_at', None)
+    return updated_at.strftime('%Y%m%d%H%M%S%f') if updated_at else uuid.uuid4().hex
+
+
+def build_html_email(to_email, subject, template, context=None, plain_text_fallback=None, connection=None):
+    """
+    Build (but do not send) an HTML email with a plain text alternative.
+
+    Args:
+        template: Template name, or a template already loaded with get_template()
+    """
+    if context is None:
+        context = {}
+    # Ensure a default logo URL is available in templates
+    context.setdefault('logo_url', _default_logo_url())
+
+    html_content = _render_html(template, context)
+
+    email = EmailMultiAlternatives(
+        subject=subject,
+        body=plain_text_fallback or "Please view this email in an HTML-capable email client.",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[to_email],
+        connection=connection,
+    )
+    email.attach_alternative(html_content, "text/html")
+    return email
+
+
 def send_html_email(to_email, subject, template_name, context=None, plain_text_fallback=None):
     """
     Send HTML email using Django templates
     """
     try:
-        if context is None:
-            context = {}
-        
-        # Ensure a default logo URL is available in templates
-        default_logo_url = f"{getattr(settings, 'FRONTEND_URL', 'https://co.riverlearn.co.ke')}/assets/RiverLearn%20Logo.png"
-        context.setdefault('logo_url', default_logo_url)
-
-        # Render HTML template
-        html_content = render_to_string(template_name, context)
-        
-        # Create email with both HTML and plain text
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=plain_text_fallback or "Please view this email in an HTML-capable email client.",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[to_email]
-        )
-        
-        # Attach HTML version
-        email.attach_alternative(html_content, "text/html")
-        
-        # Send email
+        email = build_html_email(to_email, subject, template_name, context, plain_text_fallback)
         result = email.send(fail_silently=False)
         logger.info(f"HTML email sent successfully to {to_email}, result: {result}")
         return True
@@ -65,6 +101,119 @@ def send_html_email(to_email, subject, template_name, context=None, plain_text_f
         return False
 
 
+def send_messages_pooled(messages, batch_size=BULK_BATCH_SIZE):
+    """
+    Send prepared messages over shared connections, one per batch.
+
+    Each message is handed to the open connection on its own so one bad
+    address does not fail the rest; a dropped connection is reopened once.
+
+    Args:
+        messages: Iterable of (key, EmailMessage) pairs
+
+    Returns:
+        Dict mapping each key to True (sent) or False (failed)
+    """
+    from smtplib import SMTPServerDisconnected
+    from django.core.mail import get_connection
+
+    results = {}
+    messages = list(messages)
+    for start in range(0, len(messages), batch_size):
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+            for key, message in messages[start:start + batch_size]:
+                message.connection = connection
+                try:
+                    try:
+                        sent = connection.send_messages([message])
+                    except SMTPServerDisconnected:
+                        connection.close()
+                        connection.open()
+                        sent = connection.send_messages([message])
+                    results[key] = bool(sent)
+                except Exception as e:
+                    logger.error(f"Failed to send email to {', '.join(message.to)}: {type(e).__name__}: {e}")
+                    results[key] = False
+        except Exception as e:
+            # Could not connect at all: the rest of this batch fails
+            logger.error(f"Failed to open email connection: {type(e).__name__}: {e}")
+            for key, _ in messages[start:start + batch_size]:
+                results.setdefault(key, False)
+        finally:
+            try:
+                connection.close()
+            except Exception:
+                pass
+    return results
+
+
+def queue_html_email(idempotency_key, category, to_email, subject, template_name, context=None,
+                     plain_text_fallback=None, user=None):
+    """
+    Render an HTML email and store it in the outbox for the drain worker.
+
+    Returns:
+        True once the email is queued (or was already queued under this key)
+    """
+    from .email_outbox import queue_email
+    try:
+        context = context or {}
+        context.setdefault('logo_url', _default_logo_url())
+        queue_email(
+            idempotency_key, category, to_email, subject,
+            text_body=plain_text_fallback or "Please view this email in an HTML-capable email client.",
+            html_body=_render_html(template_name, context),
+            user=user,
+        )
+        logger.info(f"Queued {category} email to {to_email}")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to queue {category} email to {to_email}: {str(e)}")
+        return False
+
+
+def queue_bulk_html_email(category, template_name, recipients):
+    """
+    Render one template for many recipients and store them in the outbox.
+
+    The template is compiled once and all rows go in with a single insert.
+
+    Args:
+        recipients: Iterable of dicts with key (the idempotency key), to_email,
+            subject, context and optionally plain_text_fallback and user
+
+    Returns:
+        Dict mapping each recipient key to True (queued) or False (failed to render)
+    """
+    from django.template.loader import get_template
+    from .email_outbox import queue_emails
+
+    template = get_template(template_name)
+    logo_url = _default_logo_url()
+    entries, results = [], {}
+    for recipient in recipients:
+        context = recipient.get('context') or {}
+        context.setdefault('logo_url', logo_url)
+        try:
+            html_body = template.render(context)
+        except Exception as e:
+            logger.error(f"Failed to render {template_name} for {recipient['to_email']}: {str(e)}")
+            results[recipient['key']] = False
+            continue
+        entries.append({
+            'idempotency_key': recipient['key'], 'category': category,
+            'to_email': recipient['to_email'], 'subject': recipient['subject'],
+            'text_body': recipient.get('plain_text_fallback') or "Please view this email in an HTML-capable email client.",
+            'html_body': html_body, 'user': recipient.get('user'),
+        })
+        results[recipient['key']] = True
+    queue_emails(entries)
+    logger.info(f"Queued {len(entries)} {category} email(s)")
+    return results
+
+
 def send_email_via_sendgrid(to_email, subject, message):
     """
     Send email using SendGrid API as fallback when SMTP fails
@@ -98,85 +247,73 @@ def send_email_via_sendgrid(to_email, subject, message):
         return False
 
 
-def notify_admin_of_student_registration(first_name, last_name, email, registration_number=None, source="registration_request"):
+def notify_admin_of_student_registration(first_name, last_name, email, registration_number=None, source="registration_request",
+                                         record_id=None):
     """
     Notify admin when a student requests registration or signs up.
 
     source: "registration_request" or "student_signup"
+    record_id: id of the RegistrationRequest or User, so each signup is announced once
     """
-    try:
-        admin_email = 'admin@riverlearn.co.ke'
-        subject = 'New Student Registration Request - RiverLearn'
-        action = 'requested registration' if source == 'registration_request' else 'signed up and is pending approval'
-
-        # Context for HTML template
-        context = {
-            'first_name': first_name,
-            'last_name': last_name,
-            'full_name': f"{first_name} {last_name}",
-            'email': email,
-            'registration_number': registration_number,
-            'action': action,
-            'admin_url': f"{settings.FRONTEND_URL}/admin",  # adjust if different
-            'dashboard_url': f"{settings.FRONTEND_URL}/dashboard",
-        }
-
-        # Plain text fallback
-        lines = [
-            f"A student has {action}.",
-            "",
-            f"Name: {first_name} {last_name}",
-            f"Email: {email}",
-        ]
-        if registration_number:
-            lines.append(f"Registration Number: {registration_number}")
-        lines.append("")
-        lines.append("Please review and take the appropriate action in the admin panel.")
-        plain_text = "\n".join(lines)
-
-        # Send HTML email using shared design language
-        result = send_html_email(
-            to_email=admin_email,
-            subject=subject,
-            template_name='emails/admin_student_signup.html',
-            context=context,
-            plain_text_fallback=plain_text,
-        )
-
-        logger.info(f"Admin notification email sent to {admin_email}, result: {result}")
-        return True
-
-    except Exception as e:
-        logger.error(f"Failed to send admin notification to {admin_email if 'admin_email' in locals() else 'admin'}: {str(e)}")
-        # Fallback to SendGrid
-        fallback_subject = 'New Student Registration Request - RiverLearn'
-        fallback_message = plain_text if 'plain_text' in locals() else 'A student requested registration.'
-        sendgrid_result = send_email_via_sendgrid('admin@riverlearn.co.ke', fallback_subject, fallback_message)
-        return bool(sendgrid_result)
+    admin_email = 'admin@riverlearn.co.ke'
+    subject = 'New Student Registration Request - RiverLearn'
+    action = 'requested registration' if source == 'registration_request' else 'signed up and is pending approval'
+
+    # Context for HTML template
+    context = {
+        'first_name': first_name,
+        'last_name': last_name,
+        'full_name': f"{first_name} {last_name}",
+        'email': email,
+        'registration_number': registration_number,
+        'action': action,
+        'admin_url': f"{settings.FRONTEND_URL}/admin",  # adjust if different
+        'dashboard_url': f"{settings.FRONTEND_URL}/dashboard",
+    }
+
+    # Plain text fallback
+    lines = [
+        f"A student has {action}.",
+        "",
+        f"Name: {first_name} {last_name}",
+        f"Email: {email}",
+    ]
+    if registration_number:
+        lines.append(f"Registration Number: {registration_number}")
+    lines.append("")
+    lines.append("Please review and take the appropriate action in the admin panel.")
+    plain_text = "\n".join(lines)
+
+    # Queue HTML email using shared design language
+    return queue_html_email(
+        idempotency_key=f"admin_notification:{source}:{record_id or uuid.uuid4().hex}",
+        category='admin_notification',
+        to_email=admin_email,
+        subject=subject,
+        template_name='emails/admin_student_signup.html',
+        context=context,
+        plain_text_fallback=plain_text,
+    )
 
 def send_verification_email(user, verification_token):
     """
-    Send email verification email to user
+    Queue the email verification email for a user
     """
-    try:
-        logger.info(f"Attempting to send verification email to {user.email}")
-        
-        # Build verification URL
-        verification_url = f"{settings.FRONTEND_URL}/verify-email?token={verification_token}"
-        logger.info(f"Verification URL: {verification_url}")
-        
-        # Email subject
-        subject = 'Verify Your Email - RiverLearn'
-        
-        # Context for HTML template
-        context = {
-            'user': user,
-            'verification_url': verification_url,
-            'user_name': user.get_full_name(),
-        }
-        
-        # Plain text fallback
-        plain_text = f"""
+    # Build verification URL
+    verification_url = f"{settings.FRONTEND_URL}/verify-email?token={verification_token}"
+    
+    # Email subject
+    subject = 'Verify Your Email - RiverLearn'
+    
+    # Context for HTML template
+    context = {
+        'user': user,
+        'verification_url': verification_url,
+        'user_name': user.get_full_name(),
+    }
+    
+    # Plain text fallback
+    plain_text = f"""
 Hello {user.get_full_name()},
 
 Thank you for registering with RiverLearn Course Organizer!
@@ -191,93 +328,56 @@ If you didn't register for this account, please ignore this email.
 
 Best regards,
 The RiverLearn Team
-        """.strip()
-        
-        logger.info(f"Email details - From: {settings.DEFAULT_FROM_EMAIL}, To: {user.email}, Subject: {subject}")
-        
-        # Send HTML email
-        result = send_html_email(
-            to_email=user.email,
-            subject=subject,
-            template_name='emails/email_verification.html',
-            context=context,
-            plain_text_fallback=plain_text
-        )
-        
-        if result:
-            logger.info(f"Verification email sent successfully to {user.email}")
-            return True
-        else:
-            raise Exception("HTML email sending failed")
-        
-    except Exception as e:
-        logger.error(f"Failed to send verification email to {user.email}: {str(e)}")
-        logger.error(f"Exception type: {type(e).__name__}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        
-        # Try SendGrid as fallback
-        logger.warning("SMTP failed, trying SendGrid as fallback...")
-        sendgrid_result = send_email_via_sendgrid(user.email, subject, plain_text)
-        
-        if sendgrid_result:
-            logger.info(f"Email sent successfully via SendGrid to {user.email}")
-            return True
-        
-        # Log the email content for manual sending if both SMTP and SendGrid fail
-        logger.error("=" * 80)
-        logger.error("MANUAL EMAIL SENDING REQUIRED")
-        logger.error("=" * 80)
-        logger.error(f"To: {user.email}")
-        logger.error(f"Subject: {subject}")
-        logger.error(f"Message:")
-        logger.error(plain_text)
-        logger.error("=" * 80)
-        
-        return False
-
-
-def send_registration_approval_email(user):
-    """
-    Send email notification when user registration is approved
-    """
-    try:
-        logger.info(f"Attempting to send approval email to {user.email}")
-        
-        subject = 'Registration Approved - RiverLearn'
-        
-        # Build URLs
-        login_url = f"{settings.FRONTEND_URL}/login"
-        dashboard_url = f"{settings.FRONTEND_URL}/dashboard"
-        
-        # Include verification link if email not verified yet
-        verification_required = False
-        verification_url = None
-        if not user.email_verified and user.email_verification_token:
-            verification_url = f"{settings.FRONTEND_URL}/verify-email?token={user.email_verification_token}"
-            verification_required = True
-            logger.info(f"User email not verified, including verification link: {verification_url}")
-        
-        # Context for HTML template
-        context = {
-            'user': user,
-            'user_name': user.get_full_name(),
-            'login_url': login_url,
-            'dashboard_url': dashboard_url,
-            'verification_required': verification_required,
-            'verification_url': verification_url,
-        }
-        
-        # Plain text fallback
-        verification_section = ""
-        if verification_required:
-            verification_section = f"""
+    """.strip()
+    
+    # A new token is a new email; the same token is only ever sent once
+    return queue_html_email(
+        idempotency_key=f"verification:{user.id}:{_key_digest(verification_token)}",
+        category='verification',
+        to_email=user.email,
+        subject=subject,
+        template_name='emails/email_verification.html',
+        context=context,
+        plain_text_fallback=plain_text,
+        user=user,
+    )
+
+
+def _registration_approval_email(user):
+    """Subject, HTML context and plain text of the approval email for a user"""
+    subject = 'Registration Approved - RiverLearn'
+    
+    # Build URLs
+    login_url = f"{settings.FRONTEND_URL}/login"
+    dashboard_url = f"{settings.FRONTEND_URL}/dashboard"
+    
+    # Include verification link if email not verified yet
+    verification_required = False
+    verification_url = None
+    if not user.email_verified and user.email_verification_token:
+        verification_url = f"{settings.FRONTEND_URL}/verify-email?token={user.email_verification_token}"
+        verification_required = True
+    
+    # Context for HTML template
+    context = {
+        'user': user,
+        'user_name': user.get_full_name(),
+        'login_url': login_url,
+        'dashboard_url': dashboard_url,
+        'verification_required': verification_required,
+        'verification_url': verification_url,
+    }
+    
+    # Plain text fallback
+    verification_section = ""
+    if verification_required:
+        verification_section = f"""
 
 If you haven't verified your email yet, please click the link below to verify:
 {verification_url}
 """
-        
-        plain_text = f"""
+    
+    plain_text = f"""
 Hello {user.get_full_name()},
 
 Great news! Your registration for RiverLearn Course Organizer has been approved.
@@ -288,69 +388,65 @@ Welcome to RiverLearn!
 
 Best regards,
 The RiverLearn Team
-        """.strip()
-        
-        logger.info(f"Email details - From: {settings.DEFAULT_FROM_EMAIL}, To: {user.email}, Subject: {subject}")
-        
-        # Send HTML email
-        result = send_html_email(
-            to_email=user.email,
-            subject=subject,
-            template_name='emails/registration_approval.html',
-            context=context,
-            plain_text_fallback=plain_text
-        )
-        
-        if result:
-            logger.info(f"Registration approval email sent successfully to {user.email}")
-            return True
-        else:
-            raise Exception("HTML email sending failed")
-        
-    except Exception as e:
-        logger.error(f"Failed to send approval email to {user.email}: {str(e)}")
-        logger.error(f"Exception type: {type(e).__name__}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        
-        # Try SendGrid as fallback
-        logger.warning("SMTP failed, trying SendGrid as fallback...")
-        sendgrid_result = send_email_via_sendgrid(user.email, subject, plain_text)
-        
-        if sendgrid_result:
-            logger.info(f"Email sent successfully via SendGrid to {user.email}")
-            return True
-        
-        # Log the email content for manual sending if both SMTP and SendGrid fail
-        logger.error("=" * 80)
-        logger.error("MANUAL EMAIL SENDING REQUIRED")
-        logger.error("=" * 80)
-        logger.error(f"To: {user.email}")
-        logger.error(f"Subject: {subject}")
-        logger.error(f"Message:")
-        logger.error(plain_text)
-        logger.error("=" * 80)
-        
-        return False
+    """.strip()
+    
+    return subject, context, plain_text
+
+
+def send_registration_approval_email(user):
+    """
+    Queue the email notification for an approved registration
+    """
+    subject, context, plain_text = _registration_approval_email(user)
+    return queue_html_email(
+        idempotency_key=f"approval:{user.id}:{_event_stamp(user)}",
+        category='approval',
+        to_email=user.email,
+        subject=subject,
+        template_name='emails/registration_approval.html',
+        context=context,
+        plain_text_fallback=plain_text,
+        user=user,
+    )
+
+
+def send_registration_approval_emails(users):
+    """
+    Queue approval emails for many users at once.
+
+    Returns:
+        Dict mapping each user id to True (queued) or False (failed)
+    """
+    recipients, keys = [], {}
+    for user in users:
+        subject, context, plain_text = _registration_approval_email(user)
+        keys[user.id] = f"approval:{user.id}:{_event_stamp(user)}"
+        recipients.append({
+            'key': keys[user.id], 'to_email': user.email, 'subject': subject,
+            'context': context, 'plain_text_fallback': plain_text, 'user': user,
+        })
+    results = queue_bulk_html_email('approval', 'emails/registration_approval.html', recipients)
+    return {user.id: results[keys[user.id]] for user in users}
 
 
 def send_registration_rejection_email(user, reason=None):
     """
-    Send email notification when user registration is rejected
+    Queue the email notification for a rejected registration
     """
-    try:
-        subject = 'Registration Update - Course Organizer'
-        
-        message = f"""
+    from .email_outbox import queue_email
+
+    subject = 'Registration Update - Course Organizer'
+    
+    message = f"""
 Hello {user.get_full_name()},
 
 We regret to inform you that your registration for Course Organizer could not be approved at this time.
-        """
-        
-        if reason:
-            message += f"\n\nReason: {reason}"
-        
-        message += """
+    """
+    
+    if reason:
+        message += f"\n\nReason: {reason}"
+    
+    message += """
 
 If you believe this is an error or would like to appeal this decision, please contact the administration.
 
@@ -359,51 +455,34 @@ Thank you for your interest in Course Organizer.
 Best regards,
 Course Organizer Team
 University of Nairobi Law School
-        """.strip()
-        
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
-        
-        logger.info(f"Registration rejection email sent to {user.email}")
+    """.strip()
+    
+    try:
+        queue_email(f"rejection:{user.id}:{_event_stamp(user)}", 'rejection', user.email, subject, message.strip(), user=user)
+        logger.info(f"Queued rejection email to {user.email}")
         return True
-        
     except Exception as e:
-        logger.error(f"Failed to send rejection email to {user.email}: {str(e)}")
-        
-        # Try SendGrid as fallback
-        logger.warning("SMTP failed, trying SendGrid as fallback...")
-        sendgrid_result = send_email_via_sendgrid(user.email, subject, message)
-        
-        if sendgrid_result:
-            logger.info(f"Email sent successfully via SendGrid to {user.email}")
-            return True
-        
+        logger.error(f"Failed to queue rejection email to {user.email}: {str(e)}")
         return False
 
 
 def send_password_reset_email(user, reset_token):
     """
-    Send password reset email to user
+    Queue the password reset email for a user
     """
-    try:
-        reset_url = f"{settings.FRONTEND_URL}/reset-password?token={reset_token}"
-        
-        subject = 'Password Reset - RiverLearn'
-        
-        # Context for HTML template
-        context = {
-            'user': user,
-            'user_name': user.get_full_name(),
-            'reset_url': reset_url,
-        }
-        
-        # Plain text fallback
-        plain_text = f"""
+    reset_url = f"{settings.FRONTEND_URL}/reset-password?token={reset_token}"
+    
+    subject = 'Password Reset - RiverLearn'
+    
+    # Context for HTML template
+    context = {
+        'user': user,
+        'user_name': user.get_full_name(),
+        'reset_url': reset_url,
+    }
+    
+    # Plain text fallback
+    plain_text = f"""
 Hello {user.get_full_name()},
 
 You requested a password reset for your RiverLearn Course Organizer account.
@@ -418,38 +497,18 @@ If you didn't request this password reset, please ignore this email.
 
 Best regards,
 The RiverLearn Team
-        """.strip()
-        
-        # Send HTML email
-        result = send_html_email(
-            to_email=user.email,
-            subject=subject,
-            template_name='emails/password_reset.html',
-            context=context,
-            plain_text_fallback=plain_text
-        )
-        
-        if result:
-            logger.info(f"Password reset email sent successfully to {user.email}")
-            return True
-        else:
-            raise Exception("HTML email sending failed")
-        
-    except Exception as e:
-        logger.error(f"Failed to send password reset email to {user.email}: {str(e)}")
-        logger.error(f"Exception type: {type(e).__name__}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        
-        # Try SendGrid as fallback
-        logger.warning("SMTP failed, trying SendGrid as fallback...")
-        sendgrid_result = send_email_via_sendgrid(user.email, subject, plain_text)
-        
-        if sendgrid_result:
-            logger.info(f"Email sent successfully via SendGrid to {user.email}")
-            return True
-        
-        return False
+    """.strip()
+    
+    return queue_html_email(
+        idempotency_key=f"password_reset:{user.id}:{_key_digest(reset_token)}",
+        category='password_reset',
+        to_email=user.email,
+        subject=subject,
+        template_name='emails/password_reset.html',
+        context=context,
+        plain_text_fallback=plain_text,
+        user=user,
+    )
 
 
 def test_email_connection(test_email=None):
@@ -490,30 +549,27 @@ Course Organizer Team
         return False
 
 
-def send_announcement_notification_email(user, announcement):
-    """
-    Send email notification for new announcement
-    """
-    try:
-        context = {
-            'user': user,
-            'announcement': announcement,
-            'site_url': settings.FRONTEND_URL,
-            'site_name': 'RiverLearn'
-        }
-        
-        # Determine subject based on priority
-        priority_emoji = {
-            'low': '📢',
-            'normal': '📢',
-            'high': '⚠️',
-            'urgent': '🚨'
-        }
-        
-        emoji = priority_emoji.get(announcement.priority, '📢')
-        subject = f"{emoji} New Announcement: {announcement.title}"
-        
-        plain_text_fallback = f"""
+def _announcement_email(user, announcement):
+    """Subject, HTML context and plain text of the announcement email for a user"""
+    context = {
+        'user': user,
+        'announcement': announcement,
+        'site_url': settings.FRONTEND_URL,
+        'site_name': 'RiverLearn'
+    }
+    
+    # Determine subject based on priority
+    priority_emoji = {
+        'low': '📢',
+        'normal': '📢',
+        'high': '⚠️',
+        'urgent': '🚨'
+    }
+    
+    emoji = priority_emoji.get(announcement.priority, '📢')
+    subject = f"{emoji} New Announcement: {announcement.title}"
+    
+    plain_text_fallback = f"""
 New Announcement: {announcement.title}
 
 {announcement.content}
@@ -523,16 +579,41 @@ Class: {announcement.student_class.display_name}
 Posted: {announcement.created_at.strftime('%B %d, %Y at %I:%M %p')}
 
 View all announcements: {settings.FRONTEND_URL}/announcements
-        """.strip()
-        
-        return send_html_email(
-            to_email=user.email,
-            subject=subject,
-            template_name="emails/new_announcement.html",
-            context=context,
-            plain_text_fallback=plain_text_fallback
-        )
-        
-    except Exception as e:
-        logger.error(f"Failed to send announcement notification to {user.email}: {str(e)}")
-        return False
+    """.strip()
+    
+    return subject, context, plain_text_fallback
+
+
+def send_announcement_notification_email(user, announcement):
+    """
+    Queue the email notification for a new announcement
+    """
+    subject, context, plain_text_fallback = _announcement_email(user, announcement)
+    return queue_html_email(
+        idempotency_key=f"announcement:{announcement.id}:{user.id}",
+        category='announcement',
+        to_email=user.email,
+        subject=subject,
+        template_name="emails/new_announcement.html",
+        context=context,
+        plain_text_fallback=plain_text_fallback,
+        user=user,
+    )
+
+
+def send_announcement_notification_emails(users, announcement):
+    """
+    Queue an announcement email for many users at once.
+
+    Returns:
+        Dict mapping each user id to True (queued) or False (failed)
+    """
+    recipients = []
+    for user in users:
+        subject, context, plain_text = _announcement_email(user, announcement)
+        recipients.append({
+            'key': f"announcement:{announcement.id}:{user.id}", 'to_email': user.email, 'subject': subject,
+            'context': context, 'plain_text_fallback': plain_text, 'user': user,
+        })
+    results = queue_bulk_html_email('announcement', 'emails/new_announcement.html', recipients)
+    return {user.id: results[f"announcement:{announcement.id}:{user.id}"] for user in users}
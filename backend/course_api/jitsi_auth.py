@@ -1,20 +1,64 @@
 """
 Jitsi Meet JWT Authentication Module
 Handles JWT token generation for secure Jitsi Meet integration
+
+RSA signing is expensive, so ``get_token()`` keeps signed tokens in the
+Django cache under (user, room, moderator) and reuses them until
+``REFRESH_BEFORE`` seconds before they expire. The PEM keys are parsed once
+per process and shared by every ``JitsiJWTAuth`` instance.
+``presign_meeting_tokens()`` signs the tokens for a meeting's whole class in
+one go; ``Meeting.save`` queues it to run shortly before the lecture starts.
 """
 
+import calendar
 import jwt
 import time
 import hashlib
 import hmac
 from datetime import datetime, timedelta
+from functools import lru_cache
 from django.conf import settings
 from django.contrib.auth.models import User
-from typing import Dict, Any, Optional
+from django.core.cache import cache
+from typing import Dict, Any, Iterable, Optional
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.backends import default_backend
 
+TOKEN_LIFETIME = 24 * 60 * 60
+REFRESH_BEFORE = 2 * 60 * 60
+PRESIGN_LEAD = timedelta(minutes=30)
+
+
+@lru_cache(maxsize=None)
+def _load_keys(private_key_pem, public_key_pem):
+    """Parse (or, without a configured key, generate) the RSA key pair once per process"""
+    if private_key_pem:
+        private_key = serialization.load_pem_private_key(
+            private_key_pem.encode(),
+            password=None,
+            backend=default_backend()
+        )
+    else:
+        # Generate a new key pair for testing
+        private_key = rsa.generate_private_key(
+            public_exponent=65537,
+            key_size=2048,
+            backend=default_backend()
+        )
+    if public_key_pem:
+        public_key = serialization.load_pem_public_key(
+            public_key_pem.encode(),
+            backend=default_backend()
+        )
+    else:
+        # Use the public key from the private key
+        public_key = private_key.public_key()
+    fingerprint = hashlib.sha256(public_key.public_bytes(
+        serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+    )).hexdigest()[:16]
+    return private_key, public_key, fingerprint
+
 
 class JitsiJWTAuth:
     """JWT authentication for Jitsi Meet"""
@@ -26,40 +70,22 @@ class JitsiJWTAuth:
         self.issuer = getattr(settings, 'JITSI_ISSUER', 'course-organizer')
         self.audience = getattr(settings, 'JITSI_AUDIENCE', 'jitsi')
         self.algorithm = 'RS256'  # Use RSA instead of HMAC
-        
-        # Load RSA keys
-        self.private_key = self._load_private_key()
-        self.public_key = self._load_public_key()
     
-    def _load_private_key(self):
-        """Load RSA private key from settings or generate one"""
-        private_key_pem = getattr(settings, 'JITSI_PRIVATE_KEY', None)
-        if private_key_pem:
-            return serialization.load_pem_private_key(
-                private_key_pem.encode(),
-                password=None,
-                backend=default_backend()
-            )
-        else:
-            # Generate a new key pair for testing
-            return rsa.generate_private_key(
-                public_exponent=65537,
-                key_size=2048,
-                backend=default_backend()
-            )
+    def _keys(self):
+        # Parsed on first use and then shared, see _load_keys
+        return _load_keys(getattr(settings, 'JITSI_PRIVATE_KEY', None), getattr(settings, 'JITSI_PUBLIC_KEY', None))
+    
+    @property
+    def private_key(self):
+        return self._keys()[0]
+    
+    @property
+    def public_key(self):
+        return self._keys()[1]
+    
+    def _display_name(self, user, display_name=None):
+        return display_name or f"{user.first_name} {user.last_name}".strip() or user.username
     
-    def _load_public_key(self):
-        """Load RSA public key from settings or generate one"""
-        public_key_pem = getattr(settings, 'JITSI_PUBLIC_KEY', None)
-        if public_key_pem:
-            return serialization.load_pem_public_key(
-                public_key_pem.encode(),
-                backend=default_backend()
-            )
-        else:
-            # Use the public key from the private key
-            return self.private_key.public_key()
-        
     def generate_token(self, user: User, room_name: str, 
                       moderator: bool = False, 
                       display_name: Optional[str] = None,
@@ -77,7 +103,12 @@ class JitsiJWTAuth:
         Returns:
             JWT token string
         """
+        return self._sign(user, room_name, moderator, display_name, avatar_url)[0]
+    
+    def _sign(self, user, room_name, moderator=False, display_name=None, avatar_url=None):
+        """Sign a token; returns (token, exp as a Unix timestamp)"""
         now = datetime.utcnow()
+        exp = now + timedelta(seconds=TOKEN_LIFETIME)
         
         # Token payload
         payload = {
@@ -85,13 +116,13 @@ class JitsiJWTAuth:
             'aud': self.audience,
             'sub': self.app_id,
             'room': room_name,
-            'exp': now + timedelta(hours=24),  # Token expires in 24 hours
+            'exp': exp,  # Token expires in 24 hours
             'iat': now,
             'nbf': now,
             'context': {
                 'user': {
                     'id': str(user.id),
-                    'name': display_name or f"{user.first_name} {user.last_name}".strip() or user.username,
+                    'name': self._display_name(user, display_name),
                     'email': user.email,
                     'avatar': avatar_url or '',
                     'moderator': moderator
@@ -111,8 +142,65 @@ class JitsiJWTAuth:
             'kid': self.app_id  # Key ID for RSA
         }
         token = jwt.encode(payload, self.private_key, algorithm=self.algorithm, headers=headers)
+        return token, calendar.timegm(exp.utctimetuple())
+    
+    def _cache_key(self, user, room_name, moderator, display_name=None, avatar_url=None):
+        # Anything else that ends up in the token, including the signing key, is part of the key
+        claims = '|'.join([
+            self._display_name(user, display_name), user.email or '', avatar_url or '',
+            self.issuer, self.audience, self.app_id, self._keys()[2],
+        ])
+        digest = hashlib.md5(claims.encode()).hexdigest()[:12]
+        return f"jitsi_jwt:{user.id}:{room_name}:{int(bool(moderator))}:{digest}"
+    
+    def get_token(self, user: User, room_name: str,
+                  moderator: bool = False,
+                  display_name: Optional[str] = None,
+                  avatar_url: Optional[str] = None) -> str:
+        """
+        Get a JWT token for Jitsi Meet, reusing a cached one until it nears expiry
+        
+        Takes the same arguments as generate_token.
+        """
+        key = self._cache_key(user, room_name, moderator, display_name, avatar_url)
+        entry = cache.get(key)
+        if entry and entry['exp'] - time.time() > REFRESH_BEFORE:
+            return entry['token']
+        token, exp = self._sign(user, room_name, moderator, display_name, avatar_url)
+        cache.set(key, {'token': token, 'exp': exp}, TOKEN_LIFETIME - REFRESH_BEFORE)
         return token
     
+    def presign_tokens(self, users: Iterable[User], room_name: str,
+                       moderator_ids: Iterable[int] = ()) -> Dict[int, str]:
+        """
+        Make sure every user has a cached token for a room, signing only missing ones
+        
+        Args:
+            users: Django User objects
+            room_name: Jitsi room name
+            moderator_ids: IDs of the users who join as moderators
+            
+        Returns:
+            Dict mapping each user id to their token
+        """
+        moderator_ids = set(moderator_ids)
+        keys = {user.id: (user, self._cache_key(user, room_name, user.id in moderator_ids)) for user in users}
+        cached = cache.get_many([key for _, key in keys.values()])
+        now = time.time()
+        
+        tokens, fresh = {}, {}
+        for user_id, (user, key) in keys.items():
+            entry = cached.get(key)
+            if entry and entry['exp'] - now > REFRESH_BEFORE:
+                tokens[user_id] = entry['token']
+                continue
+            token, exp = self._sign(user, room_name, user_id in moderator_ids)
+            tokens[user_id] = token
+            fresh[key] = {'token': token, 'exp': exp}
+        if fresh:
+            cache.set_many(fresh, TOKEN_LIFETIME - REFRESH_BEFORE)
+        return tokens
+    
     def verify_token(self, token: str) -> Dict[str, Any]:
         """
         Verify JWT token
@@ -217,5 +305,31 @@ class JitsiJWTAuth:
         return False
 
 
+def presign_meeting_tokens(meeting):
+    """
+    Sign tokens for everyone expected at a meeting: the students whose class
+    sees the course, plus the creator and host
+    
+    Returns:
+        Dict mapping each user id to their token
+    """
+    from django.db.models import Q
+    from directory.models import User as Member
+    from .course_visibility import get_visible_course_ids_for_classes
+    
+    students = Member.objects.filter(user_type='student', status='approved', is_active=True, student_class__isnull=False)
+    visible = get_visible_course_ids_for_classes(
+        set(students.values_list('student_class_id', flat=True)), meeting.course.academic_year_id
+    )
+    class_ids = [class_id for class_id, course_ids in visible.items() if meeting.course_id in course_ids]
+    hosts = [meeting.created_by_id, meeting.admin_host_id]
+    users = list(Member.objects.filter(
+        Q(pk__in=students.filter(student_class_id__in=class_ids).values('pk')) | Q(pk__in=[pk for pk in hosts if pk])
+    ))
+    # Same rule as is_user_moderator
+    moderator_ids = [u.id for u in users if u.is_staff or u.is_superuser or u.id == meeting.created_by_id]
+    return jitsi_auth.presign_tokens(users, meeting.jitsi_token_room_name, moderator_ids)
+
+
 # Global instance
 jitsi_auth = JitsiJWTAuth()
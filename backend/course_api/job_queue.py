@@ -0,0 +1,173 @@
+"""
+Durable, database-backed job queue.
+
+Work that should not run inside a request (email fan-out and the like) is
+stored as a ``BackgroundJob`` row and executed by ``manage.py run_jobs``.
+Handlers are plain functions registered with ``@job_handler('kind')`` in an
+app's ``jobs.py``; the worker autodiscovers those modules.
+
+A handler receives the job and either returns (the job succeeds) or raises
+(the job is retried). It may rewrite ``job.payload`` before raising so a
+retry only redoes what is left, e.g. the recipients whose email failed.
+Failed jobs are retried with exponential backoff until ``max_attempts`` is
+reached, then parked as ``dead`` for inspection; ``requeue()`` revives them.
+
+Jobs are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the
+database supports it, so several workers can share the queue. A job whose
+worker died mid-run is picked up again once its lock is ``LOCK_TIMEOUT``
+seconds old.
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+LOCK_TIMEOUT = 15 * 60
+DEFAULT_MAX_ATTEMPTS = 5
+
+_handlers = {}
+
+
+def job_handler(kind):
+    """Register the decorated function as the handler for jobs of this kind"""
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def autodiscover():
+    """Import every installed app's jobs module so its handlers register"""
+    from django.utils.module_loading import autodiscover_modules
+    autodiscover_modules('jobs')
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(kind, payload=None, run_at=None, max_attempts=DEFAULT_MAX_ATTEMPTS, parent=None):
+    """
+    Store a job for the worker.
+
+    Inside a transaction the job only becomes visible to workers once it commits,
+    so it never runs against rows the caller has not committed yet.
+
+    Returns:
+        The created BackgroundJob
+    """
+    from .models import BackgroundJob
+    return BackgroundJob.objects.create(
+        kind=kind,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts,
+        parent=parent,
+    )
+
+
+def enqueue_many(kind, payloads, max_attempts=DEFAULT_MAX_ATTEMPTS, parent=None):
+    """Store one job per payload with a single insert"""
+    from .models import BackgroundJob
+    now = timezone.now()
+    return BackgroundJob.objects.bulk_create([
+        BackgroundJob(kind=kind, payload=payload, run_at=now, max_attempts=max_attempts, parent=parent)
+        for payload in payloads
+    ])
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before retry number `attempts`, with jitter so retries spread out"""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(limit=10, kinds=None, worker=None, exclude_kinds=None):
+    """
+    Lock up to `limit` due jobs for this worker.
+
+    `kinds` restricts the batch to those job kinds and `exclude_kinds` leaves
+    some out, so slow kinds can get workers of their own.
+
+    Returns:
+        List of BackgroundJob rows now marked running
+    """
+    from django.db.models import F, Q
+    from .models import BackgroundJob
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=LOCK_TIMEOUT)
+    with transaction.atomic():
+        due = BackgroundJob.objects.filter(
+            Q(status='pending', run_at__lte=now) | Q(status='running', locked_at__lt=stale)
+        )
+        if kinds:
+            due = due.filter(kind__in=kinds)
+        if exclude_kinds:
+            due = due.exclude(kind__in=exclude_kinds)
+        jobs = list(due.select_for_update(skip_locked=True).order_by('run_at', 'id')[:limit])
+        if jobs:
+            BackgroundJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status='running', locked_at=now, locked_by=worker or worker_name(),
+                attempts=F('attempts') + 1,
+            )
+            for job in jobs:
+                job.status, job.locked_at, job.attempts = 'running', now, job.attempts + 1
+    return jobs
+
+
+def run_job(job):
+    """Run one claimed job and record its outcome"""
+    handler = _handlers.get(job.kind)
+    now = timezone.now()
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        handler(job)
+    except Exception as e:
+        job.last_error = f"{type(e).__name__}: {e}\n{traceback.format_exc()}"[-4000:]
+        job.locked_at, job.locked_by = None, ''
+        if job.attempts >= job.max_attempts or handler is None:
+            job.status, job.finished_at = 'dead', now
+            logger.error(f"Job {job} is dead after {job.attempts} attempt(s): {e}")
+        else:
+            job.status = 'pending'
+            job.run_at = now + timedelta(seconds=backoff_delay(job.attempts))
+            logger.warning(f"Job {job} failed (attempt {job.attempts}/{job.max_attempts}), retrying at {job.run_at}: {e}")
+        job.save(update_fields=['status', 'payload', 'last_error', 'locked_at', 'locked_by', 'run_at', 'finished_at', 'updated_at'])
+        return False
+
+    job.status, job.finished_at = 'succeeded', now
+    job.locked_at, job.locked_by, job.last_error = None, '', ''
+    job.save(update_fields=['status', 'payload', 'last_error', 'locked_at', 'locked_by', 'finished_at', 'updated_at'])
+    return True
+
+
+def run_pending(limit=10, kinds=None, worker=None, exclude_kinds=None):
+    """
+    Claim and run one batch of due jobs.
+
+    Returns:
+        (succeeded, failed) counts
+    """
+    succeeded = failed = 0
+    for job in claim(limit=limit, kinds=kinds, worker=worker, exclude_kinds=exclude_kinds):
+        if run_job(job):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+def requeue(queryset):
+    """Put dead (or any) jobs back in the queue with a fresh attempt budget"""
+    return queryset.update(status='pending', attempts=0, run_at=timezone.now(), locked_at=None, locked_by='', finished_at=None)
@@ -0,0 +1,26 @@
+"""Background jobs for course_api, run by manage.py run_jobs"""
+from .job_queue import job_handler
+
+
+@job_handler('provision_daily_room')
+def provision_daily_room(job):
+    """Create a new meeting's Daily.co room; failures are retried with backoff"""
+    from .models import Meeting
+
+    meeting = Meeting.objects.select_related('course', 'timetable_entry').filter(pk=job.payload['meeting_id']).first()
+    if meeting is None:
+        # Deleted before the worker got to it
+        return
+    meeting.provision_daily_room()
+
+
+@job_handler('presign_jitsi_tokens')
+def presign_jitsi_tokens(job):
+    """Sign the Jitsi tokens for a meeting's class before it starts, so joining only reads the cache"""
+    from .jitsi_auth import presign_meeting_tokens
+    from .models import Meeting
+
+    meeting = Meeting.objects.select_related('course').filter(pk=job.payload['meeting_id']).first()
+    if meeting is None or meeting.status not in Meeting.JOINABLE_STATUSES:
+        return
+    presign_meeting_tokens(meeting)
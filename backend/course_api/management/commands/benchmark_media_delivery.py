@@ -0,0 +1,69 @@
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare media delivery modes: Django streaming the whole file, Django serving '
+        '206 ranges (seeking) and X-Accel-Redirect hand-off to nginx'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=200, help='Size of the generated recording')
+        parser.add_argument('--requests', type=int, default=10, help='Requests per mode')
+        parser.add_argument('--range-kb', type=int, default=1024, help='Bytes asked for by each range request')
+
+    def handle(self, *args, **options):
+        size = options['size_mb'] * 1024 * 1024
+        range_size = options['range_kb'] * 1024
+        count = options['requests']
+
+        with tempfile.TemporaryDirectory() as media_root:
+            path = os.path.join(media_root, 'recordings', 'lecture.mp4')
+            os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as f:
+                block = os.urandom(1024 * 1024)
+                for _ in range(options['size_mb']):
+                    f.write(block)
+
+            def ranged():
+                start = random.randrange(0, max(size - range_size, 1))
+                return {'HTTP_RANGE': f'bytes={start}-{start + range_size - 1}'}
+
+            modes = [
+                ('django, full file', '', lambda: {}),
+                ('django, 206 range', '', ranged),
+                ('x-accel-redirect', '/protected-media/', lambda: {}),
+            ]
+            self.stdout.write(f"{count} request(s) per mode against a {options['size_mb']} MB file")
+            self.stdout.write(f"{'mode':<20}{'status':>8}{'ms/request':>14}{'MB through worker':>20}")
+            for label, prefix, headers in modes:
+                with override_settings(MEDIA_ROOT=media_root, MEDIA_ACCEL_REDIRECT_PREFIX=prefix):
+                    elapsed, sent, status = self._run(count, headers)
+                self.stdout.write(
+                    f"{label:<20}{status:>8}{elapsed * 1000 / count:>14.2f}{sent / count / 1024 / 1024:>20.2f}"
+                )
+
+    def _run(self, count, headers):
+        """Time requests through serve_media, reading every body byte like a WSGI server would"""
+        from course_organizer.views import serve_media
+
+        factory = RequestFactory()
+        elapsed = sent = 0
+        status = None
+        for _ in range(count):
+            request = factory.get('/media/recordings/lecture.mp4', **headers())
+            started = time.perf_counter()
+            response = serve_media(request, 'recordings/lecture.mp4')
+            body = response.streaming_content if response.streaming else [response.content]
+            for chunk in body:
+                sent += len(chunk)
+            response.close()
+            elapsed += time.perf_counter() - started
+            status = response.status_code
+        return elapsed, sent, status
@@ -0,0 +1,69 @@
+import logging
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between attempts while the database (or anything else) keeps failing
+MAX_ERROR_BACKOFF = 60.0
+# How often sent and dead rows past their retention are deleted
+PURGE_INTERVAL = 3600.0
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails from the outbox, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        from course_api.email_outbox import BATCH_SIZE, MAX_CONCURRENCY
+        parser.add_argument('--once', action='store_true', help='Send the emails that are due now, then exit')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Emails sent per SMTP connection')
+        parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENCY, help='SMTP connections used at once')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the outbox is empty')
+
+    def handle(self, *args, **options):
+        from course_api.email_outbox import drain, purge
+
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        batch_size, concurrency = options['batch_size'], options['concurrency']
+        total_sent = total_failed = 0
+        errors = 0
+        next_purge = 0.0
+        while not self._stopping:
+            close_old_connections()
+            try:
+                sent, failed = drain(limit=batch_size * concurrency, batch_size=batch_size, concurrency=concurrency)
+                if time.monotonic() >= next_purge:
+                    purged = purge()
+                    if purged:
+                        self.stdout.write(f"Purged {purged} old email(s)")
+                    next_purge = time.monotonic() + PURGE_INTERVAL
+            except Exception:
+                if options['once']:
+                    raise
+                # e.g. a database failover: nothing supervises the worker, so keep it alive
+                logger.exception("Outbox worker iteration failed")
+                close_old_connections()
+                errors += 1
+                time.sleep(min(options['sleep'] * 2 ** errors, MAX_ERROR_BACKOFF))
+                continue
+            errors = 0
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} email(s), {failed} failed")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Outbox drained: {total_sent} sent, {total_failed} failed"))
+
+    def _stop(self, signum, frame):
+        """Finish the current batch, then exit"""
+        self._stopping = True
@@ -0,0 +1,69 @@
+import logging
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between attempts while the database (or anything else) keeps failing
+MAX_ERROR_BACKOFF = 60.0
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (announcement emails and other deferred work)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due now, then exit')
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs claimed per poll')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--kind', action='append', dest='kinds', help='Only run jobs of this kind (repeatable)')
+        parser.add_argument('--exclude-kind', action='append', dest='exclude_kinds',
+                            help='Never run jobs of this kind (repeatable)')
+
+    def handle(self, *args, **options):
+        from course_api.job_queue import autodiscover, run_pending, worker_name
+
+        autodiscover()
+        worker = worker_name()
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        self.stdout.write(f"Job worker {worker} started")
+        total_ok = total_failed = 0
+        errors = 0
+        while not self._stopping:
+            close_old_connections()
+            try:
+                ok, failed = run_pending(
+                    limit=options['batch_size'], kinds=options['kinds'], exclude_kinds=options['exclude_kinds'],
+                    worker=worker,
+                )
+            except Exception:
+                if options['once']:
+                    raise
+                # e.g. a database failover: nothing supervises the worker, so keep it alive
+                logger.exception("Job worker iteration failed")
+                close_old_connections()
+                errors += 1
+                time.sleep(min(options['sleep'] * 2 ** errors, MAX_ERROR_BACKOFF))
+                continue
+            errors = 0
+            total_ok += ok
+            total_failed += failed
+            if ok or failed:
+                self.stdout.write(f"Ran {ok + failed} job(s): {ok} succeeded, {failed} failed")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Job worker {worker} stopped: {total_ok} succeeded, {total_failed} failed"
+        ))
+
+    def _stop(self, signum, frame):
+        """Finish the current batch, then exit"""
+        self._stopping = True
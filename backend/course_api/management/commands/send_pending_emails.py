@@ -7,7 +7,7 @@ logger = logging.getLogger(__name__)
 
 
 class Command(BaseCommand):
-    help = 'Send pending emails that failed to send via SMTP'
+    help = 'Resend a verification or approval email through the outbox and send it now'
 
     def add_arguments(self, parser):
         parser.add_argument('--user-id', type=int, help='User ID to send email to')
@@ -28,7 +28,12 @@ class Command(BaseCommand):
             return
         
         # Import email service functions
-        from .email_service import send_verification_email, send_registration_approval_email
+        from course_api.email_outbox import drain
+        from course_api.email_service import send_verification_email, send_registration_approval_email
+        from course_api.models import EmailOutbox
+        
+        # Queuing is idempotent and sent rows keep no body, so drop finished rows to render the email afresh
+        EmailOutbox.objects.filter(user=user, category=email_type, status__in=['sent', 'dead']).delete()
         
         if email_type == 'verification':
             if not user.email_verification_token:
@@ -42,8 +47,13 @@ class Command(BaseCommand):
             self.stdout.write(f"Sending approval email to {user.email}...")
             result = send_registration_approval_email(user)
         
-        if result:
-            self.stdout.write(self.style.SUCCESS(f'Email sent successfully to {user.email}'))
+        if not result:
+            self.stdout.write(self.style.ERROR(f'Failed to queue email for {user.email}'))
+            return
+        
+        sent, failed = drain()
+        if failed:
+            self.stdout.write(self.style.ERROR(f'Failed to send {failed} email(s); they will be retried by the outbox worker'))
+            self.stdout.write(self.style.WARNING('Check the logs and the Email outbox admin'))
         else:
-            self.stdout.write(self.style.ERROR(f'Failed to send email to {user.email}'))
-            self.stdout.write(self.style.WARNING('Check the logs for manual email content'))
+            self.stdout.write(self.style.SUCCESS(f'Sent {sent} email(s) from the outbox'))
@@ -0,0 +1,118 @@
+"""
+In-process directory of study group members for @mention autocomplete.
+
+Each group's members are loaded once into a ``MemberDirectory`` holding a
+sorted list of normalized prefix keys (every word of the full name, the full
+name itself and the registration number). Lookups bisect into that list, so a
+warm keystroke costs no database query.
+
+Directories live in a small LRU shared by the threads of one process. Signal
+handlers drop a group's entry when its memberships or a member's name change,
+and bump a version stamp in the Django cache so other workers notice on their
+next lookup. A TTL bounds staleness when the cache backend is process-local.
+"""
+import bisect
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+MAX_GROUPS = 256
+TTL_SECONDS = 300
+
+
+def normalize(text):
+    """Lower-case and strip accents so 'Émile' matches 'emile'"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower().strip()
+
+
+class MemberDirectory:
+    """Prefix index over one group's members"""
+
+    def __init__(self, users):
+        self.members = []
+        keys = []
+        for user in sorted(users, key=lambda u: normalize(u.get_full_name())):
+            index = len(self.members)
+            self.members.append({
+                'id': user.id,
+                'name': user.get_full_name(),
+                'registration_number': user.registration_number,
+                'profile_picture': user.profile_picture.url if user.profile_picture else None,
+            })
+            name = normalize(user.get_full_name())
+            for key in {name, *name.split(), normalize(user.registration_number)}:
+                if key:
+                    keys.append((key, index))
+        keys.sort()
+        self._keys = [k for k, _ in keys]
+        self._indexes = [i for _, i in keys]
+        self._member_ids = {m['id'] for m in self.members}
+
+    def has_member(self, user_id):
+        return user_id in self._member_ids
+
+    def search(self, query='', exclude_user_id=None, limit=10):
+        """Members with any key starting with query, in name order"""
+        query = normalize(query)
+        if not query:
+            matches = range(len(self.members))
+        else:
+            matches = set()
+            position = bisect.bisect_left(self._keys, query)
+            while position < len(self._keys) and self._keys[position].startswith(query):
+                matches.add(self._indexes[position])
+                position += 1
+            matches = sorted(matches)
+        results = []
+        for index in matches:
+            member = self.members[index]
+            if member['id'] == exclude_user_id:
+                continue
+            results.append(member)
+            if len(results) >= limit:
+                break
+        return results
+
+
+_directories = OrderedDict()  # group_id -> (version, loaded_at, MemberDirectory)
+_lock = threading.Lock()
+
+
+def _version_key(group_id):
+    return f'member_directory:{group_id}'
+
+
+def get_member_directory(group_id):
+    """Return the cached directory for a group, loading it with one query on a miss"""
+    version = cache.get(_version_key(group_id))
+    now = time.monotonic()
+    with _lock:
+        entry = _directories.get(group_id)
+        if entry and entry[0] == version and now - entry[1] < TTL_SECONDS:
+            _directories.move_to_end(group_id)
+            return entry[2]
+
+    from .models import StudyGroupMembership
+    from directory.models import User
+    users = User.objects.filter(
+        id__in=StudyGroupMembership.objects.filter(group_id=group_id).values('user_id')
+    ).only('id', 'first_name', 'last_name', 'registration_number', 'profile_picture')
+    directory = MemberDirectory(users)
+
+    with _lock:
+        _directories[group_id] = (version, now, directory)
+        _directories.move_to_end(group_id)
+        while len(_directories) > MAX_GROUPS:
+            _directories.popitem(last=False)
+    return directory
+
+
+def invalidate_member_directory(group_id):
+    """Forget a group's directory here and in every other worker"""
+    with _lock:
+        _directories.pop(group_id, None)
+    cache.set(_version_key(group_id), time.time_ns(), None)
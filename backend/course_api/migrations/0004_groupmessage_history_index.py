@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course_api', '0003_add_group_materials'),
+        ('course_content', '0002_alter_announcement_file_url_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupmessage',
+            index=models.Index(fields=['group', 'created_at', 'id'], name='course_api__group_i_3afc83_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def build_topic_index(apps, schema_editor):
+    """Backfill the index from existing, non-deleted messages"""
+    GroupMessage = apps.get_model('course_api', 'GroupMessage')
+    GroupTopic = apps.get_model('course_api', 'GroupTopic')
+
+    index = {}
+    messages = GroupMessage.objects.filter(deleted=False).exclude(topics=[]).values_list('group_id', 'topics', 'created_at')
+    for group_id, topics, created_at in messages.iterator():
+        if not isinstance(topics, list):
+            continue
+        keys = {t.lstrip('#').lower()[:100]: t for t in topics if isinstance(t, str) and t}
+        for key, name in keys.items():
+            entry = index.setdefault((group_id, key), {'name': name[:100], 'count': 0, 'last': created_at})
+            entry['count'] += 1
+            entry['last'] = max(entry['last'], created_at)
+
+    GroupTopic.objects.bulk_create([
+        GroupTopic(group_id=group_id, key=key, name=e['name'], message_count=e['count'], last_used_at=e['last'])
+        for (group_id, key), e in index.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course_api', '0004_groupmessage_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupTopic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Lower-cased topic used for prefix lookups', max_length=100)),
+                ('name', models.CharField(help_text='Topic as first written', max_length=100)),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_index', to='course_api.studygroup')),
+            ],
+            options={
+                'ordering': ['-message_count', '-last_used_at'],
+                'unique_together': {('group', 'key')},
+            },
+        ),
+        migrations.RunPython(build_topic_index, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+import re
+from django.db import models, transaction
 from django.utils import timezone
 from directory.models import User, AcademicYear
 from school.models import Class
@@ -62,33 +63,24 @@ class Course(models.Model):
     @classmethod
     def get_courses_for_class(cls, student_class, academic_year=None):
         """Get all courses available for a specific class"""
-        if academic_year is None:
-            academic_year = AcademicYear.get_current_academic_year()
-        
-        # Get courses that are either:
+        from .course_visibility import get_visible_course_ids
+
+        # Courses that are either:
         # 1. Specifically targeted to this class, OR
         # 2. First year first semester courses (for first-year students)
-        if student_class.current_year_of_study == 1:
-            # For first-year students, include all first-year first-semester courses
-            return cls.objects.filter(
-                academic_year=academic_year,
-                year=1,
-                semester=1
-            ).distinct()
-        else:
-            # For other years, only include courses specifically targeted to their class
-            return cls.objects.filter(
-                academic_year=academic_year,
-                target_classes=student_class
-            ).distinct()
+        # resolved through the cached visibility map
+        academic_year_id = academic_year.pk if academic_year is not None else None
+        return cls.objects.filter(id__in=get_visible_course_ids(student_class.pk, academic_year_id))
     
     @classmethod
     def get_courses_for_user(cls, user, academic_year=None):
         """Get all courses available for a specific user based on their class"""
-        if not user.is_student or not user.student_class:
+        if not user.is_student or not user.student_class_id:
             return cls.objects.none()
         
-        return cls.get_courses_for_class(user.student_class, academic_year)
+        from .course_visibility import get_visible_course_ids
+        academic_year_id = academic_year.pk if academic_year is not None else None
+        return cls.objects.filter(id__in=get_visible_course_ids(user.student_class_id, academic_year_id))
 
 
 class TimetableEntry(models.Model):
@@ -119,6 +111,31 @@ class TimetableEntry(models.Model):
     def __str__(self):
         return f"{self.day} - {self.subject} at {self.time}"
     
+    @classmethod
+    def with_meeting_summary(cls, queryset=None):
+        """
+        Annotate entries with their latest meeting and next joinable meeting.
+
+        Adds latest_meeting_id/status/time (what ``meetings.first()`` returns)
+        and next_meeting_id as correlated subqueries, so a whole timetable is
+        read in one query instead of several per entry.
+        """
+        from django.db.models import OuterRef, Subquery
+        from django.utils import timezone
+
+        queryset = cls.objects.all() if queryset is None else queryset
+        meetings = Meeting.objects.filter(timetable_entry=OuterRef('pk'))
+        latest = meetings.order_by('-scheduled_time', '-id')
+        upcoming = meetings.filter(
+            status__in=Meeting.JOINABLE_STATUSES, scheduled_time__gt=timezone.now()
+        ).order_by('scheduled_time', 'id')
+        return queryset.annotate(
+            latest_meeting_id=Subquery(latest.values('id')[:1]),
+            latest_meeting_status=Subquery(latest.values('status')[:1]),
+            latest_meeting_time=Subquery(latest.values('scheduled_time')[:1]),
+            next_meeting_id=Subquery(upcoming.values('id')[:1]),
+        )
+    
     def create_meeting_for_today(self, admin_host=None):
         """Create a meeting for this timetable entry for today"""
         from django.utils import timezone
@@ -416,6 +433,7 @@ class Meeting(models.Model):
         ('ended', 'Ended'),
         ('cancelled', 'Cancelled'),
     ]
+    JOINABLE_STATUSES = ('live', 'scheduled')
     
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -463,16 +481,20 @@ class Meeting(models.Model):
             if admin_user:
                 self.admin_host = admin_user
         
-        # Create Daily.co room if using Daily platform and room doesn't exist (only for new instances)
-        if self.platform == 'daily' and not self.daily_room_name and hasattr(self, '_state') and hasattr(self._state, 'adding') and self._state.adding:
-            self._create_daily_room()
-        elif self.platform == 'jitsi' and not self.meeting_url:
+        adding = self._state.adding
+        if self.platform == 'jitsi' and not self.meeting_url:
             # Use self-hosted Jitsi domain from settings if available
             from django.conf import settings
             jitsi_domain = getattr(settings, 'JITSI_DOMAIN', 'meet.jit.si')
             self.meeting_url = f"https://{jitsi_domain}/{self.meeting_id}"
         
         super().save(*args, **kwargs)
+        
+        # Daily.co rooms are created by the job worker, so saving never waits on the Daily API
+        if adding and self.platform == 'daily' and not self.daily_room_name:
+            self.schedule_daily_room()
+        elif adding and self.platform == 'jitsi':
+            self.schedule_jitsi_presign()
     
     @property
     def can_join_now(self):
@@ -485,48 +507,91 @@ class Meeting(models.Model):
         
         This allows early access to video calls for preparation and testing.
         """
+        return self.is_joinable(self.status, self.scheduled_time)
+    
+    @classmethod
+    def is_joinable(cls, status, scheduled_time):
+        """can_join_now for a status and time read without loading the meeting"""
         from django.utils import timezone
         now = timezone.now()
         # Allow joining as long as the meeting is scheduled in the future
         # and the status allows joining
-        time_diff = (self.scheduled_time - now).total_seconds()
-        return (self.status in ['live', 'scheduled'] and 
+        time_diff = (scheduled_time - now).total_seconds()
+        return (status in cls.JOINABLE_STATUSES and 
                 time_diff > 0)  # Meeting is in the future
     
-    def _create_daily_room(self):
-        """Create Daily.co room for this meeting"""
-        try:
-            from .daily_service import daily_service
-            
-            if not daily_service.is_api_configured():
-                return  # Skip if Daily.co is not configured
-            
-            # Generate room name
-            if self.timetable_entry:
-                room_name = daily_service.generate_room_name(
-                    self.course.code,
-                    self.timetable_entry.day,
-                    self.timetable_entry.time
-                )
-            else:
-                room_name = f"meeting-{self.meeting_id}"
-            
-            # Create room
+    def schedule_daily_room(self):
+        """Queue creation of this meeting's Daily.co room for the run_jobs worker"""
+        from .daily_service import daily_service
+        from .job_queue import enqueue
+        
+        if not daily_service.is_api_configured():
+            return None  # Skip if Daily.co is not configured
+        return enqueue('provision_daily_room', {'meeting_id': self.pk})
+    
+    @property
+    def jitsi_token_room_name(self):
+        """Room name that Jitsi JWT tokens for this meeting are signed for"""
+        return f"meeting-{self.id}-{self.course.code.lower().replace(' ', '-')}"
+    
+    def schedule_jitsi_presign(self):
+        """Queue signing of the class's Jitsi tokens for shortly before the meeting starts"""
+        from .jitsi_auth import PRESIGN_LEAD
+        from .job_queue import enqueue
+        
+        starts = self.scheduled_time
+        if timezone.is_naive(starts):
+            starts = timezone.make_aware(starts)
+        return enqueue('presign_jitsi_tokens', {'meeting_id': self.pk}, run_at=max(starts - PRESIGN_LEAD, timezone.now()))
+    
+    def provision_daily_room(self):
+        """
+        Create the Daily.co room for this meeting and store its details.
+        
+        Safe to call more than once: a room that already exists under the
+        generated name is looked up instead of created.
+        
+        Raises:
+            Exception: When the Daily.co API call fails
+        """
+        from .daily_service import daily_service
+        
+        if self.daily_room_name or not daily_service.is_api_configured():
+            return False
+        
+        # Generate room name
+        if self.timetable_entry:
+            room_name = daily_service.generate_room_name(
+                self.course.code,
+                self.timetable_entry.day,
+                self.timetable_entry.time
+            )
+        else:
+            room_name = f"meeting-{self.meeting_id}"
+        
+        room_data = daily_service.get_room(room_name)
+        if room_data is None:
             room_properties = {
                 'max_participants': self.max_participants,
                 'enable_recording': 'cloud' if self.is_recording_enabled else False,
                 'exp': self._get_expiration_timestamp()
             }
-            
             room_data = daily_service.create_room(room_name, room_properties)
-            
-            # Store room information
-            self.daily_room_name = room_data.get('name')
-            self.daily_room_id = room_data.get('id')
-            self.daily_room_url = room_data.get('url')
-            
+        
+        # Store room information
+        self.daily_room_name = room_data.get('name')
+        self.daily_room_id = room_data.get('id')
+        self.daily_room_url = room_data.get('url')
+        self.save(update_fields=['daily_room_name', 'daily_room_id', 'daily_room_url', 'updated_at'])
+        return True
+    
+    def ensure_daily_room(self):
+        """Provision the Daily.co room now if the worker has not yet; never raises"""
+        if self.platform != 'daily' or self.daily_room_name:
+            return
+        try:
+            self.provision_daily_room()
         except Exception as e:
-            # Log error but don't fail the save
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"Failed to create Daily.co room: {str(e)}")
@@ -624,6 +689,30 @@ class StudyGroup(models.Model):
     def __str__(self):
         return f"{self.name} ({self.student_class})"
 
+    @classmethod
+    def for_listing(cls, user, queryset=None):
+        """
+        Groups annotated with everything a group listing shows, in one query.
+
+        Adds members_count, pending_count and my_role (the user's membership
+        role, or None) and joins the course for course_name.
+        """
+        from django.db.models import Count, IntegerField, OuterRef, Subquery
+        from django.db.models.functions import Coalesce
+
+        def count(rows):
+            # Correlated per-group counts; joining both relations would multiply members by requests
+            rows = rows.filter(group=OuterRef('pk')).order_by().values('group').annotate(n=Count('pk')).values('n')
+            return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+        queryset = cls.objects.all() if queryset is None else queryset
+        my_role = StudyGroupMembership.objects.filter(group=OuterRef('pk'), user=user).values('role')[:1]
+        return queryset.select_related('course').annotate(
+            members_count=count(StudyGroupMembership.objects.all()),
+            pending_count=count(StudyGroupJoinRequest.objects.filter(status='pending')),
+            my_role=Subquery(my_role),
+        )
+
 
 class StudyGroupMembership(models.Model):
     """Membership relation for users belonging to a study group."""
@@ -749,10 +838,281 @@ class GroupMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['group', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.group_id} - {self.sender_id}: {self.body[:30]}"
 
+    @classmethod
+    def get_history_for_group(cls, group):
+        """Visible messages for a group with every relation the serializer reads preloaded"""
+        return cls.objects.filter(group=group, deleted=False).select_related(
+            'sender',
+            'reply_to__sender',
+        ).prefetch_related(
+            'mentioned_users',
+            'referenced_course_materials',
+            'referenced_group_materials',
+        )
+
+    # @[userId:Name] or @userId
+    MENTION_PATTERN = re.compile(r'@\[(\d+):[^\]]+\]|@(\d+)')
+    # [[id]], [[id:Title]], optionally prefixed course_/group_ as produced by chat autocomplete
+    MATERIAL_PATTERN = re.compile(r'\[\[(?:(course|group)_)?(\d+)(?::[^\]]+)?\]\]')
+    TOPIC_PATTERN = re.compile(r'#(\w+)')
+
+    @classmethod
+    def parse_references(cls, body):
+        """
+        Extract @mentions, [[material]] references and #topics from a message body.
+
+        Returns:
+            dict with 'user_ids', 'course_material_ids', 'group_material_ids'
+            (sets) and 'topics' (list in order of first appearance)
+        """
+        user_ids = {int(m.group(1) or m.group(2)) for m in cls.MENTION_PATTERN.finditer(body)}
+        course_material_ids = set()
+        group_material_ids = set()
+        for match in cls.MATERIAL_PATTERN.finditer(body):
+            if match.group(1) == 'group':
+                group_material_ids.add(int(match.group(2)))
+            else:
+                course_material_ids.add(int(match.group(2)))
+        topics = list(dict.fromkeys(m.group(1) for m in cls.TOPIC_PATTERN.finditer(body)))
+        return {
+            'user_ids': user_ids,
+            'course_material_ids': course_material_ids,
+            'group_material_ids': group_material_ids,
+            'topics': topics,
+        }
+
+    @classmethod
+    def create_with_references(cls, group_id, sender, body, reply_to_id=None):
+        """
+        Persist a chat message and its references in a single transaction.
+
+        Everything is resolved up front: one lookup per kind of reference, one
+        INSERT for the message (topics included) and one bulk INSERT per
+        many-to-many table. Referenced rows are attached to the returned
+        message as ``mentioned``, ``course_materials`` and ``group_materials``
+        so callers can render it without re-reading the relations.
+        """
+        from course_content.models import Material
+
+        refs = cls.parse_references(body)
+        with transaction.atomic():
+            reply_to = None
+            if reply_to_id:
+                reply_to = cls.objects.select_related('sender').filter(
+                    id=reply_to_id, group_id=group_id
+                ).first()
+
+            mentioned = list(User.objects.filter(id__in=refs['user_ids'])) if refs['user_ids'] else []
+            course_materials = list(
+                Material.objects.filter(id__in=refs['course_material_ids']).only('id', 'title')
+            ) if refs['course_material_ids'] else []
+            group_materials = list(
+                GroupMaterial.objects.filter(id__in=refs['group_material_ids'], group_id=group_id).only('id', 'title')
+            ) if refs['group_material_ids'] else []
+
+            msg = cls.objects.create(
+                group_id=group_id,
+                sender=sender,
+                body=body,
+                reply_to=reply_to,
+                topics=refs['topics'],
+            )
+
+            if mentioned:
+                through = cls.mentioned_users.through
+                through.objects.bulk_create(
+                    [through(groupmessage_id=msg.id, user_id=u.id) for u in mentioned]
+                )
+            if course_materials:
+                through = cls.referenced_course_materials.through
+                through.objects.bulk_create(
+                    [through(groupmessage_id=msg.id, material_id=m.id) for m in course_materials]
+                )
+            if group_materials:
+                through = cls.referenced_group_materials.through
+                through.objects.bulk_create(
+                    [through(groupmessage_id=msg.id, groupmaterial_id=m.id) for m in group_materials]
+                )
+
+        msg.mentioned = mentioned
+        msg.course_materials = course_materials
+        msg.group_materials = group_materials
+        return msg
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember which topics this row contributes to the index so save() can diff them
+        if 'topics' in field_names and 'deleted' in field_names:
+            instance._indexed_topics = instance.topic_keys()
+        return instance
+
+    def topic_keys(self):
+        """Topics this message counts towards in the group's topic index, keyed by normalized name"""
+        if self.deleted or not isinstance(self.topics, list):
+            return {}
+        return {GroupTopic.normalize(t): t for t in self.topics if isinstance(t, str) and t}
+
     def save(self, *args, **kwargs):
-        # Simple save for chat messages - no special processing needed
-        super().save(*args, **kwargs)
\ No newline at end of file
+        if self._state.adding:
+            previous = {}
+        elif hasattr(self, '_indexed_topics'):
+            previous = self._indexed_topics
+        else:
+            row = GroupMessage.objects.filter(pk=self.pk).values('topics', 'deleted').first() or {}
+            previous = GroupMessage(topics=row.get('topics'), deleted=row.get('deleted', True)).topic_keys()
+        super().save(*args, **kwargs)
+
+        # Keep the topic index in step with what this message now contributes
+        current = self.topic_keys()
+        added = {k: v for k, v in current.items() if k not in previous}
+        removed = [k for k in previous if k not in current]
+        if added or removed:
+            GroupTopic.record(self.group_id, added=added, removed=removed)
+        self._indexed_topics = current
+
+
+class GroupTopic(models.Model):
+    """Per-group index of #topics used in chat, maintained incrementally as messages change."""
+    group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='topic_index')
+    key = models.CharField(max_length=100, help_text="Lower-cased topic used for prefix lookups")
+    name = models.CharField(max_length=100, help_text="Topic as first written")
+    message_count = models.PositiveIntegerField(default=0)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-message_count', '-last_used_at']
+        unique_together = ['group', 'key']
+
+    def __str__(self):
+        return f"{self.group_id} - #{self.name} ({self.message_count})"
+
+    @staticmethod
+    def normalize(topic):
+        return topic.lstrip('#').lower()[:100]
+
+    @classmethod
+    def record(cls, group_id, added=None, removed=None):
+        """
+        Apply a message's topic changes to the index.
+
+        Args:
+            group_id: Study group the message belongs to
+            added: dict of normalized key -> topic as written, for topics gained
+            removed: iterable of normalized keys for topics lost
+        """
+        now = timezone.now()
+        # No savepoint: when called from a message save this joins the caller's transaction
+        with transaction.atomic(savepoint=False):
+            if added:
+                cls.objects.bulk_create(
+                    [cls(group_id=group_id, key=key, name=name[:100], last_used_at=now) for key, name in added.items()],
+                    ignore_conflicts=True,
+                )
+                cls.objects.filter(group_id=group_id, key__in=list(added)).update(
+                    message_count=models.F('message_count') + 1,
+                    last_used_at=now,
+                )
+            if removed:
+                removed = list(removed)
+                cls.objects.filter(group_id=group_id, key__in=removed, message_count__gt=0).update(
+                    message_count=models.F('message_count') - 1,
+                )
+                cls.objects.filter(group_id=group_id, key__in=removed, message_count=0).delete()
+
+    @classmethod
+    def search(cls, group, prefix='', limit=10):
+        """Topics of a group starting with prefix, most used and most recent first"""
+        topics = cls.objects.filter(group=group)
+        prefix = cls.normalize(prefix)
+        if prefix:
+            topics = topics.filter(key__startswith=prefix)
+        return topics[:limit]
+
+
+class BackgroundJob(models.Model):
+    """Durable unit of deferred work, claimed and run by the run_jobs worker"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('dead', 'Dead'),  # gave up after max_attempts; kept for inspection and requeue
+    ]
+
+    kind = models.CharField(max_length=100, help_text="Registered handler name, e.g. 'announcement_fanout'")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now, help_text="Not picked up before this time")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='children')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='backgroundjob_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class EmailOutbox(models.Model):
+    """Outbound email, stored before sending and delivered by the drain_email_outbox worker"""
+
+    CATEGORY_CHOICES = [
+        ('verification', 'Email Verification'),
+        ('approval', 'Registration Approval'),
+        ('rejection', 'Registration Rejection'),
+        ('password_reset', 'Password Reset'),
+        ('announcement', 'Announcement'),
+        ('admin_notification', 'Admin Notification'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),  # gave up after max_attempts
+    ]
+
+    idempotency_key = models.CharField(max_length=255, unique=True, help_text="Queuing the same key twice sends once")
+    category = models.CharField(max_length=30, choices=CATEGORY_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='outbox_emails')
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    text_body = models.TextField()
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=6)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        verbose_name_plural = 'Email outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='emailoutbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.category} to {self.to_email} ({self.status})"
@@ -0,0 +1,109 @@
+"""
+Keyset (cursor) pagination for study group chat history.
+
+Messages are ordered by ``(created_at, id)`` so that pages are stable even when
+several messages share a timestamp. Cursors are opaque, URL-safe strings that
+encode the position of a boundary message; the client passes them back as
+``?before=`` (older page) or ``?after=`` (newer page).
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client supplies a malformed cursor."""
+
+
+class MessageCursorPagination:
+    """Paginate a GroupMessage queryset in either direction from a cursor."""
+
+    page_size_query_param = 'limit'
+    default_page_size = 50
+    max_page_size = 100
+
+    def encode_cursor(self, message):
+        raw = f"{message.created_at.isoformat()}|{message.pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, value):
+        try:
+            padded = value + '=' * (-len(value) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            created_at_raw, pk_raw = raw.rsplit('|', 1)
+            created_at = parse_datetime(created_at_raw)
+            pk = int(pk_raw)
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            raise InvalidCursor('Invalid cursor')
+        if created_at is None:
+            raise InvalidCursor('Invalid cursor')
+        return created_at, pk
+
+    def get_page_size(self, params):
+        try:
+            size = int(params.get(self.page_size_query_param, self.default_page_size))
+        except (TypeError, ValueError):
+            size = self.default_page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request):
+        """
+        Return one page of messages in chronological order.
+
+        Without a cursor the newest page is returned. ``before`` walks back
+        through history, ``after`` walks forward towards the newest message.
+        """
+        params = request.query_params
+        self.request = request
+        page_size = self.get_page_size(params)
+        before = params.get('before')
+        after = params.get('after')
+        if before and after:
+            raise InvalidCursor('Use either before or after, not both')
+
+        if after:
+            created_at, pk = self.decode_cursor(after)
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+            ).order_by('created_at', 'pk')
+            rows = list(queryset[:page_size + 1])
+            self.has_newer = len(rows) > page_size
+            page = rows[:page_size]
+            self.has_older = True
+        else:
+            if before:
+                created_at, pk = self.decode_cursor(before)
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+                )
+            rows = list(queryset.order_by('-created_at', '-pk')[:page_size + 1])
+            self.has_older = len(rows) > page_size
+            page = rows[:page_size][::-1]
+            self.has_newer = bool(before)
+
+        self.page = page
+        return page
+
+    def get_previous_link(self):
+        if not self.page or not self.has_older:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), 'after')
+        return replace_query_param(url, 'before', self.encode_cursor(self.page[0]))
+
+    def get_next_link(self):
+        if not self.page or not self.has_newer:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), 'before')
+        return replace_query_param(url, 'after', self.encode_cursor(self.page[-1]))
+
+    def get_paginated_data(self, data):
+        return {
+            'results': data,
+            'previous': self.get_previous_link(),
+            'next': self.get_next_link(),
+            'before': self.encode_cursor(self.page[0]) if self.page else None,
+            'after': self.encode_cursor(self.page[-1]) if self.page else None,
+        }
@@ -0,0 +1,209 @@
+"""
+Presence registry for study group chat rooms.
+
+Each open WebSocket is tracked individually by its Channels ``channel_name`` so
+a user with several tabs stays online until the last one closes. Entries carry
+an expiry timestamp that the consumer refreshes with periodic heartbeats; a
+worker that dies simply stops heartbeating and its entries age out.
+
+Two backends are provided:
+
+* ``InMemoryPresenceBackend`` - per-process, for development and tests.
+* ``RedisPresenceBackend`` - shared across Daphne workers. A room is one Redis
+  hash (``channel_name -> entry``), so a snapshot is a single HGETALL.
+
+The backend is chosen with the ``PRESENCE_BACKEND`` setting.
+"""
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 60
+
+
+class BasePresenceBackend:
+    """Interface shared by presence backends. All methods are coroutines."""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl or getattr(settings, 'PRESENCE_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+
+    @property
+    def heartbeat_interval(self):
+        """How often consumers should refresh their entry"""
+        return max(self.ttl / 3, 1)
+
+    async def add(self, room, channel_name, user_id, user_name):
+        """Register a connection. Returns True if the user just came online."""
+        raise NotImplementedError
+
+    async def remove(self, room, channel_name):
+        """Drop a connection. Returns True if the user has no connections left."""
+        raise NotImplementedError
+
+    async def touch(self, room, channel_name):
+        """Extend the expiry of a live connection"""
+        raise NotImplementedError
+
+    async def snapshot(self, room):
+        """Return the online users of a room as ``[{'id': ..., 'name': ...}]``"""
+        raise NotImplementedError
+
+    def _expiry(self):
+        return time.time() + self.ttl
+
+    @staticmethod
+    def _live_users(entries, now=None):
+        """Collapse live per-connection entries into one record per user"""
+        now = now or time.time()
+        users = {}
+        for entry in entries:
+            if entry['exp'] > now:
+                users[int(entry['id'])] = entry['name']
+        return [{'id': uid, 'name': name} for uid, name in users.items()]
+
+
+class InMemoryPresenceBackend(BasePresenceBackend):
+    """Process-local presence map. Only correct with a single worker."""
+
+    def __init__(self, ttl=None):
+        super().__init__(ttl)
+        self._rooms = {}  # room -> {channel_name: entry}
+
+    def _prune(self, room):
+        now = time.time()
+        entries = self._rooms.get(room, {})
+        for channel_name in [c for c, e in entries.items() if e['exp'] <= now]:
+            del entries[channel_name]
+        if not entries:
+            self._rooms.pop(room, None)
+        return entries
+
+    def _user_connections(self, room, user_id):
+        return [e for e in self._prune(room).values() if e['id'] == user_id]
+
+    async def add(self, room, channel_name, user_id, user_name):
+        first = not self._user_connections(room, user_id)
+        self._rooms.setdefault(room, {})[channel_name] = {
+            'id': user_id, 'name': user_name, 'exp': self._expiry(),
+        }
+        return first
+
+    async def remove(self, room, channel_name):
+        entry = self._rooms.get(room, {}).pop(channel_name, None)
+        if entry is None:
+            return False
+        return not self._user_connections(room, entry['id'])
+
+    async def touch(self, room, channel_name):
+        entry = self._rooms.get(room, {}).get(channel_name)
+        if entry:
+            entry['exp'] = self._expiry()
+
+    async def snapshot(self, room):
+        return self._live_users(self._prune(room).values())
+
+
+class RedisPresenceBackend(BasePresenceBackend):
+    """Cross-worker presence stored as one Redis hash per room"""
+
+    key_prefix = 'presence:'
+    # Refresh an entry's expiry only if it still exists, so a touch racing a remove
+    # cannot bring the connection back
+    TOUCH_SCRIPT = """
+local raw = redis.call('HGET', KEYS[1], ARGV[1])
+if not raw then
+    return 0
+end
+local entry = cjson.decode(raw)
+entry['exp'] = tonumber(ARGV[2])
+redis.call('HSET', KEYS[1], ARGV[1], cjson.encode(entry))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+    def __init__(self, ttl=None, url=None):
+        super().__init__(ttl)
+        self.url = url or getattr(settings, 'PRESENCE_REDIS_URL', 'redis://localhost:6379/0')
+        self._client = None
+        self._touch = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis.asyncio as aioredis
+            self._client = aioredis.from_url(self.url, decode_responses=True)
+        return self._client
+
+    def _key(self, room):
+        return f'{self.key_prefix}{room}'
+
+    def _decode(self, raw_entries):
+        entries = {}
+        for channel_name, raw in raw_entries.items():
+            try:
+                entries[channel_name] = json.loads(raw)
+            except (TypeError, ValueError):
+                continue
+        return entries
+
+    async def _purge_expired(self, room, entries):
+        now = time.time()
+        stale = [c for c, e in entries.items() if e['exp'] <= now]
+        if stale:
+            await self.client.hdel(self._key(room), *stale)
+
+    async def add(self, room, channel_name, user_id, user_name):
+        key = self._key(room)
+        entry = json.dumps({'id': user_id, 'name': user_name, 'exp': self._expiry()})
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(key)
+            pipe.hset(key, channel_name, entry)
+            # The whole room expires if every worker stops heartbeating
+            pipe.expire(key, int(self.ttl * 2))
+            before, _, _ = await pipe.execute()
+        entries = self._decode(before)
+        entries.pop(channel_name, None)
+        await self._purge_expired(room, entries)
+        now = time.time()
+        return not any(e['id'] == user_id and e['exp'] > now for e in entries.values())
+
+    async def remove(self, room, channel_name):
+        key = self._key(room)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(key)
+            pipe.hdel(key, channel_name)
+            before, _ = await pipe.execute()
+        entries = self._decode(before)
+        entry = entries.pop(channel_name, None)
+        if entry is None:
+            return False
+        now = time.time()
+        return not any(e['id'] == entry['id'] and e['exp'] > now for e in entries.values())
+
+    async def touch(self, room, channel_name):
+        if self._touch is None:
+            self._touch = self.client.register_script(self.TOUCH_SCRIPT)
+        await self._touch(keys=[self._key(room)], args=[channel_name, self._expiry(), int(self.ttl * 2)])
+
+    async def snapshot(self, room):
+        entries = self._decode(await self.client.hgetall(self._key(room)))
+        await self._purge_expired(room, entries)
+        return self._live_users(entries.values())
+
+
+_backend = None
+
+
+def get_presence_backend():
+    """Return the process-wide presence backend configured in settings"""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'PRESENCE_BACKEND', 'course_api.presence.InMemoryPresenceBackend')
+        _backend = import_string(path)()
+        logger.info("Using presence backend %s", path)
+    return _backend
@@ -164,26 +164,43 @@ class TimetableEntrySerializer(serializers.ModelSerializer):
     has_meeting = serializers.SerializerMethodField()
     meeting_id = serializers.SerializerMethodField()
     can_join_meeting = serializers.SerializerMethodField()
+    next_meeting_id = serializers.SerializerMethodField()
     
     class Meta:
         model = TimetableEntry
         fields = '__all__'
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._summaries = {}
+    
+    def _meeting_summary(self, obj):
+        """Latest and next meeting, from TimetableEntry.with_meeting_summary() annotations when present"""
+        if hasattr(obj, 'latest_meeting_id'):
+            return obj
+        # Single entries serialized outside a list view: read the same summary once
+        if obj.pk not in self._summaries:
+            self._summaries[obj.pk] = TimetableEntry.with_meeting_summary().get(pk=obj.pk)
+        return self._summaries[obj.pk]
+    
     def get_has_meeting(self, obj):
         """Check if this timetable entry has an associated meeting"""
-        return obj.meetings.exists()
+        return self._meeting_summary(obj).latest_meeting_id is not None
     
     def get_meeting_id(self, obj):
         """Get the meeting ID for this timetable entry if exists"""
-        meeting = obj.meetings.first()
-        return meeting.id if meeting else None
+        return self._meeting_summary(obj).latest_meeting_id
     
     def get_can_join_meeting(self, obj):
         """Check if user can join the meeting for this timetable entry"""
-        meeting = obj.meetings.first()
-        if meeting:
-            return meeting.can_join_now
-        return False
+        summary = self._meeting_summary(obj)
+        if summary.latest_meeting_id is None:
+            return False
+        return Meeting.is_joinable(summary.latest_meeting_status, summary.latest_meeting_time)
+    
+    def get_next_meeting_id(self, obj):
+        """Get the next meeting that can still be joined, if any"""
+        return self._meeting_summary(obj).next_meeting_id
 
 
 class CourseMaterialSerializer(serializers.ModelSerializer):
@@ -402,14 +419,34 @@ class CourseWithDetailsSerializer(serializers.ModelSerializer):
 # -------------------------
 
 class StudyGroupSerializer(serializers.ModelSerializer):
-    members_count = serializers.IntegerField(source='memberships.count', read_only=True)
-    pending_requests = serializers.IntegerField(source='join_requests.filter(status="pending").count', read_only=True)
+    """Study group with listing stats; expects StudyGroup.for_listing() rows"""
+    members_count = serializers.SerializerMethodField()
+    pending_requests = serializers.SerializerMethodField()
+    my_role = serializers.SerializerMethodField()
     course_name = serializers.CharField(source='course.name', read_only=True)
 
     class Meta:
         model = StudyGroup
-        fields = ('id', 'name', 'description', 'student_class', 'course', 'course_name', 'created_by', 'is_private', 'max_members', 'created_at', 'updated_at', 'members_count', 'pending_requests')
-        read_only_fields = ('id', 'created_by', 'created_at', 'updated_at', 'members_count', 'pending_requests')
+        fields = ('id', 'name', 'description', 'student_class', 'course', 'course_name', 'created_by', 'is_private', 'max_members', 'created_at', 'updated_at', 'members_count', 'pending_requests', 'my_role')
+        read_only_fields = ('id', 'created_by', 'created_at', 'updated_at', 'members_count', 'pending_requests', 'my_role')
+
+    def get_members_count(self, obj):
+        if hasattr(obj, 'members_count'):
+            return obj.members_count
+        return obj.memberships.count()
+
+    def get_pending_requests(self, obj):
+        if hasattr(obj, 'pending_count'):
+            return obj.pending_count
+        return obj.join_requests.filter(status='pending').count()
+
+    def get_my_role(self, obj):
+        if hasattr(obj, 'my_role'):
+            return obj.my_role
+        request = self.context.get('request')
+        if request is None:
+            return None
+        return obj.memberships.filter(user=request.user).values_list('role', flat=True).first()
 
 
 class StudyGroupCreateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,83 @@
+"""Signals keeping course_api's derived indexes and caches in step with their source rows"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from directory.models import User
+from school.models import Class
+from .course_visibility import invalidate_course_visibility
+from .member_directory import invalidate_member_directory
+from .models import Course, CourseContent, GroupMessage, GroupTopic, StudyGroupMembership
+from .timeline import COUNTER_FIELDS, invalidate_course_timeline
+
+
+@receiver(post_delete, sender=GroupMessage)
+def remove_message_topics(sender, instance, **kwargs):
+    """Drop a hard-deleted message's topics from the group's topic index"""
+    removed = list(getattr(instance, '_indexed_topics', None) or instance.topic_keys())
+    if removed:
+        GroupTopic.record(instance.group_id, removed=removed)
+
+
+@receiver(post_save, sender=StudyGroupMembership)
+@receiver(post_delete, sender=StudyGroupMembership)
+def membership_changed(sender, instance, **kwargs):
+    """Rebuild the group's @mention directory on its next lookup"""
+    invalidate_member_directory(instance.group_id)
+
+
+@receiver(post_save, sender=User)
+def member_profile_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Refresh the @mention directories a user appears in when their name changes"""
+    if created:
+        return
+    directory_fields = {'first_name', 'last_name', 'registration_number', 'profile_picture'}
+    if update_fields is not None and not directory_fields.intersection(update_fields):
+        return
+    group_ids = StudyGroupMembership.objects.filter(user=instance).values_list('group_id', flat=True)
+    for group_id in group_ids:
+        invalidate_member_directory(group_id)
+
+
+TIMELINE_CONTENT_MODELS = [
+    CourseContent,
+    'course_content.CourseOutline',
+    'course_content.PastPaper',
+    'course_content.Material',
+    'course_content.Assignment',
+    'course_content.Announcement',
+]
+
+
+def content_changed(sender, instance, update_fields=None, **kwargs):
+    """Drop the cached timeline of the course a piece of content belongs to"""
+    if update_fields is not None and set(update_fields) <= COUNTER_FIELDS:
+        return
+    invalidate_course_timeline(instance.course_id)
+
+
+for model in TIMELINE_CONTENT_MODELS:
+    post_save.connect(content_changed, sender=model, dispatch_uid=f'course_timeline_save:{model}')
+    post_delete.connect(content_changed, sender=model, dispatch_uid=f'course_timeline_delete:{model}')
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    """The course itself is part of the timeline payload, and its year/semester decide who sees it"""
+    invalidate_course_timeline(instance.pk)
+    invalidate_course_visibility()
+
+
+@receiver(m2m_changed, sender=Course.target_classes.through)
+def course_targets_changed(sender, action, **kwargs):
+    """Courses gained or lost target classes"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_course_visibility()
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+def class_changed(sender, instance, update_fields=None, **kwargs):
+    """A class's intake year decides its year of study"""
+    if update_fields is not None and 'academic_year' not in update_fields:
+        return
+    invalidate_course_visibility()
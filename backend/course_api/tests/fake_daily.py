@@ -0,0 +1,118 @@
+"""
+Local stand-in for the Daily.co REST API, for tests.
+
+Serves the endpoints DailyService uses over HTTP/1.1 keep-alive on a random
+localhost port and records every request and TCP connection, so tests can
+check pooling and retries without network access:
+
+    with FakeDailyServer() as daily:
+        service = DailyService(api_key='test-key', base_url=daily.url)
+        service.create_room('law-101')
+        assert daily.connections == 1
+"""
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.fake.lock:
+            self.server.fake.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=None):
+        data = json.dumps(body if body is not None else {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method):
+        fake = self.server.fake
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        with fake.lock:
+            fake.requests.append((method, self.path, body))
+            forced = fake.fail_next.pop(0) if fake.fail_next else None
+        if forced:
+            return self._reply(forced, {'error': 'forced failure'})
+        if self.headers.get('Authorization') != f'Bearer {fake.api_key}':
+            return self._reply(401, {'error': 'authentication-error'})
+        status, payload = fake.route(method, self.path, body)
+        self._reply(status, payload)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+class FakeDailyServer:
+    """In-process fake of the Daily.co API; use as a context manager"""
+
+    def __init__(self, api_key='test-key'):
+        self.api_key = api_key
+        self.rooms = {}
+        self.requests = []
+        self.connections = 0
+        self.fail_next = []  # HTTP statuses to return for the next requests (None lets one through)
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/v1'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def route(self, method, path, body):
+        path = path.split('?')[0].removeprefix('/v1')
+        if path == '/rooms' and method == 'POST':
+            name = body['name']
+            if name in self.rooms:
+                return 400, {'error': 'invalid-request-error', 'info': f'a room named {name} already exists'}
+            self.rooms[name] = {'id': f'room-{len(self.rooms) + 1}', 'name': name,
+                                'url': f'https://example.daily.co/{name}', 'config': body}
+            return 200, self.rooms[name]
+        if path == '/meeting-tokens' and method == 'POST':
+            props = body['properties']
+            return 200, {'token': f"token-{props['room_name']}-{props['user_id']}-{int(props['is_owner'])}"}
+
+        match = re.fullmatch(r'/rooms/([^/]+)(/participants|/end-session)?', path)
+        if not match:
+            return 404, {'error': 'not-found'}
+        name, action = match.groups()
+        if name not in self.rooms:
+            return 404, {'error': 'not-found'}
+        if action == '/participants' and method == 'GET':
+            return 200, {'data': []}
+        if action == '/end-session' and method == 'POST':
+            return 200, {}
+        if action is None and method == 'GET':
+            return 200, self.rooms[name]
+        if action is None and method == 'DELETE':
+            del self.rooms[name]
+            return 200, {'deleted': True, 'name': name}
+        return 405, {'error': 'method-not-allowed'}
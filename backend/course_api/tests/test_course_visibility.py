@@ -0,0 +1,68 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from course_api.course_visibility import get_visible_course_ids, get_visible_course_ids_for_users
+from course_api.models import Course
+from course_api.tests.test_models import CourseFactory
+from directory.models import AcademicYear
+from directory.tests.test_models import UserFactory, StudentClassFactory
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'visibility-tests'}}
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+class TestCourseVisibility(TestCase):
+    """Test cases for the cached course-visibility map"""
+
+    def setUp(self):
+        cache.clear()
+        self.year = AcademicYear.get_or_create_2025_2026()
+        self.older_year = AcademicYear.objects.create(year_start=2023, year_end=2024, is_active=False)
+        self.first_year_class = StudentClassFactory(academic_year=self.year)
+        self.third_year_class = StudentClassFactory(academic_year=self.older_year)
+        self.intro = CourseFactory(academic_year=self.year, year=1, semester=1)
+        self.evidence = CourseFactory(academic_year=self.year, year=3, semester=1)
+        self.evidence.target_classes.add(self.third_year_class)
+
+    def test_matches_class_rules(self):
+        """Test that first years see first-semester courses and others their targeted ones"""
+        self.assertEqual(get_visible_course_ids(self.first_year_class.id), {self.intro.id})
+        self.assertEqual(get_visible_course_ids(self.third_year_class.id), {self.evidence.id})
+        self.assertEqual(
+            list(Course.get_courses_for_class(self.third_year_class)), [self.evidence]
+        )
+
+    def test_warm_lookup_does_not_query(self):
+        """Test that cached entries are served without queries"""
+        get_visible_course_ids(self.third_year_class.id)
+        with CaptureQueriesContext(connection) as queries:
+            get_visible_course_ids(self.third_year_class.id)
+        self.assertEqual(len(queries), 0)
+
+    def test_invalidated_by_targeting_active_year_and_intake(self):
+        """Test that the map follows target_classes, the active year and class intake"""
+        self.assertEqual(get_visible_course_ids(self.third_year_class.id), {self.evidence.id})
+        self.evidence.target_classes.remove(self.third_year_class)
+        self.assertEqual(get_visible_course_ids(self.third_year_class.id), frozenset())
+
+        self.third_year_class.academic_year = self.year
+        self.third_year_class.save()
+        self.assertEqual(get_visible_course_ids(self.third_year_class.id), {self.intro.id})
+
+        self.year.is_active = False
+        self.year.save()
+        self.assertEqual(get_visible_course_ids(self.first_year_class.id), frozenset())
+
+    def test_bulk_resolution_for_users(self):
+        """Test that many users are resolved in a fixed number of queries"""
+        users = [UserFactory(user_type='student', student_class=c) for c in (self.first_year_class, self.third_year_class) * 3]
+        admin = UserFactory(user_type='admin')
+        with CaptureQueriesContext(connection) as queries:
+            visible = get_visible_course_ids_for_users(users + [admin])
+        self.assertLessEqual(len(queries), 4)
+        self.assertEqual(visible[users[0].id], {self.intro.id})
+        self.assertEqual(visible[users[1].id], {self.evidence.id})
+        self.assertEqual(visible[admin.id], frozenset())
@@ -0,0 +1,228 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from course_api import daily_tokens
+from course_api.daily_service import POOL_SIZE, AsyncDailyService, DailyService
+from course_api.job_queue import run_pending
+from course_api.models import BackgroundJob, TimetableEntry
+from course_api.tests.fake_daily import FakeDailyServer
+from course_api.tests.test_models import CourseFactory, MeetingFactory
+from directory.models import AcademicYear
+from directory.tests.test_models import UserFactory
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'daily-token-tests'}}
+
+
+class TestDailyService(TestCase):
+    """Test cases for the pooled Daily.co client against the fake server"""
+
+    def setUp(self):
+        self.daily = FakeDailyServer().__enter__()
+        self.addCleanup(self.daily.__exit__)
+        self.service = DailyService(api_key='test-key', base_url=self.daily.url)
+        self.addCleanup(self.service.close)
+
+    def test_calls_share_one_keep_alive_connection(self):
+        """Test that repeated calls reuse the pooled connection"""
+        room = self.service.create_room('law-101', {'max_participants': 20})
+        self.assertEqual(room['url'], 'https://example.daily.co/law-101')
+        self.assertEqual(self.service.get_room('law-101')['config']['max_participants'], 20)
+        self.assertEqual(self.service.create_meeting_token('law-101', '7', 'Ann')['token'], 'token-law-101-7-0')
+        self.assertEqual(self.service.get_room_participants('law-101'), {'data': []})
+        self.assertTrue(self.service.end_room_session('law-101'))
+        self.assertTrue(self.service.delete_room('law-101'))
+        self.assertEqual(len(self.daily.requests), 6)
+        self.assertEqual(self.daily.connections, 1)
+
+    def test_missing_rooms(self):
+        """Test that a missing room reads as None and deleting it succeeds"""
+        self.assertIsNone(self.service.get_room('nope'))
+        self.assertTrue(self.service.delete_room('nope'))
+
+    def test_retries_idempotent_requests_only(self):
+        """Test that 5xx responses are retried for GET but never for POST"""
+        self.service.create_room('law-101')
+        self.daily.fail_next = [503, 502]
+        self.assertEqual(self.service.get_room('law-101')['name'], 'law-101')
+
+        self.daily.fail_next = [503]
+        with self.assertRaisesMessage(Exception, 'Failed to create Daily.co room'):
+            self.service.create_room('law-102')
+        self.assertEqual([r[1] for r in self.daily.requests].count('/v1/rooms'), 2)
+
+    def test_requires_api_key(self):
+        """Test that an unconfigured client refuses to call the API"""
+        with self.assertRaises(ValueError):
+            DailyService(api_key='', base_url=self.daily.url).get_room('law-101')
+        self.assertEqual(self.daily.requests, [])
+
+    def test_async_client(self):
+        """Test the async client over one pooled connection, retrying GETs"""
+        service = AsyncDailyService(api_key='test-key', base_url=self.daily.url)
+
+        async def scenario():
+            room = await service.create_room('law-201')
+            self.daily.fail_next = [503]
+            fetched, token = await asyncio.gather(
+                service.get_room('law-201'), service.create_meeting_token('law-201', '3', 'Ben', is_owner=True)
+            )
+            missing = await service.get_room('nope')
+            await service.aclose()
+            return room, fetched, token, missing
+
+        room, fetched, token, missing = asyncio.run(scenario())
+        self.assertEqual(room['name'], fetched['name'])
+        self.assertEqual(token['token'], 'token-law-201-3-1')
+        self.assertIsNone(missing)
+        self.assertLessEqual(self.daily.connections, 2)
+
+    def test_async_pool_is_capped_and_replaced_clients_closed(self):
+        """Test that the transport carries the pool limit and a new loop closes the old client"""
+        service = AsyncDailyService(api_key='test-key', base_url=self.daily.url)
+
+        async def client():
+            return await service.get_client()
+
+        first = asyncio.run(client())
+        self.assertEqual(first._transport._pool._max_connections, POOL_SIZE)
+        second = asyncio.run(client())
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed)
+
+
+@pytest.mark.django_db
+class TestDeferredRoomProvisioning(APITestCase):
+    """Test cases for creating Daily.co rooms outside Meeting.save"""
+
+    def setUp(self):
+        self.daily = FakeDailyServer().__enter__()
+        self.addCleanup(self.daily.__exit__)
+        self.service = DailyService(api_key='test-key', base_url=self.daily.url)
+        self.addCleanup(self.service.close)
+        patcher = mock.patch('course_api.daily_service.daily_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.admin = UserFactory(user_type='admin')
+        self.course = CourseFactory(code='LAW 101', academic_year=AcademicYear.get_or_create_2025_2026())
+        self.entry = TimetableEntry.objects.create(
+            day='monday', subject='Torts', time='08:00 - 10:00', course=self.course
+        )
+
+    def test_save_queues_room_and_worker_provisions_it(self):
+        """Test that creating a meeting makes no Daily call until the job runs"""
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(reverse('create_meeting_for_timetable_entry', args=[self.entry.id]))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.daily.requests, [])
+        meeting = self.entry.meetings.get()
+        self.assertEqual(meeting.daily_room_name, '')
+        self.assertTrue(BackgroundJob.objects.filter(kind='provision_daily_room', payload={'meeting_id': meeting.id}).exists())
+
+        self.assertEqual(run_pending(), (1, 0))
+        meeting.refresh_from_db()
+        self.assertEqual(meeting.daily_room_name, 'law101-monday-08001000')
+        self.assertEqual(meeting.daily_room_url, 'https://example.daily.co/law101-monday-08001000')
+
+    def test_failed_provisioning_is_retried(self):
+        """Test that an API failure leaves the job pending for a retry"""
+        meeting = MeetingFactory(platform='daily', course=self.course, created_by=self.admin)
+        # The room lookup succeeds and creating it fails
+        self.daily.fail_next = [None, 500]
+        self.assertEqual(run_pending(), (0, 1))
+        meeting.refresh_from_db()
+        self.assertEqual(meeting.daily_room_name, '')
+        self.assertEqual(BackgroundJob.objects.get(kind='provision_daily_room').status, 'pending')
+
+    def test_unconfigured_daily_queues_nothing(self):
+        """Test that no job is queued when Daily.co is not configured"""
+        with mock.patch.object(self.service, 'api_key', ''):
+            MeetingFactory(platform='daily', course=self.course, created_by=self.admin)
+        self.assertFalse(BackgroundJob.objects.exists())
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+class TestMeetingTokenCache(APITestCase):
+    """Test cases for caching Daily.co meeting tokens"""
+
+    def setUp(self):
+        cache.clear()
+        self.daily = FakeDailyServer().__enter__()
+        self.addCleanup(self.daily.__exit__)
+        self.service = DailyService(api_key='test-key', base_url=self.daily.url)
+        self.addCleanup(self.service.close)
+        patcher = mock.patch('course_api.daily_service.daily_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def token_requests(self):
+        return [r for r in self.daily.requests if r[1] == '/v1/meeting-tokens']
+
+    def test_rejoining_reuses_the_token(self):
+        """Test that the same user, room and role mint one token"""
+        first = daily_tokens.get_meeting_token('law-101', '7', 'Ann')
+        self.assertEqual(daily_tokens.get_meeting_token('law-101', '7', 'Ann'), first)
+        self.assertEqual(first, 'token-law-101-7-0')
+        self.assertEqual(daily_tokens.get_meeting_token('law-101', '7', 'Ann', is_owner=True), 'token-law-101-7-1')
+        self.assertEqual(daily_tokens.get_meeting_token('law-102', '7', 'Ann'), 'token-law-102-7-0')
+        self.assertEqual(len(self.token_requests()), 3)
+        # The token is minted with the expiry the cache relies on
+        exp = self.token_requests()[0][2]['properties']['exp']
+        self.assertAlmostEqual(exp, time.time() + daily_tokens.TOKEN_LIFETIME, delta=60)
+
+    def test_token_is_refreshed_before_it_expires(self):
+        """Test that a token about to expire is replaced"""
+        key = daily_tokens._cache_key('law-101', '7', 'Ann', False)
+        cache.set(key, {'token': 'old', 'exp': int(time.time()) + daily_tokens.REFRESH_BEFORE - 5})
+        self.assertEqual(daily_tokens.get_meeting_token('law-101', '7', 'Ann'), 'token-law-101-7-0')
+        self.assertEqual(cache.get(key)['token'], 'token-law-101-7-0')
+        self.assertEqual(len(self.token_requests()), 1)
+
+    def test_concurrent_joins_share_one_request(self):
+        """Test that simultaneous requests for one token make a single API call"""
+        original = self.service.create_meeting_token
+
+        def slow_create(*args, **kwargs):
+            time.sleep(0.2)
+            return original(*args, **kwargs)
+
+        results = []
+        with mock.patch.object(self.service, 'create_meeting_token', side_effect=slow_create):
+            threads = [
+                threading.Thread(target=lambda: results.append(daily_tokens.get_meeting_token('law-101', '7', 'Ann')))
+                for _ in range(20)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results, ['token-law-101-7-0'] * 20)
+        self.assertEqual(len(self.token_requests()), 1)
+
+    def test_failures_are_not_cached(self):
+        """Test that a failed token request is retried on the next join"""
+        self.daily.fail_next = [500]
+        with self.assertRaises(Exception):
+            daily_tokens.get_meeting_token('law-101', '7', 'Ann')
+        self.assertEqual(daily_tokens.get_meeting_token('law-101', '7', 'Ann'), 'token-law-101-7-0')
+        self.assertEqual(len(self.token_requests()), 2)
+
+    def test_join_meeting_caches_the_token(self):
+        """Test that joining the same meeting twice mints one token"""
+        user = UserFactory()
+        course = CourseFactory(academic_year=AcademicYear.get_or_create_2025_2026())
+        meeting = MeetingFactory(platform='daily', course=course, created_by=user, status='scheduled')
+        self.client.force_authenticate(user)
+        tokens = [
+            self.client.post(reverse('join_meeting', args=[meeting.id])).data['daily_token'] for _ in range(2)
+        ]
+        self.assertEqual(tokens[0], tokens[1])
+        self.assertTrue(tokens[0].startswith('token-'))
+        self.assertEqual(len(self.token_requests()), 1)
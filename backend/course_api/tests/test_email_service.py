@@ -0,0 +1,164 @@
+import pytest
+from datetime import timedelta
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from course_api.email_outbox import (
+    DEAD_RETENTION, SENT_RETENTION, drain, purge, queue_email, queue_emails, requeue_email,
+)
+from course_api.email_service import (
+    notify_admin_of_student_registration, send_announcement_notification_emails, send_password_reset_email,
+    send_registration_approval_email, send_registration_approval_emails,
+    send_registration_rejection_email, send_verification_email
+)
+from course_api.models import EmailOutbox
+from communication.models import Announcement, ClassRepRole
+from directory.models import AcademicYear
+from directory.tests.test_models import UserFactory, StudentClassFactory
+
+
+class CountingBackend(EmailBackend):
+    """In-memory backend that counts connections and rejects one address"""
+
+    opened = 0
+    reject = 'bounce@example.com'
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        if any(self.reject in message.to for message in messages):
+            raise OSError('550 mailbox unavailable')
+        return super().send_messages(messages)
+
+
+@pytest.mark.django_db
+@override_settings(EMAIL_BACKEND='course_api.tests.test_email_service.CountingBackend')
+class TestBulkEmail(TestCase):
+    """Test cases for pooled bulk email sending"""
+
+    def setUp(self):
+        mail.outbox = []
+        CountingBackend.opened = 0
+
+    def test_approval_and_announcement_helpers(self):
+        """Test that the bulk helpers queue one outbox row per user and key"""
+        student_class = StudentClassFactory(academic_year=AcademicYear.get_or_create_2025_2026())
+        users = [UserFactory(user_type='student', student_class=student_class) for _ in range(3)]
+        self.assertEqual(send_registration_approval_emails(users), {u.id: True for u in users})
+        # Queuing again is a no-op
+        send_registration_approval_emails(users)
+        self.assertTrue(send_registration_approval_email(users[0]))
+        self.assertEqual(EmailOutbox.objects.filter(category='approval').count(), 3)
+
+        ClassRepRole.objects.create(user=users[0], student_class=student_class, permissions=['send_announcements'])
+        announcement = Announcement.objects.create(
+            sender=users[0], student_class=student_class, title='Exams', content='Timetable is out'
+        )
+        self.assertEqual(send_announcement_notification_emails(users[1:], announcement), {u.id: True for u in users[1:]})
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(drain(), (5, 0))
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(sorted(m.subject for m in mail.outbox)[0], 'Registration Approved - RiverLearn')
+        self.assertEqual(drain(), (0, 0))
+
+
+@pytest.mark.django_db
+@override_settings(EMAIL_BACKEND='course_api.tests.test_email_service.CountingBackend')
+class TestEmailOutbox(TestCase):
+    """Test cases for the persistent email outbox"""
+
+    def setUp(self):
+        mail.outbox = []
+        CountingBackend.opened = 0
+        self.user = UserFactory()
+
+    def test_register_style_senders_only_queue(self):
+        """Test that transactional senders store the email instead of sending it"""
+        self.assertTrue(send_verification_email(self.user, 'token-1'))
+        self.assertTrue(send_verification_email(self.user, 'token-1'))
+        self.assertTrue(send_verification_email(self.user, 'token-2'))
+        self.assertTrue(send_registration_rejection_email(self.user, reason='Incomplete details'))
+        self.assertTrue(send_password_reset_email(self.user, 'reset-token'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(CountingBackend.opened, 0)
+        self.assertEqual(
+            sorted(EmailOutbox.objects.values_list('category', flat=True)),
+            ['password_reset', 'rejection', 'verification', 'verification']
+        )
+        self.assertNotIn('token-1', EmailOutbox.objects.first().idempotency_key)
+
+        self.assertEqual(drain(), (4, 0))
+        rejection = next(m for m in mail.outbox if m.subject == 'Registration Update - Course Organizer')
+        self.assertIn('Incomplete details', rejection.body)
+        self.assertEqual(rejection.alternatives, [])
+
+    def test_each_status_change_gets_its_own_email(self):
+        """Test that approve, reject, approve again sends three emails but retries of one event send one"""
+        self.user.save()
+        self.assertTrue(send_registration_approval_email(self.user))
+        self.assertTrue(send_registration_approval_email(self.user))
+        self.user.status = 'rejected'
+        self.user.save()
+        self.assertTrue(send_registration_rejection_email(self.user))
+        self.user.status = 'approved'
+        self.user.save()
+        send_registration_approval_emails([self.user])
+        notify_admin_of_student_registration('Ann', 'Otieno', 'ann@example.com', record_id=1)
+        notify_admin_of_student_registration('Ann', 'Otieno', 'ann@example.com', record_id=1)
+        notify_admin_of_student_registration('Ann', 'Otieno', 'ann@example.com', record_id=2)
+        self.assertEqual(
+            sorted(EmailOutbox.objects.values_list('category', flat=True)),
+            ['admin_notification', 'admin_notification', 'approval', 'approval', 'rejection'],
+        )
+
+    def test_batches_and_concurrency(self):
+        """Test that due emails are split into batches, one connection each"""
+        queue_emails([
+            {'idempotency_key': f'test:{i}', 'category': 'announcement', 'to_email': f's{i}@example.com',
+             'subject': 'Hi', 'text_body': 'Hello'}
+            for i in range(7)
+        ])
+        self.assertEqual(drain(limit=5, batch_size=2, concurrency=2), (5, 0))
+        self.assertEqual(CountingBackend.opened, 3)
+        self.assertEqual(drain(limit=5, batch_size=2, concurrency=2), (2, 0))
+        self.assertFalse(EmailOutbox.objects.exclude(status='sent').exists())
+
+    def test_backoff_then_dead(self):
+        """Test that failed sends back off and are given up on after max_attempts"""
+        entry, _ = queue_email('test:bounce', 'announcement', CountingBackend.reject, 'Hi', 'Hello')
+        EmailOutbox.objects.filter(pk=entry.pk).update(max_attempts=2)
+        self.assertEqual(drain(), (0, 1))
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts), ('pending', 1))
+        self.assertGreater(entry.next_attempt_at, timezone.now() + timedelta(seconds=20))
+        self.assertEqual(drain(), (0, 0))
+
+        EmailOutbox.objects.filter(pk=entry.pk).update(next_attempt_at=timezone.now())
+        drain()
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'dead')
+
+        self.assertTrue(requeue_email('test:bounce'))
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts), ('pending', 0))
+
+    def test_sent_bodies_are_blanked_and_old_rows_purged(self):
+        """Test that delivered emails keep no links and finished rows go after their retention"""
+        self.assertTrue(send_password_reset_email(self.user, 'reset-token'))
+        self.assertEqual(drain(), (1, 0))
+        self.assertIn('reset-token', mail.outbox[0].body)
+        row = EmailOutbox.objects.get()
+        self.assertEqual((row.status, row.text_body, row.html_body), ('sent', '', ''))
+        # Sent rows cannot be sent again with an empty body
+        self.assertFalse(requeue_email(row.idempotency_key))
+
+        queue_email('test:dead', 'announcement', 'x@example.com', 'Hi', 'Hello')
+        EmailOutbox.objects.filter(idempotency_key='test:dead').update(status='dead')
+        self.assertEqual(purge(), 0)
+        self.assertEqual(purge(now=timezone.now() + SENT_RETENTION + timedelta(minutes=1)), 1)
+        self.assertEqual(purge(now=timezone.now() + DEAD_RETENTION + timedelta(minutes=1)), 1)
+        self.assertFalse(EmailOutbox.objects.exists())
@@ -0,0 +1,113 @@
+import time
+import pytest
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from course_api import jitsi_auth as jitsi
+from course_api.job_queue import run_pending
+from course_api.models import BackgroundJob
+from course_api.tests.test_models import CourseFactory, MeetingFactory
+from directory.models import AcademicYear
+from directory.tests.test_models import UserFactory, StudentClassFactory
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'jitsi-tests'}}
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+class TestJitsiTokenCache(TestCase):
+    """Test cases for reusing signed Jitsi tokens"""
+
+    def setUp(self):
+        cache.clear()
+        self.auth = jitsi.JitsiJWTAuth()
+        self.user = UserFactory(first_name='Ann', last_name='Wanjiru')
+
+    def test_token_is_signed_once(self):
+        """Test that the same user, room and role reuse one signed token"""
+        with mock.patch.object(jitsi.jwt, 'encode', wraps=jitsi.jwt.encode) as encode:
+            token = self.auth.get_token(self.user, 'law-101')
+            self.assertEqual(self.auth.get_token(self.user, 'law-101'), token)
+            self.assertNotEqual(self.auth.get_token(self.user, 'law-101', moderator=True), token)
+        self.assertEqual(encode.call_count, 2)
+        payload = self.auth.verify_token(token)
+        self.assertEqual(payload['room'], 'law-101')
+        self.assertEqual(payload['context']['user']['name'], 'Ann Wanjiru')
+
+    def test_token_is_refreshed_before_it_expires(self):
+        """Test that a token inside the refresh window is signed again"""
+        key = self.auth._cache_key(self.user, 'law-101', False)
+        cache.set(key, {'token': 'old', 'exp': int(time.time()) + jitsi.REFRESH_BEFORE - 5})
+        token = self.auth.get_token(self.user, 'law-101')
+        self.assertNotEqual(token, 'old')
+        self.assertEqual(cache.get(key)['token'], token)
+
+    def test_keys_are_parsed_once(self):
+        """Test that instances share one parsed key pair"""
+        self.assertIs(jitsi.JitsiJWTAuth().private_key, self.auth.private_key)
+        token = jitsi.JitsiJWTAuth().generate_token(self.user, 'law-101')
+        self.assertEqual(self.auth.verify_token(token)['room'], 'law-101')
+
+    def test_presign_fills_the_cache(self):
+        """Test that pre-signed tokens are served to later joins without signing"""
+        other = UserFactory()
+        tokens = self.auth.presign_tokens([self.user, other], 'law-101', moderator_ids=[other.id])
+        self.assertTrue(self.auth.verify_token(tokens[other.id])['context']['user']['moderator'])
+        with mock.patch.object(jitsi.jwt, 'encode') as encode:
+            self.assertEqual(self.auth.get_token(self.user, 'law-101'), tokens[self.user.id])
+            self.assertEqual(self.auth.get_token(other, 'law-101', moderator=True), tokens[other.id])
+            self.assertEqual(self.auth.presign_tokens([self.user], 'law-101'), {self.user.id: tokens[self.user.id]})
+        encode.assert_not_called()
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+class TestMeetingPresign(APITestCase):
+    """Test cases for signing a class's tokens before a Jitsi meeting"""
+
+    def setUp(self):
+        cache.clear()
+        year = AcademicYear.get_or_create_2025_2026()
+        older_year = AcademicYear.objects.create(year_start=2023, year_end=2024, is_active=False)
+        self.student_class = StudentClassFactory(academic_year=older_year)
+        self.other_class = StudentClassFactory(academic_year=older_year, graduation_year=2031)
+        self.course = CourseFactory(academic_year=year, year=3, semester=1)
+        self.course.target_classes.add(self.student_class)
+        self.students = [
+            UserFactory(user_type='student', status='approved', student_class=self.student_class) for _ in range(3)
+        ]
+        self.outsider = UserFactory(user_type='student', status='approved', student_class=self.other_class)
+        self.lecturer = UserFactory(user_type='admin')
+
+    def test_meeting_queues_presign_and_join_reuses_tokens(self):
+        """Test that the presign job signs the class's tokens and joining reads them"""
+        starts = timezone.now() + timedelta(hours=2)
+        meeting = MeetingFactory(platform='jitsi', course=self.course, created_by=self.lecturer, scheduled_time=starts)
+        job = BackgroundJob.objects.get(kind='presign_jitsi_tokens')
+        self.assertEqual(job.run_at, starts - jitsi.PRESIGN_LEAD)
+
+        tokens = jitsi.presign_meeting_tokens(meeting)
+        self.assertEqual(set(tokens), {s.id for s in self.students} | {self.lecturer.id, meeting.admin_host_id})
+        payload = jitsi.jitsi_auth.verify_token(tokens[self.lecturer.id])
+        self.assertEqual(payload['room'], meeting.jitsi_token_room_name)
+        self.assertTrue(payload['context']['user']['moderator'])
+
+        self.client.force_authenticate(self.students[0])
+        with mock.patch.object(jitsi.jwt, 'encode') as encode:
+            response = self.client.post(reverse('generate_meeting_token', args=[meeting.id]))
+        encode.assert_not_called()
+        self.assertEqual(response.data['token'], tokens[self.students[0].id])
+
+    def test_presign_job_runs_when_due(self):
+        """Test that the worker runs the presign job for a meeting about to start"""
+        meeting = MeetingFactory(
+            platform='jitsi', course=self.course, created_by=self.lecturer,
+            scheduled_time=timezone.now() + timedelta(minutes=5),
+        )
+        self.assertEqual(run_pending(kinds=['presign_jitsi_tokens']), (1, 0))
+        key = jitsi.jitsi_auth._cache_key(self.students[0], meeting.jitsi_token_room_name, False)
+        self.assertIsNotNone(cache.get(key))
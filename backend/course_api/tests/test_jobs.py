@@ -0,0 +1,163 @@
+import io
+import pytest
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from communication import jobs as communication_jobs
+from communication.models import Announcement, ClassRepRole
+from course_api.email_outbox import drain
+from course_api.job_queue import enqueue, job_handler, requeue, run_pending
+from course_api.models import BackgroundJob
+from directory.models import AcademicYear
+from directory.tests.test_models import UserFactory, StudentClassFactory
+
+
+calls = []
+
+
+@job_handler('test_flaky')
+def flaky(job):
+    calls.append(job.attempts)
+    if job.attempts < job.payload.get('succeed_on', 99):
+        raise RuntimeError('boom')
+
+
+@pytest.mark.django_db
+class TestJobQueue(TestCase):
+    """Test cases for the database-backed job queue"""
+
+    def setUp(self):
+        calls.clear()
+
+    def _make_due(self, job):
+        BackgroundJob.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+    def test_retries_with_backoff_then_succeeds(self):
+        """Test that a failing job is rescheduled with growing delays until it succeeds"""
+        job = enqueue('test_flaky', {'succeed_on': 3})
+        self.assertEqual(run_pending(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        first_delay = job.run_at - timezone.now()
+        self.assertGreater(first_delay, timedelta(seconds=20))
+        self.assertIn('boom', job.last_error)
+
+        # Not due yet, so nothing runs
+        self.assertEqual(run_pending(), (0, 0))
+        self._make_due(job)
+        run_pending()
+        job.refresh_from_db()
+        self.assertGreater(job.run_at - timezone.now(), first_delay)
+
+        self._make_due(job)
+        self.assertEqual(run_pending(), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('succeeded', 3, ''))
+        self.assertEqual(calls, [1, 2, 3])
+
+    def test_dead_letter_and_requeue(self):
+        """Test that jobs out of attempts are parked as dead and can be requeued"""
+        job = enqueue('test_flaky', max_attempts=2)
+        run_pending()
+        self._make_due(job)
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'dead')
+        self.assertIsNotNone(job.finished_at)
+
+        requeue(BackgroundJob.objects.filter(pk=job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 0))
+
+    def test_unknown_kind_is_dead_immediately(self):
+        """Test that a job without a handler does not burn retries"""
+        job = enqueue('no_such_kind')
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'dead')
+
+    def test_stale_running_job_is_reclaimed(self):
+        """Test that a job left running by a dead worker is picked up again"""
+        job = enqueue('test_flaky', {'succeed_on': 1})
+        BackgroundJob.objects.filter(pk=job.pk).update(
+            status='running', locked_at=timezone.now() - timedelta(hours=1), attempts=0
+        )
+        self.assertEqual(run_pending(), (1, 0))
+
+    def test_kinds_can_be_excluded(self):
+        """Test that a worker started with exclude_kinds leaves those jobs for another pool"""
+        enqueue('test_flaky', {'succeed_on': 1})
+        self.assertEqual(run_pending(exclude_kinds=['test_flaky']), (0, 0))
+        self.assertEqual(run_pending(kinds=['test_flaky']), (1, 0))
+
+    def test_worker_survives_database_errors(self):
+        """Test that run_jobs logs a failed poll, backs off and keeps polling"""
+        polls = [OperationalError('server closed the connection'), (1, 0), KeyboardInterrupt]
+        with mock.patch('course_api.job_queue.run_pending', side_effect=polls) as run, \
+                mock.patch('course_api.management.commands.run_jobs.time.sleep') as sleep:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('run_jobs', '--sleep', '1', stdout=io.StringIO())
+        self.assertEqual(run.call_count, 3)
+        sleep.assert_called_once_with(2.0)
+
+
+@pytest.mark.django_db
+class TestAnnouncementFanOut(APITestCase):
+    """Test cases for queued announcement emails"""
+
+    def setUp(self):
+        self.student_class = StudentClassFactory(academic_year=AcademicYear.get_or_create_2025_2026())
+        self.rep = UserFactory(user_type='student', student_class=self.student_class)
+        ClassRepRole.objects.create(
+            user=self.rep, student_class=self.student_class, permissions=['send_announcements']
+        )
+        self.students = [UserFactory(user_type='student', student_class=self.student_class) for _ in range(5)]
+        self.client.force_authenticate(self.rep)
+
+    def _post(self):
+        response = self.client.post(reverse('communication:announcement-list-create'), {
+            'student_class': self.student_class.id, 'title': 'Moot court', 'content': 'Room 4 at 2pm',
+        })
+        self.assertEqual(response.status_code, 201)
+        return Announcement.objects.get()
+
+    def test_post_enqueues_and_worker_sends_in_batches(self):
+        """Test that posting only queues work and the worker emails every student in chunks"""
+        mail.outbox.clear()
+        announcement = self._post()
+        self.assertEqual(len(mail.outbox), 0)
+        fanout = BackgroundJob.objects.get(kind='announcement_fanout')
+        self.assertEqual(fanout.payload, {'announcement_id': announcement.id})
+
+        with mock.patch.object(communication_jobs, 'EMAIL_BATCH_SIZE', 2):
+            run_pending()
+        batches = BackgroundJob.objects.filter(kind='announcement_email_batch', parent=fanout)
+        self.assertEqual(batches.count(), 3)
+
+        run_pending()
+        self.assertEqual(len(mail.outbox), 0)
+        drain()
+        self.assertEqual(
+            sorted(m.to[0] for m in mail.outbox), sorted(s.email for s in self.students)
+        )
+        self.assertFalse(BackgroundJob.objects.exclude(status='succeeded').exists())
+
+    def test_failed_recipients_are_retried_alone(self):
+        """Test that a batch retry only re-queues the emails that failed"""
+        self._post()
+        run_pending()
+        flaky_id = self.students[0].id
+
+        def send(users, announcement):
+            return {user.id: user.id != flaky_id for user in users}
+
+        with mock.patch('course_api.email_service.send_announcement_notification_emails', side_effect=send):
+            run_pending()
+        batch = BackgroundJob.objects.get(kind='announcement_email_batch')
+        self.assertEqual((batch.status, batch.payload['user_ids']), ('pending', [flaky_id]))
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+from course_organizer.media import content_type_for, parse_range
+
+
+class TestMediaDelivery(TestCase):
+    """Test cases for serving media files with ranges, validators and X-Accel-Redirect"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        os.makedirs(os.path.join(self.media_root, 'recordings'))
+        self.data = bytes(range(256)) * 40
+        self.path = os.path.join(self.media_root, 'recordings', 'lecture.mp4')
+        with open(self.path, 'wb') as f:
+            f.write(self.data)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_ACCEL_REDIRECT_PREFIX='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def get(self, path='/media/recordings/lecture.mp4', **headers):
+        return self.client.get(path, **headers)
+
+    def test_full_file_with_validators(self):
+        """Test that a plain GET streams the file with ETag, Last-Modified and Accept-Ranges"""
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Last-Modified'], http_date(os.stat(self.path).st_mtime))
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_range_requests(self):
+        """Test that single ranges get 206 and unsatisfiable ones 416"""
+        response = self.get(HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.data)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(b''.join(response.streaming_content), self.data[100:200])
+
+        response = self.get(HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.data[-10:])
+
+        response = self.get(HTTP_RANGE=f'bytes={len(self.data)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.data)}')
+
+    def test_if_range_falls_back_to_full_file_when_changed(self):
+        """Test that a stale If-Range validator returns the whole file"""
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code, 206)
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"').status_code, 200)
+
+    def test_conditional_get(self):
+        """Test that a matching ETag or date answers 304 without a body"""
+        first = self.get()
+        response = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+
+    def test_x_accel_redirect(self):
+        """Test that with a prefix configured nginx is told to send the file"""
+        with override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/recordings/lecture.mp4')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response.content, b'')
+
+    def test_paths_outside_media_root_are_not_served(self):
+        """Test that missing files and traversal attempts 404"""
+        self.assertEqual(self.get('/media/recordings/missing.mp4').status_code, 404)
+        self.assertEqual(self.get('/media/recordings/%2e%2e/%2e%2e/etc/passwd').status_code, 404)
+
+    def test_helpers(self):
+        """Test the content type map and Range parsing edge cases"""
+        self.assertEqual(
+            content_type_for('Week 1.PPTX'),
+            'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+        )
+        self.assertEqual(content_type_for('notes.unknown'), 'application/octet-stream')
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(parse_range('items=0-1', 100))
+        self.assertEqual(parse_range('bytes=90-500', 100), (90, 99))
+        self.assertIs(parse_range('bytes=-0', 100), False)
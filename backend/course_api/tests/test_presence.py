@@ -0,0 +1,40 @@
+import asyncio
+import time
+from django.test import SimpleTestCase
+from course_api.presence import InMemoryPresenceBackend
+
+
+class TestInMemoryPresenceBackend(SimpleTestCase):
+    """Test cases for the per-connection presence registry"""
+
+    def setUp(self):
+        self.presence = InMemoryPresenceBackend(ttl=30)
+        self.room = 'study_group_1'
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_multiple_tabs_keep_user_online(self):
+        """Test that a user stays online until their last connection closes"""
+        self.assertTrue(self.run_async(self.presence.add(self.room, 'chan-a', 1, 'Ann')))
+        self.assertFalse(self.run_async(self.presence.add(self.room, 'chan-b', 1, 'Ann')))
+        self.assertEqual(self.run_async(self.presence.snapshot(self.room)), [{'id': 1, 'name': 'Ann'}])
+
+        self.assertFalse(self.run_async(self.presence.remove(self.room, 'chan-a')))
+        self.assertTrue(self.run_async(self.presence.remove(self.room, 'chan-b')))
+        self.assertEqual(self.run_async(self.presence.snapshot(self.room)), [])
+
+    def test_expired_connections_are_dropped(self):
+        """Test that connections which stop heartbeating age out"""
+        self.run_async(self.presence.add(self.room, 'chan-a', 1, 'Ann'))
+        self.run_async(self.presence.add(self.room, 'chan-b', 2, 'Ben'))
+        self.presence._rooms[self.room]['chan-a']['exp'] = time.time() - 1
+
+        self.assertEqual(self.run_async(self.presence.snapshot(self.room)), [{'id': 2, 'name': 'Ben'}])
+
+    def test_touch_extends_expiry(self):
+        """Test that heartbeats push the expiry forward"""
+        self.run_async(self.presence.add(self.room, 'chan-a', 1, 'Ann'))
+        self.presence._rooms[self.room]['chan-a']['exp'] = time.time() + 1
+        self.run_async(self.presence.touch(self.room, 'chan-a'))
+        self.assertGreater(self.presence._rooms[self.room]['chan-a']['exp'], time.time() + 20)
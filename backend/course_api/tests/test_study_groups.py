@@ -0,0 +1,362 @@
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from factory import Faker, SubFactory
+from factory.django import DjangoModelFactory
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase, APIClient
+from django.urls import reverse
+from course_api.consumers import member_group_name
+from course_api.models import StudyGroup, StudyGroupMembership, StudyGroupJoinRequest, GroupMessage, GroupMaterial, GroupTopic
+from directory.models import AcademicYear
+from directory.tests.test_models import UserFactory, StudentClassFactory
+
+
+class StudyGroupFactory(DjangoModelFactory):
+    class Meta:
+        model = StudyGroup
+
+    name = Faker('bothify', text='Group ####')
+    student_class = SubFactory(StudentClassFactory)
+    created_by = SubFactory(UserFactory)
+
+
+@pytest.mark.django_db
+class TestGroupMessagesAPI(APITestCase):
+    """Test cases for the paginated study group history API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.other = UserFactory()
+        student_class = StudentClassFactory(academic_year=AcademicYear.get_or_create_2025_2026())
+        self.group = StudyGroupFactory(created_by=self.user, student_class=student_class)
+        StudyGroupMembership.objects.create(group=self.group, user=self.user, role='admin')
+        StudyGroupMembership.objects.create(group=self.group, user=self.other)
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        self.url = reverse('group_messages', args=[self.group.id])
+
+    def _create_messages(self, count):
+        messages = []
+        for i in range(count):
+            msg = GroupMessage.objects.create(
+                group=self.group,
+                sender=self.user if i % 2 else self.other,
+                body=f'message {i}',
+                reply_to=messages[-1] if messages else None,
+            )
+            msg.mentioned_users.add(self.other)
+            messages.append(msg)
+        return messages
+
+    def test_default_page_is_newest_in_chronological_order(self):
+        """Test that the first page holds the newest messages, oldest first"""
+        messages = self._create_messages(5)
+        response = self.client.get(self.url, {'limit': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [m['id'] for m in response.data['results']]
+        self.assertEqual(ids, [m.id for m in messages[2:]])
+        self.assertIsNotNone(response.data['previous'])
+        self.assertIsNone(response.data['next'])
+
+    def test_before_and_after_cursors_walk_history(self):
+        """Test that before/after cursors return adjacent pages without overlap"""
+        messages = self._create_messages(5)
+        first = self.client.get(self.url, {'limit': 3}).data
+        older = self.client.get(self.url, {'limit': 3, 'before': first['before']}).data
+        self.assertEqual([m['id'] for m in older['results']], [m.id for m in messages[:2]])
+        self.assertIsNone(older['previous'])
+
+        newer = self.client.get(self.url, {'limit': 3, 'after': older['after']}).data
+        self.assertEqual([m['id'] for m in newer['results']], [m.id for m in messages[2:]])
+
+    def test_page_size_is_capped(self):
+        """Test that oversized limits are clamped to the maximum page size"""
+        self._create_messages(3)
+        response = self.client.get(self.url, {'limit': 100000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_invalid_cursor_returns_400(self):
+        """Test that a malformed cursor is rejected"""
+        response = self.client.get(self.url, {'before': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_is_constant(self):
+        """Test that page size does not change the number of queries"""
+        self._create_messages(4)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url, {'limit': 2})
+        self._create_messages(20)
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url, {'limit': 20})
+        self.assertEqual(len(small), len(large))
+
+
+@pytest.mark.django_db
+class TestGroupMessageReferences(APITestCase):
+    """Test cases for persisting chat messages with their references"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.other = UserFactory()
+        student_class = StudentClassFactory(academic_year=AcademicYear.get_or_create_2025_2026())
+        self.group = StudyGroupFactory(created_by=self.user, student_class=student_class)
+        self.material = GroupMaterial.objects.create(group=self.group, title='Notes', uploaded_by=self.user)
+
+    def test_parse_references(self):
+        """Test that mentions, materials and topics are extracted from the body"""
+        refs = GroupMessage.parse_references(
+            '@[4:Ann] and @7 see [[group_3:Notes]] [[course_9:Intro]] [[12]] #exam #torts #exam'
+        )
+        self.assertEqual(refs['user_ids'], {4, 7})
+        self.assertEqual(refs['group_material_ids'], {3})
+        self.assertEqual(refs['course_material_ids'], {9, 12})
+        self.assertEqual(refs['topics'], ['exam', 'torts'])
+
+    def test_create_with_references(self):
+        """Test that the message and its M2M rows are written in one pass"""
+        parent = GroupMessage.objects.create(group=self.group, sender=self.other, body='question')
+        body = f'@[{self.other.id}:Other] read [[group_{self.material.id}:Notes]] #revision @999999'
+
+        with CaptureQueriesContext(connection) as ctx:
+            msg = GroupMessage.create_with_references(self.group.id, self.user, body, parent.id)
+        # reply, users, group materials, message insert, two topic index writes,
+        # two bulk inserts (+ savepoint pair)
+        self.assertLessEqual(len(ctx), 10)
+
+        self.assertEqual(msg.reply_to, parent)
+        self.assertEqual([u.id for u in msg.mentioned], [self.other.id])
+        self.assertEqual([m.id for m in msg.group_materials], [self.material.id])
+        msg.refresh_from_db()
+        self.assertEqual(msg.topics, ['revision'])
+        self.assertEqual(list(msg.mentioned_users.values_list('id', flat=True)), [self.other.id])
+        self.assertEqual(list(msg.referenced_group_materials.values_list('id', flat=True)), [self.material.id])
+
+    def test_group_materials_are_scoped_to_the_group(self):
+        """Test that references to another group's materials are dropped"""
+        other_group = StudyGroupFactory(created_by=self.user, student_class=self.group.student_class)
+        foreign = GroupMaterial.objects.create(group=other_group, title='Secret', uploaded_by=self.user)
+        msg = GroupMessage.create_with_references(self.group.id, self.user, f'[[group_{foreign.id}:Secret]]')
+        self.assertEqual(msg.group_materials, [])
+        self.assertFalse(msg.referenced_group_materials.exists())
+
+
+@pytest.mark.django_db
+class TestMemberEviction(APITestCase):
+    """Test cases for closing chat sockets when membership is revoked"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = UserFactory()
+        self.member = UserFactory()
+        student_class = StudentClassFactory(academic_year=AcademicYear.get_or_create_2025_2026())
+        self.group = StudyGroupFactory(created_by=self.admin, student_class=student_class)
+        StudyGroupMembership.objects.create(group=self.group, user=self.admin, role='admin')
+        StudyGroupMembership.objects.create(group=self.group, user=self.member)
+        self.channel_layer = get_channel_layer()
+        self.channel_name = async_to_sync(self.channel_layer.new_channel)()
+        async_to_sync(self.channel_layer.group_add)(
+            member_group_name(self.group.id, self.member.id), self.channel_name
+        )
+
+    def _authenticate(self, user):
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def _receive(self):
+        return async_to_sync(self.channel_layer.receive)(self.channel_name)
+
+    def test_remove_member_evicts_sockets(self):
+        """Test that removing a member notifies their open sockets"""
+        self._authenticate(self.admin)
+        url = reverse('remove_member_from_group', args=[self.group.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'user_id': self.member.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._receive(), {'type': 'membership_revoked', 'group_id': self.group.id})
+
+    def test_leave_group_evicts_sockets(self):
+        """Test that leaving a group closes the user's other tabs"""
+        self._authenticate(self.member)
+        url = reverse('leave_study_group', args=[self.group.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._receive()['type'], 'membership_revoked')
+
+
+@pytest.mark.django_db
+class TestGroupTopicIndex(APITestCase):
+    """Test cases for the incrementally maintained topic index"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        student_class = StudentClassFactory(academic_year=AcademicYear.get_or_create_2025_2026())
+        self.group = StudyGroupFactory(created_by=self.user, student_class=student_class)
+        StudyGroupMembership.objects.create(group=self.group, user=self.user, role='admin')
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        self.url = reverse('chat_autocomplete', args=[self.group.id])
+
+    def _post(self, body):
+        return GroupMessage.create_with_references(self.group.id, self.user, body)
+
+    def _counts(self):
+        return dict(GroupTopic.objects.filter(group=self.group).values_list('key', 'message_count'))
+
+    def test_index_tracks_create_edit_and_delete(self):
+        """Test that counts follow messages being created, edited, soft and hard deleted"""
+        first = self._post('#Exam prep #torts')
+        second = self._post('more #exam')
+        self.assertEqual(self._counts(), {'exam': 2, 'torts': 1})
+
+        first.topics = ['torts', 'contract']
+        first.save()
+        self.assertEqual(self._counts(), {'exam': 1, 'torts': 1, 'contract': 1})
+
+        reloaded = GroupMessage.objects.get(pk=second.pk)
+        reloaded.deleted = True
+        reloaded.save()
+        self.assertEqual(self._counts(), {'torts': 1, 'contract': 1})
+
+        GroupMessage.objects.filter(pk=first.pk).delete()
+        self.assertEqual(self._counts(), {})
+
+    def test_autocomplete_is_prefix_match_by_popularity(self):
+        """Test that topic autocomplete returns prefix matches, most used first"""
+        self._post('#torts')
+        self._post('#tax #torts')
+        self._post('#contract')
+        response = self.client.get(self.url, {'type': 'topics', 'q': 't'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([t['topic'] for t in response.data], ['torts', 'tax'])
+
+    def test_autocomplete_query_count_is_constant(self):
+        """Test that topic lookups do not scan chat history"""
+        self._post('#torts')
+        self.client.get(self.url, {'type': 'topics'})  # warm the member directory
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url, {'type': 'topics', 'q': 'to'})
+        for i in range(20):
+            self._post(f'#torts message {i}')
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url, {'type': 'topics', 'q': 'to'})
+        self.assertEqual(len(small), len(large))
+
+
+@pytest.mark.django_db
+class TestMemberDirectory(APITestCase):
+    """Test cases for @mention autocomplete from the cached member directory"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory(first_name='Zed', last_name='Admin')
+        self.ann = UserFactory(first_name='Ann', last_name='Wanjiru', registration_number='GPR3/123456/2025')
+        self.ben = UserFactory(first_name='Ben', last_name='Anderson', registration_number='GPR3/654321/2025')
+        student_class = StudentClassFactory(academic_year=AcademicYear.get_or_create_2025_2026())
+        self.group = StudyGroupFactory(created_by=self.user, student_class=student_class)
+        for user in (self.user, self.ann, self.ben):
+            StudyGroupMembership.objects.create(group=self.group, user=user)
+        self.client.force_authenticate(self.user)
+        self.url = reverse('chat_autocomplete', args=[self.group.id])
+
+    def _names(self, q):
+        response = self.client.get(self.url, {'type': 'users', 'q': q})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [u['name'] for u in response.data]
+
+    def test_prefix_matches_name_words_and_registration_number(self):
+        """Test that any name word or the registration number matches by prefix"""
+        self.assertEqual(self._names('an'), ['Ann Wanjiru', 'Ben Anderson'])
+        self.assertEqual(self._names('wan'), ['Ann Wanjiru'])
+        self.assertEqual(self._names('gpr3/65'), ['Ben Anderson'])
+        self.assertEqual(self._names('zed'), [])  # never suggests the caller
+
+    def test_warm_lookup_does_not_query(self):
+        """Test that repeated keystrokes are served without database queries"""
+        self._names('a')
+        with CaptureQueriesContext(connection) as ctx:
+            self._names('an')
+        self.assertEqual(len(ctx), 0)
+
+    def test_membership_changes_invalidate(self):
+        """Test that joins and removals are reflected immediately"""
+        self.assertEqual(self._names('car'), [])
+        carol = UserFactory(first_name='Carol', last_name='Otieno')
+        StudyGroupMembership.objects.create(group=self.group, user=carol)
+        self.assertEqual(self._names('car'), ['Carol Otieno'])
+        StudyGroupMembership.objects.filter(group=self.group, user=carol).delete()
+        self.assertEqual(self._names('car'), [])
+
+    def test_non_members_are_forbidden(self):
+        """Test that outsiders get 403 and unknown groups 404"""
+        self.client.force_authenticate(UserFactory())
+        self.assertEqual(self.client.get(self.url, {'type': 'users'}).status_code, status.HTTP_403_FORBIDDEN)
+        missing = reverse('chat_autocomplete', args=[self.group.id + 1000])
+        self.assertEqual(self.client.get(missing, {'type': 'users'}).status_code, status.HTTP_404_NOT_FOUND)
+
+
+@pytest.mark.django_db
+class TestStudyGroupListing(APITestCase):
+    """Test cases for annotated study group listings"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.student_class = StudentClassFactory(academic_year=AcademicYear.get_or_create_2025_2026())
+        self.user = UserFactory(student_class=self.student_class)
+        self.client.force_authenticate(self.user)
+
+    def _group(self, members=2, pending=0, **kwargs):
+        group = StudyGroupFactory(created_by=self.user, student_class=self.student_class, **kwargs)
+        for _ in range(members):
+            StudyGroupMembership.objects.create(group=group, user=UserFactory())
+        for _ in range(pending):
+            StudyGroupJoinRequest.objects.create(group=group, user=UserFactory())
+        StudyGroupJoinRequest.objects.create(group=group, user=UserFactory(), status='denied')
+        return group
+
+    def test_counts_and_role(self):
+        """Test that member counts, pending requests and the caller's role are listed"""
+        mine = self._group(members=2, pending=3, name='Alpha')
+        StudyGroupMembership.objects.create(group=mine, user=self.user, role='admin')
+        other = self._group(members=1, name='Beta')
+
+        response = self.client.get(reverse('study_groups'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = {g['id']: g for g in response.data}
+        self.assertEqual(
+            (rows[mine.id]['members_count'], rows[mine.id]['pending_requests'], rows[mine.id]['my_role']),
+            (3, 3, 'admin')
+        )
+        self.assertEqual(
+            (rows[other.id]['members_count'], rows[other.id]['pending_requests'], rows[other.id]['my_role']),
+            (1, 0, None)
+        )
+
+        response = self.client.get(reverse('my_study_groups'))
+        self.assertEqual([(g['id'], g['members_count']) for g in response.data], [(mine.id, 3)])
+
+    def test_counts_do_not_join_members_with_requests(self):
+        """Test that the counts are correlated subqueries, so rows do not multiply per group"""
+        sql = str(StudyGroup.for_listing(self.user).query)
+        self.assertNotIn('JOIN "course_api_studygroupmembership"', sql)
+        self.assertNotIn('JOIN "course_api_studygroupjoinrequest"', sql)
+        self.assertNotIn('GROUP BY "course_api_studygroup"', sql)
+
+    def test_listing_cost_is_flat(self):
+        """Test that listing more groups does not add queries"""
+        self._group(name='Group 0')
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('study_groups'))
+        for i in range(1, 6):
+            self._group(members=3, pending=1, name=f'Group {i}')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('study_groups'))
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(len(small), len(large))
@@ -0,0 +1,104 @@
+import datetime
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from course_api.tests.test_models import CourseFactory, CourseContentFactory
+from course_content.models import Assignment, Material, PastPaper
+from directory.models import AcademicYear
+from directory.tests.test_models import UserFactory, SemesterFactory
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'timeline-tests'}}
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+class TestCourseTimelineAPI(APITestCase):
+    """Test cases for the merged, cached course timeline"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.year = AcademicYear.get_or_create_2025_2026()
+        self.user = UserFactory()
+        self.client.force_authenticate(self.user)
+        self.course = CourseFactory(academic_year=self.year)
+        self.semester = SemesterFactory(academic_year=self.year)
+        self.url = reverse('get_course_timeline', args=[self.course.id])
+
+    def _content(self, model, **kwargs):
+        return model.objects.create(
+            course=self.course, academic_year=self.year, semester=self.semester,
+            uploaded_by=self.user, **kwargs
+        )
+
+    def test_legacy_content_is_grouped_and_the_rest_listed_as_course_materials(self):
+        """Test that only CourseContent is dated; course_content types stay in Course Materials, unfiltered"""
+        day1, day2 = datetime.date(2025, 9, 1), datetime.date(2025, 9, 8)
+        first = CourseContentFactory(course=self.course, uploaded_by=self.user, lesson_date=day1)
+        second = CourseContentFactory(course=self.course, uploaded_by=self.user, lesson_date=day2)
+        paper = self._content(PastPaper, title='Final 2024')
+        material = self._content(Material, title='Reading', material_type='pdf', lesson_date=day2)
+        assignment = self._content(Assignment, title='Essay', lesson_date=day2, due_date=day2)
+
+        response = self.client.get(self.url, {'end_date': '2025-09-01'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sections = [
+            (s['lesson_date'], s['lesson_date_display'], [(c['type'], c['data']['id']) for c in s['content']])
+            for s in response.data['timeline']
+        ]
+        self.assertEqual(sections, [
+            (day1, 'September 01, 2025', [('old_content', first.id)]),
+            (None, 'Course Materials', [
+                ('past_paper', paper.id), ('material', material.id), ('assignment', assignment.id),
+            ]),
+        ])
+        self.assertEqual(response.data['total_content'], 4)
+        self.assertEqual(response['ETag'][0], '"')
+        self.assertIn(second.id, [c['data']['id'] for s in self.client.get(self.url).data['timeline'] for c in s['content']])
+
+    def test_query_count_does_not_grow_with_content(self):
+        """Test that the timeline is built with a fixed number of queries"""
+        for day in range(1, 6):
+            CourseContentFactory(course=self.course, uploaded_by=UserFactory(), lesson_date=datetime.date(2025, 9, day))
+            self._content(Material, title=f'Reading {day}', material_type='pdf', lesson_date=datetime.date(2025, 9, day))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as more_queries:
+            self.client.get(self.url, {'end_date': '2025-09-02'})
+        self.assertEqual(len(queries), len(more_queries))
+
+    def test_cached_and_conditional_get(self):
+        """Test that repeat requests hit the cache and If-None-Match yields 304"""
+        first = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 0)
+
+        self._content(Material, title='New handout', material_type='pdf')
+        third = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(third['ETag'], first['ETag'])
+        self.assertEqual(third.data['total_content'], 1)
+
+    def test_view_counter_does_not_invalidate(self):
+        """Test that bumping view counts keeps the cached timeline"""
+        content = CourseContentFactory(course=self.course, uploaded_by=self.user)
+        etag = self.client.get(self.url)['ETag']
+        content.increment_view_count()
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED
+        )
+
+    def test_errors(self):
+        """Test missing courses and malformed dates"""
+        missing = self.client.get(reverse('get_course_timeline', args=[999999]))
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+        bad_date = self.client.get(self.url, {'start_date': 'yesterday'})
+        self.assertEqual(bad_date.status_code, status.HTTP_400_BAD_REQUEST)
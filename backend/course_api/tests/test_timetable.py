@@ -0,0 +1,70 @@
+import datetime
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from course_api.models import TimetableEntry
+from course_api.serializers import TimetableEntrySerializer
+from course_api.tests.test_models import CourseFactory, MeetingFactory
+from directory.models import AcademicYear
+from directory.tests.test_models import UserFactory
+
+
+@pytest.mark.django_db
+class TestTimetableMeetingSummary(APITestCase):
+    """Test cases for the meeting fields on timetable entries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.client.force_authenticate(self.user)
+        self.course = CourseFactory(academic_year=AcademicYear.get_or_create_2025_2026())
+
+    def _entry(self, day='monday'):
+        return TimetableEntry.objects.create(day=day, subject='Contract', time='08:00 - 10:00', course=self.course)
+
+    def _meeting(self, entry, hours, status='scheduled'):
+        return MeetingFactory(
+            course=self.course, created_by=self.user, timetable_entry=entry, platform='jitsi',
+            status=status, scheduled_time=timezone.now() + datetime.timedelta(hours=hours)
+        )
+
+    def test_summary_matches_meeting_fields(self):
+        """Test that the annotated fields keep the per-entry semantics"""
+        entry = self._entry()
+        self._meeting(entry, hours=-48, status='ended')
+        upcoming = self._meeting(entry, hours=24)
+        latest = self._meeting(entry, hours=72, status='cancelled')
+        empty = self._entry(day='tuesday')
+
+        data = {row['id']: row for row in TimetableEntrySerializer(TimetableEntry.with_meeting_summary(), many=True).data}
+        self.assertEqual(
+            (data[entry.id]['has_meeting'], data[entry.id]['meeting_id'], data[entry.id]['can_join_meeting']),
+            (True, latest.id, False)
+        )
+        self.assertEqual(data[entry.id]['next_meeting_id'], upcoming.id)
+        self.assertEqual(
+            (data[empty.id]['has_meeting'], data[empty.id]['meeting_id'], data[empty.id]['next_meeting_id']),
+            (False, None, None)
+        )
+        # Entries serialized on their own read the same summary
+        self.assertEqual(TimetableEntrySerializer(entry).data['meeting_id'], latest.id)
+
+    def test_week_timetable_uses_constant_queries(self):
+        """Test that listing the timetable does not query per entry"""
+        url = reverse('timetable_with_meetings')
+        entry = self._entry()
+        self._meeting(entry, hours=24)
+        with CaptureQueriesContext(connection) as baseline:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for day in ['tuesday', 'wednesday', 'thursday', 'friday']:
+            self._meeting(self._entry(day=day), hours=24)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(len(queries), len(baseline))
@@ -0,0 +1,81 @@
+import asyncio
+from django.test import SimpleTestCase
+from course_api.typing_indicators import TypingAggregator
+
+
+class TestTypingAggregator(SimpleTestCase):
+    """Test cases for coalescing typing frames into batches"""
+
+    def setUp(self):
+        self.sent = []
+
+        async def send(batch):
+            self.sent.append(batch)
+
+        self.now = 100.0
+        self.aggregator = TypingAggregator('study_group_1', send, flush_interval=0.01,
+                                           refresh_interval=3, ttl=5, clock=lambda: self.now)
+
+    def _update(self, *args):
+        # update() schedules the flush loop, so it needs a running event loop
+        async def run():
+            self.aggregator.update(*args)
+            self.aggregator._task.cancel()
+        asyncio.run(run())
+
+    def test_start_is_announced_once(self):
+        """Test that repeated typing frames within the refresh window are dropped"""
+        self._update(1, 'Ann', True)
+        self.assertEqual(self.aggregator.collect(), {
+            'type': 'typing_batch', 'typing': [{'id': 1, 'name': 'Ann'}], 'stopped': [],
+        })
+        self.now = 101
+        self._update(1, 'Ann', True)
+        self.assertIsNone(self.aggregator.collect())
+        # Still typing after the refresh window: re-announced so clients keep the indicator
+        self.now = 103
+        self._update(1, 'Ann', True)
+        self.assertEqual(self.aggregator.collect()['typing'], [{'id': 1, 'name': 'Ann'}])
+
+    def test_flaps_within_an_interval_cancel_out(self):
+        """Test that a start followed by a stop before the flush sends nothing"""
+        self._update(1, 'Ann', True)
+        self._update(1, 'Ann', False)
+        self.assertIsNone(self.aggregator.collect())
+        self.assertTrue(self.aggregator.idle)
+
+    def test_stop_and_expiry_are_batched(self):
+        """Test that stops and expired typers are reported together"""
+        self._update(1, 'Ann', True)
+        self._update(2, 'Ben', True)
+        self.now = 101
+        self.aggregator.collect()
+        self._update(1, 'Ann', False)
+        # Ben's stop frame never arrives; his entry expires after the TTL
+        self.now = 106
+        batch = self.aggregator.collect()
+        self.assertEqual(batch['typing'], [])
+        self.assertEqual(sorted(batch['stopped']), [1, 2])
+        self.assertTrue(self.aggregator.idle)
+
+    def test_time_zero_is_a_time(self):
+        """Test that an explicit now=0 is used rather than read from the clock"""
+        self.now = 0
+        self._update(1, 'Ann', True)
+        self.now = 1000
+        self.assertEqual(self.aggregator.collect(now=0)['typing'], [{'id': 1, 'name': 'Ann'}])
+
+    def test_flush_loop_sends_one_batch(self):
+        """Test that many frames in one interval produce a single layer message"""
+        async def run():
+            for _ in range(20):
+                self.aggregator.update(1, 'Ann', True)
+                self.aggregator.update(2, 'Ben', True)
+            await asyncio.sleep(0.05)
+            self.aggregator.update(1, 'Ann', False)
+            self.aggregator.update(2, 'Ben', False)
+            await asyncio.wait_for(self.aggregator._task, 1)
+        asyncio.run(run())
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual(len(self.sent[0]['typing']), 2)
+        self.assertEqual(sorted(self.sent[1]['stopped']), [1, 2])
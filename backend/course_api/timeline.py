@@ -0,0 +1,125 @@
+"""
+Course timeline assembly and caching.
+
+The timeline shows a course's published ``CourseContent`` grouped by lesson
+date, read with one ``select_related`` query already ordered by lesson date.
+Everything from ``course_content`` (outlines, past papers, materials,
+assignments and announcements) follows in a trailing "Course Materials"
+section, unaffected by the date range, as the timeline has always listed it.
+Each of those types is read with one ``select_related`` query too.
+
+Serialized timelines are cached per course under a version stamp. Signal
+handlers in ``course_api.signals`` bump the stamp whenever a course or any of
+its content is saved or deleted, which makes every cached variant (one per
+date range) unreachable at once. The cached entry carries an ETag so clients
+can revalidate with ``If-None-Match`` without the timeline being rebuilt.
+"""
+import hashlib
+import json
+import time
+from itertools import groupby
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Bounds staleness of time-dependent fields such as days_until_due and is_expired
+TIMELINE_TTL = 300
+GENERAL_SECTION = 'Course Materials'
+
+# Counter bumps on every view/download must not throw the cache away
+COUNTER_FIELDS = frozenset({'view_count', 'download_count'})
+
+
+def _version_key(course_id):
+    return f'course_timeline_version:{course_id}'
+
+
+def invalidate_course_timeline(course_id):
+    """Make every cached timeline of a course stale, in every worker"""
+    if course_id is not None:
+        cache.set(_version_key(course_id), time.time_ns(), None)
+
+
+def _general_sources():
+    """(type, queryset, serializer) for each content type in the Course Materials section"""
+    from course_content.models import Announcement, Assignment, CourseOutline, Material, PastPaper
+    from course_content.serializers import (
+        AnnouncementSerializer, AssignmentSerializer, CourseOutlineSerializer, MaterialSerializer, PastPaperSerializer,
+    )
+
+    related = ('course', 'uploaded_by', 'academic_year', 'semester__academic_year')
+    return [
+        ('course_outline', CourseOutline.objects.select_related(*related), CourseOutlineSerializer),
+        ('past_paper', PastPaper.objects.select_related(*related), PastPaperSerializer),
+        ('material', Material.objects.select_related(*related), MaterialSerializer),
+        ('assignment', Assignment.objects.select_related(*related), AssignmentSerializer),
+        ('announcement', Announcement.objects.select_related(*related), AnnouncementSerializer),
+    ]
+
+
+def build_course_timeline(course, start_date=None, end_date=None):
+    """Serialize a course's timeline; the date range applies to the dated CourseContent only"""
+    from .models import CourseContent
+    from .serializers import CourseContentSerializer, CourseSerializer
+
+    dated = CourseContent.get_timeline_for_course(course, start_date, end_date).select_related('course', 'uploaded_by')
+    timeline = []
+    for lesson_date, rows in groupby(dated, key=lambda obj: obj.lesson_date):
+        content_list = [{'type': 'old_content', 'data': CourseContentSerializer(obj).data} for obj in rows]
+        timeline.append({
+            'lesson_date': lesson_date,
+            'lesson_date_display': lesson_date.strftime('%B %d, %Y'),
+            'content': content_list,
+            'total_content': len(content_list)
+        })
+    dated_total = sum(section['total_content'] for section in timeline)
+
+    general_content = [
+        {'type': content_type, 'data': serializer_class(obj).data}
+        for content_type, queryset, serializer_class in _general_sources()
+        for obj in queryset.filter(course=course, is_published=True)
+    ]
+    if general_content:
+        timeline.append({
+            'lesson_date': None,
+            'lesson_date_display': GENERAL_SECTION,
+            'content': general_content,
+            'total_content': len(general_content)
+        })
+
+    return {
+        'course': CourseSerializer(course).data,
+        'timeline': timeline,
+        'total_lessons': len(timeline),
+        'total_content': dated_total + len(general_content)
+    }
+
+
+def get_course_timeline(course_id, start_date=None, end_date=None):
+    """
+    Return ``(etag, payload)`` for a course timeline, from cache when possible.
+
+    Raises Course.DoesNotExist when the course is missing and nothing is cached.
+    """
+    from .models import Course
+
+    version = cache.get(_version_key(course_id)) or 0
+    key = f'course_timeline:{course_id}:{version}:{start_date or ""}:{end_date or ""}'
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    course = Course.objects.get(id=course_id)
+    payload = build_course_timeline(course, start_date, end_date)
+    body = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True).encode()
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+    cache.set(key, (etag, payload), TIMELINE_TTL)
+    return etag, payload
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value matches the given ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return '*' in candidates or any(value.removeprefix('W/') == etag for value in candidates)
@@ -0,0 +1,104 @@
+"""
+Typing-indicator coalescing for study group chat rooms.
+
+Clients send ``typing`` frames on every keystroke and a stop frame after a
+short pause, so a busy room produces a stream of start/stop flaps. Instead of
+fanning each frame out through the channel layer, every worker keeps one
+``TypingAggregator`` per room. Frames only update local state; at most once
+per ``FLUSH_INTERVAL`` the aggregator compares that state with what it last
+announced and sends a single batch containing the users who started typing
+and those who stopped. Flaps inside one interval cancel out, and a user who
+keeps typing is only re-announced every ``REFRESH_INTERVAL`` so clients can
+expire indicators for users whose stop frame never arrived.
+
+Batches carry deltas rather than full state so that aggregators on different
+workers can broadcast into the same room without overwriting each other.
+"""
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 0.5
+REFRESH_INTERVAL = 3.0
+# A typer is dropped if no frame arrives for this long (e.g. socket died mid-word)
+TYPING_TTL = 5.0
+
+
+class TypingAggregator:
+    """Debounced typing state for one room on one worker"""
+
+    def __init__(self, room, send, flush_interval=FLUSH_INTERVAL,
+                 refresh_interval=REFRESH_INTERVAL, ttl=TYPING_TTL, clock=time.monotonic):
+        self.room = room
+        self.send = send  # coroutine function taking the batch event
+        self.clock = clock
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self.ttl = ttl
+        self._typing = {}     # user_id -> {'name': ..., 'exp': ...}
+        self._announced = {}  # user_id -> time the start was last broadcast
+        self._task = None
+
+    @property
+    def idle(self):
+        return not self._typing and not self._announced
+
+    def update(self, user_id, user_name, is_typing):
+        """Record a typing frame. Never touches the channel layer directly."""
+        if is_typing:
+            self._typing[user_id] = {'name': user_name, 'exp': self.clock() + self.ttl}
+        else:
+            self._typing.pop(user_id, None)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    def collect(self, now=None):
+        """Diff current state against what was announced and return the batch, if any"""
+        if now is None:
+            now = self.clock()
+        for user_id in [u for u, entry in self._typing.items() if entry['exp'] <= now]:
+            del self._typing[user_id]
+
+        started = [
+            {'id': user_id, 'name': entry['name']}
+            for user_id, entry in self._typing.items()
+            if now - self._announced.get(user_id, float('-inf')) >= self.refresh_interval
+        ]
+        stopped = [user_id for user_id in self._announced if user_id not in self._typing]
+
+        for user in started:
+            self._announced[user['id']] = now
+        for user_id in stopped:
+            del self._announced[user_id]
+
+        if not started and not stopped:
+            return None
+        return {'type': 'typing_batch', 'typing': started, 'stopped': stopped}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            batch = self.collect()
+            if batch:
+                try:
+                    await self.send(batch)
+                except Exception:
+                    logger.warning("Typing batch send failed: room=%s", self.room)
+            if self.idle:
+                _aggregators.pop(self.room, None)
+                return
+
+
+_aggregators = {}
+
+
+def get_typing_aggregator(room, channel_layer):
+    """Return this worker's aggregator for a room, creating it on first use"""
+    aggregator = _aggregators.get(room)
+    if aggregator is None:
+        async def send(batch):
+            await channel_layer.group_send(room, batch)
+        aggregator = _aggregators[room] = TypingAggregator(room, send)
+    return aggregator
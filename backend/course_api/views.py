@@ -6,10 +6,11 @@ from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth import login
+from django.db import transaction
 from django.db.models import Q
 from django.http import JsonResponse
 from directory.models import User
-from .models import Course, TimetableEntry, CourseMaterial, Recording, Meeting, JitsiRecording, CourseContent, StudyGroup, StudyGroupMembership, GroupMeeting, StudyGroupJoinRequest, GroupMessage
+from .models import Course, TimetableEntry, CourseMaterial, Recording, Meeting, JitsiRecording, CourseContent, StudyGroup, StudyGroupMembership, GroupMeeting, StudyGroupJoinRequest, GroupMessage, GroupTopic
 from .serializers import (
     UserRegistrationSerializer, UserSerializer, LoginSerializer,
     CourseSerializer, TimetableEntrySerializer, CourseMaterialSerializer,
@@ -17,6 +18,9 @@ from .serializers import (
     CourseWithDetailsSerializer, CourseContentSerializer, CourseContentCreateSerializer, CourseTimelineSerializer,
     StudyGroupSerializer, StudyGroupCreateSerializer, StudyGroupMembershipSerializer, GroupMeetingSerializer, StudyGroupJoinRequestSerializer, GroupMessageSerializer
 )
+from .pagination import MessageCursorPagination, InvalidCursor
+from .consumers import evict_member
+from .member_directory import get_member_directory
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def group_messages(request, group_id: int):
@@ -30,10 +34,14 @@ def group_messages(request, group_id: int):
         return Response({'detail': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
 
     if request.method == 'GET':
-        limit = int(request.query_params.get('limit', 50))
-        msgs = GroupMessage.objects.filter(group=group, deleted=False).order_by('-created_at')[:limit]
-        data = GroupMessageSerializer(reversed(list(msgs)), many=True, context={'request': request}).data
-        return Response(data)
+        # Keyset pagination on (created_at, id); ?before= loads older history, ?after= newer
+        paginator = MessageCursorPagination()
+        try:
+            page = paginator.paginate_queryset(GroupMessage.get_history_for_group(group), request)
+        except InvalidCursor as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        data = GroupMessageSerializer(page, many=True, context={'request': request}).data
+        return Response(paginator.get_paginated_data(data))
 
     # POST
     serializer = GroupMessageSerializer(data=request.data)
@@ -86,33 +94,20 @@ def chat_autocomplete(request, group_id: int):
     - ?type=topics: Get existing topics/hashtags from messages for # references
     - ?q=<query>: Filter results by query string
     """
-    try:
-        group = StudyGroup.objects.get(pk=group_id)
-    except StudyGroup.DoesNotExist:
-        return Response({'detail': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
-
-    # Only members can access
-    if not StudyGroupMembership.objects.filter(group=group, user=request.user).exists():
+    # Only members can access; membership comes from the cached member directory
+    # so the warm @mention path does not touch the database
+    member_directory = get_member_directory(group_id)
+    if not member_directory.has_member(request.user.id):
+        if not StudyGroup.objects.filter(pk=group_id).exists():
+            return Response({'detail': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'detail': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
 
     autocomplete_type = request.query_params.get('type', 'user')
     query = request.query_params.get('q', '').strip().lower()
 
     if autocomplete_type in ['user', 'users']:
-        # Get all users in the study group except the current user
-        memberships = StudyGroupMembership.objects.filter(group=group).select_related('user')
-        users = [m.user for m in memberships if m.user.id != request.user.id]
-        
-        # Filter by query if provided
-        if query:
-            users = [u for u in users if query in u.get_full_name().lower() or query in (u.registration_number or '').lower()]
-        
-        data = [{
-            'id': u.id,
-            'name': u.get_full_name(),
-            'registration_number': u.registration_number,
-            'profile_picture': u.profile_picture.url if u.profile_picture else None,
-        } for u in users[:10]]  # Limit to 10 results
+        # Prefix match on name words or registration number, excluding the current user
+        data = member_directory.search(query, exclude_user_id=request.user.id, limit=10)
         
         return Response(data)
 
@@ -120,9 +115,11 @@ def chat_autocomplete(request, group_id: int):
         # Get both group-specific materials and course-wide materials
         from course_content.models import Material
         from course_api.models import GroupMaterial
+        from search.engine import rank_queryset
         
+        group = StudyGroup.objects.get(pk=group_id)
         # Group materials (uploaded via chat)
-        group_materials = GroupMaterial.objects.filter(group=group).order_by('-created_at')
+        group_materials = GroupMaterial.objects.filter(group=group).select_related('uploaded_by').order_by('-created_at')
         
         # Course materials (uploaded by class rep/admin)
         course_materials = Material.objects.filter(
@@ -130,17 +127,10 @@ def chat_autocomplete(request, group_id: int):
             is_published=True
         ).order_by('-created_at')
         
-        # Filter by query if provided
+        # Filter by query if provided, best matches first
         if query:
-            group_materials = group_materials.filter(
-                models.Q(title__icontains=query) |
-                models.Q(description__icontains=query)
-            )
-            course_materials = course_materials.filter(
-                models.Q(title__icontains=query) | 
-                models.Q(topic__icontains=query) |
-                models.Q(description__icontains=query)
-            )
+            group_materials = rank_queryset(group_materials, query, 'group_material')
+            course_materials = rank_queryset(course_materials, query, 'material')
         
         # Combine and format results
         data = []
@@ -170,27 +160,17 @@ def chat_autocomplete(request, group_id: int):
                 'source': 'course'  # Indicates this is a course material
             })
         
-        # Sort by title and limit to 10 total
-        data = sorted(data, key=lambda x: x['title'].lower())[:10]
+        # Search results keep their ranking; plain listings are sorted by title
+        if not query:
+            data = sorted(data, key=lambda x: x['title'].lower())
+        data = data[:10]
         
         return Response(data)
 
     elif autocomplete_type in ['topic', 'topics']:
-        # Get unique topics from all messages in the group
-        messages = GroupMessage.objects.filter(group=group, deleted=False)
-        all_topics = []
-        for msg in messages:
-            if msg.topics and isinstance(msg.topics, list):
-                all_topics.extend(msg.topics)
-        
-        # Get unique topics and filter by query
-        unique_topics = list(set(all_topics))
-        if query:
-            unique_topics = [t for t in unique_topics if query in t.lower()]
-        
-        unique_topics = sorted(unique_topics)[:10]  # Limit to 10 results
-        
-        data = [{'topic': t} for t in unique_topics]
+        # Prefix lookup on the group's topic index, most used and most recent first
+        topics = GroupTopic.search(group_id, query, limit=10)
+        data = [{'topic': t.name, 'message_count': t.message_count} for t in topics]
         
         return Response(data)
 
@@ -326,7 +306,8 @@ def register(request):
                     last_name=user.last_name,
                     email=user.email,
                     registration_number=user.registration_number,
-                    source="student_signup"
+                    source="student_signup",
+                    record_id=user.id,
                 )
             except Exception:
                 pass
@@ -532,7 +513,7 @@ def approve_user(request, user_id):
         user.save()
         logger.info(f"User {user.email} approved successfully")
         
-        # Send approval notification via email
+        # Queue approval notification email (sent by the outbox worker)
         from .email_service import send_registration_approval_email
         logger.info(f"Attempting to send approval email to {user.email}")
         email_sent = send_registration_approval_email(user)
@@ -611,7 +592,7 @@ def reject_user(request, user_id):
         user.status = 'rejected'
         user.save()
         
-        # Send rejection notification via email
+        # Queue rejection notification email (sent by the outbox worker)
         from .email_service import send_registration_rejection_email
         email_sent = send_registration_rejection_email(user)
         
@@ -725,7 +706,7 @@ class TimetableEntryListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = TimetableEntry.objects.all()
+        queryset = TimetableEntry.with_meeting_summary()
         year = self.request.query_params.get('year', None)
         semester = self.request.query_params.get('semester', None)
         
@@ -752,7 +733,9 @@ class TimetableEntryUpdateView(generics.UpdateAPIView):
     """Update timetable entry (admin only)"""
     serializer_class = TimetableEntrySerializer
     permission_classes = [IsAuthenticated]
-    queryset = TimetableEntry.objects.all()
+
+    def get_queryset(self):
+        return TimetableEntry.with_meeting_summary()
 
     def perform_update(self, serializer):
         if not self.request.user.is_admin:
@@ -836,7 +819,7 @@ def get_user_courses(request):
 def list_create_study_groups(request):
     """List study groups in user's class or create a new group."""
     if request.method == 'GET':
-        queryset = StudyGroup.objects.all()
+        queryset = StudyGroup.for_listing(request.user)
         # If user belongs to a class, default scope to their class
         if getattr(request.user, 'student_class', None):
             queryset = queryset.filter(student_class=request.user.student_class)
@@ -850,6 +833,7 @@ def list_create_study_groups(request):
     serializer = StudyGroupCreateSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         group = serializer.save()
+        group = StudyGroup.for_listing(request.user).get(pk=group.pk)
         return Response(StudyGroupSerializer(group).data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -858,8 +842,8 @@ def list_create_study_groups(request):
 @permission_classes([IsAuthenticated])
 def my_study_groups(request):
     """List groups where the current user is a member."""
-    memberships = StudyGroupMembership.objects.filter(user=request.user).select_related('group')
-    groups = [m.group for m in memberships]
+    # Filter on the annotation so the membership join does not narrow the counts
+    groups = StudyGroup.for_listing(request.user).filter(my_role__isnull=False).order_by('name')
     return Response(StudyGroupSerializer(groups, many=True).data)
 
 
@@ -1071,6 +1055,7 @@ def remove_member_from_group(request, group_id):
 
     deleted, _ = StudyGroupMembership.objects.filter(group=group, user_id=user_id).delete()
     if deleted:
+        transaction.on_commit(lambda: evict_member(group.id, user_id))
         return Response({'message': 'Member removed'})
     return Response({'error': 'Membership not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -1094,8 +1079,9 @@ def leave_study_group(request, group_id):
     if membership.role == 'admin' and admin_count == 1:
         return Response({'error': 'Cannot leave group as the only admin. Transfer admin role first or delete the group.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Remove the membership
+    # Remove the membership and close any sockets still open in other tabs
     membership.delete()
+    transaction.on_commit(lambda: evict_member(group.id, request.user.id))
     return Response({'message': 'Successfully left the group'})
 
 
@@ -1430,6 +1416,9 @@ def join_meeting(request, meeting_id):
         if not meeting.can_join_now:
             return Response({'error': 'Meeting is not available for joining at this time'}, status=status.HTTP_400_BAD_REQUEST)
         
+        # Joining cannot wait for the provisioning job
+        meeting.ensure_daily_room()
+        
         # Generate video meeting URL with user info
         user_name = request.user.get_full_name() or request.user.email
         
@@ -1463,15 +1452,16 @@ def join_meeting(request, meeting_id):
         if meeting.platform == 'daily' and meeting.daily_room_name:
             try:
                 from .daily_service import daily_service
+                from .daily_tokens import get_meeting_token
                 if daily_service.is_api_configured():
                     is_owner = request.user == meeting.admin_host or request.user.is_admin
-                    token_data = daily_service.create_meeting_token(
+                    # Cached per user and room, so rejoining does not call Daily.co again
+                    daily_token = get_meeting_token(
                         room_name=meeting.daily_room_name,
                         user_id=str(request.user.id),
                         user_name=user_name,
                         is_owner=is_owner
                     )
-                    daily_token = token_data.get('token')
             except Exception as e:
                 import logging
                 logger = logging.getLogger(__name__)
@@ -1546,7 +1536,7 @@ def create_meeting_for_timetable_entry(request, timetable_entry_id):
 @permission_classes([IsAuthenticated])
 def get_timetable_with_meetings(request):
     """Get timetable entries with their associated meetings"""
-    queryset = TimetableEntry.objects.all().prefetch_related('meetings', 'course')
+    queryset = TimetableEntry.with_meeting_summary()
     
     # Apply filters
     year = request.query_params.get('year', None)
@@ -1578,6 +1568,9 @@ def join_timetable_meeting(request, timetable_entry_id):
         if not meeting.can_join_now:
             return Response({'error': 'Meeting is not available for joining at this time'}, status=status.HTTP_400_BAD_REQUEST)
         
+        # Joining cannot wait for the provisioning job
+        meeting.ensure_daily_room()
+        
         # Generate join URL
         user_name = request.user.get_full_name() or request.user.email
         
@@ -1608,15 +1601,16 @@ def join_timetable_meeting(request, timetable_entry_id):
         if meeting.platform == 'daily' and meeting.daily_room_name:
             try:
                 from .daily_service import daily_service
+                from .daily_tokens import get_meeting_token
                 if daily_service.is_api_configured():
                     is_owner = request.user == meeting.admin_host or request.user.is_admin
-                    token_data = daily_service.create_meeting_token(
+                    # Cached per user and room, so rejoining does not call Daily.co again
+                    daily_token = get_meeting_token(
                         room_name=meeting.daily_room_name,
                         user_id=str(request.user.id),
                         user_name=user_name,
                         is_owner=is_owner
                     )
-                    daily_token = token_data.get('token')
             except Exception as e:
                 import logging
                 logger = logging.getLogger(__name__)
@@ -1695,8 +1689,8 @@ def generate_jitsi_token(request):
         # Determine if user should be moderator
         is_moderator = jitsi_auth.is_user_moderator(user, meeting_id)
         
-        # Generate JWT token
-        token = jitsi_auth.generate_token(
+        # Signed tokens are cached, so repeat joins skip the RSA signing
+        token = jitsi_auth.get_token(
             user=user,
             room_name=room_name,
             moderator=is_moderator,
@@ -1736,13 +1730,13 @@ def generate_meeting_token(request, meeting_id):
         # You can add more specific permission checks here
         
         # Generate room name from meeting
-        room_name = f"meeting-{meeting.id}-{meeting.course.code.lower().replace(' ', '-')}"
+        room_name = meeting.jitsi_token_room_name
         
         # Determine if user should be moderator
         is_moderator = jitsi_auth.is_user_moderator(user, meeting_id)
         
-        # Generate JWT token
-        token = jitsi_auth.generate_token(
+        # Signed tokens are cached, so repeat joins skip the RSA signing
+        token = jitsi_auth.get_token(
             user=user,
             room_name=room_name,
             moderator=is_moderator,
@@ -1877,107 +1871,31 @@ class CourseContentDeleteView(generics.DestroyAPIView):
 @permission_classes([IsAuthenticated])
 def get_course_timeline(request, course_id):
     """Get course content timeline grouped by lesson date"""
+    from django.utils.dateparse import parse_date
+    from .timeline import get_course_timeline as load_course_timeline, etag_matches
+
+    # Get date range filters
+    start_date = request.query_params.get('start_date')
+    end_date = request.query_params.get('end_date')
     try:
-        course = Course.objects.get(id=course_id)
-        
-        # Get date range filters
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        
-        # Get timeline data from old CourseContent model
-        timeline_data = CourseContent.get_timeline_for_course(course, start_date, end_date)
-        
-        # Get new course content types
-        from course_content.models import CourseOutline, PastPaper, Material, Assignment, Announcement
-        from course_content.serializers import CourseOutlineSerializer, PastPaperSerializer, MaterialSerializer, AssignmentSerializer, AnnouncementSerializer
-        
-        # Get all new content types for this course
-        course_outlines = CourseOutline.objects.filter(course=course, is_published=True)
-        past_papers = PastPaper.objects.filter(course=course, is_published=True)
-        materials = Material.objects.filter(course=course, is_published=True)
-        assignments = Assignment.objects.filter(course=course, is_published=True)
-        announcements = Announcement.objects.filter(course=course, is_published=True)
-        
-        # Group by lesson date
-        from collections import defaultdict
-        grouped_content = defaultdict(list)
-        
-        # Add old content
-        for content in timeline_data:
-            grouped_content[content.lesson_date].append({
-                'type': 'old_content',
-                'data': CourseContentSerializer(content).data
-            })
-        
-        # Add new content types (these don't have lesson_date, so we'll add them to a general section)
-        general_content = []
-        
-        # Add course outlines
-        for outline in course_outlines:
-            general_content.append({
-                'type': 'course_outline',
-                'data': CourseOutlineSerializer(outline).data
-            })
-        
-        # Add past papers
-        for paper in past_papers:
-            general_content.append({
-                'type': 'past_paper',
-                'data': PastPaperSerializer(paper).data
-            })
-        
-        # Add materials
-        for material in materials:
-            general_content.append({
-                'type': 'material',
-                'data': MaterialSerializer(material).data
-            })
-        
-        # Add assignments
-        for assignment in assignments:
-            general_content.append({
-                'type': 'assignment',
-                'data': AssignmentSerializer(assignment).data
-            })
-        
-        # Add announcements
-        for announcement in announcements:
-            general_content.append({
-                'type': 'announcement',
-                'data': AnnouncementSerializer(announcement).data
-            })
-        
-        # Create timeline response
-        timeline = []
-        
-        # Add lesson-based content
-        for lesson_date, content_list in sorted(grouped_content.items()):
-            timeline.append({
-                'lesson_date': lesson_date,
-                'lesson_date_display': lesson_date.strftime('%B %d, %Y'),
-                'content': content_list,
-                'total_content': len(content_list)
-            })
-        
-        # Add general content (course outlines, past papers, etc.) to a special section
-        if general_content:
-            timeline.append({
-                'lesson_date': None,
-                'lesson_date_display': 'Course Materials',
-                'content': general_content,
-                'total_content': len(general_content)
-            })
-        
-        return Response({
-            'course': CourseSerializer(course).data,
-            'timeline': timeline,
-            'total_lessons': len(timeline),
-            'total_content': timeline_data.count() + len(general_content)
-        })
-        
+        if (start_date and not parse_date(start_date)) or (end_date and not parse_date(end_date)):
+            raise ValueError
+    except ValueError:
+        return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        etag, payload = load_course_timeline(course_id, start_date, end_date)
     except Course.DoesNotExist:
         return Response({'error': 'Course not found'}, status=status.HTTP_404_NOT_FOUND)
 
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(payload)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -2081,55 +1999,21 @@ def upload_course_content_file(request):
         return Response({'error': 'Only administrators and class representatives can upload files'}, 
                        status=status.HTTP_403_FORBIDDEN)
     
-    # Handle file upload
-    if 'file' not in request.FILES:
+    # Streams the body to storage, rejecting bad types and sizes before it is all read
+    from course_content.uploads import UploadRejected, receive_upload
+    try:
+        stored = receive_upload(request)
+    except UploadRejected as e:
+        return Response({'error': str(e)}, status=e.status_code)
+    if stored is None:
         return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
     
-    uploaded_file = request.FILES['file']
-    
-    # Validate file type and size
-    allowed_types = ['audio/', 'video/', 'application/pdf', 'application/msword', 
-                    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                    'application/vnd.ms-powerpoint',
-                    'application/vnd.openxmlformats-officedocument.presentationml.presentation',
-                    'image/']
-    
-    if not any(uploaded_file.content_type.startswith(t) for t in allowed_types):
-        return Response({'error': 'File type not allowed'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Check file size (50MB limit)
-    max_size = 50 * 1024 * 1024  # 50MB
-    if uploaded_file.size > max_size:
-        return Response({'error': 'File size too large. Maximum size is 50MB'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Save file
-    import os
-    from django.conf import settings
-    from django.utils import timezone
-    
-    # Create upload directory if it doesn't exist
-    upload_dir = os.path.join(settings.MEDIA_ROOT, 'course_content')
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate unique filename
-    timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-    file_extension = os.path.splitext(uploaded_file.name)[1]
-    filename = f"{timestamp}_{uploaded_file.name}"
-    file_path = os.path.join(upload_dir, filename)
-    
-    # Save file
-    with open(file_path, 'wb+') as destination:
-        for chunk in uploaded_file.chunks():
-            destination.write(chunk)
-    
-    # Return file information
-    file_url = f"{settings.MEDIA_URL}course_content/{filename}"
-    
     return Response({
         'message': 'File uploaded successfully',
-        'file_url': file_url,
-        'file_path': file_path,
-        'file_size': uploaded_file.size,
-        'content_type': uploaded_file.content_type,
-        'filename': filename
+        'file_url': stored.url,
+        'file_path': stored.path,
+        'file_size': stored.size,
+        'content_type': stored.content_type,
+        'filename': stored.original_name,
+        'sha256': stored.sha256
     }, status=status.HTTP_201_CREATED)
\ No newline at end of file
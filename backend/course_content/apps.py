@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CourseContentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'course_content'
+
+    def ready(self):
+        """Connect the blob reference counting signals"""
+        from .signals import connect_signals
+        connect_signals()
@@ -0,0 +1,297 @@
+"""
+Content-addressed, deduplicating store for uploaded course files.
+
+Every upload is stored under a name derived from its SHA-256:
+``course_content/blobs/<first two hex digits>/<sha256><ext>``. If the same
+content is uploaded again, the new part file is dropped and the existing
+name is returned. So a PDF shared to several study groups, posted as a
+``Material`` and kept on a legacy ``CourseContent`` row sits on disk once.
+The bytes behind a blob name never change, so blob URLs are served as
+immutable and stay cached by nginx and browsers.
+
+``MediaBlob.ref_count`` counts the rows that point at each blob through the
+fields in ``REFERENCE_FIELDS``. Signals keep it current (see
+``course_content.signals``), and ``recount_references()`` rebuilds it. A blob
+with no references is deleted by ``collect_garbage()`` only after it has
+been unused for ``GC_GRACE``. That leaves time for the client to create the
+row the upload was for.
+
+``manage.py dedupe_media`` moves files uploaded before the store existed
+into it, and repoints the rows that reference them.
+"""
+import hashlib
+import os
+import re
+import shutil
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import partial
+from urllib.parse import quote, urlparse
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+BLOB_DIR = 'course_content/blobs'
+CHUNK_SIZE = 64 * 1024
+GC_GRACE = timedelta(days=1)
+# Fields holding a storage name, a path under MEDIA_ROOT or a media URL
+REFERENCE_FIELDS = {
+    'course_content.CourseOutline': ('file_path', 'file_url'),
+    'course_content.PastPaper': ('file_path', 'file_url'),
+    'course_content.Recording': ('file_path', 'file_url'),
+    'course_content.Material': ('file_path', 'file_url'),
+    'course_content.Assignment': ('file_path', 'file_url'),
+    'course_content.Announcement': ('file_path', 'file_url'),
+    'course_api.CourseContent': ('file_path', 'file_url'),
+    'course_api.CourseMaterial': ('file_url',),
+    'course_api.GroupMaterial': ('file',),
+    # A finished resumable upload, until the file is attached to content and the session expires
+    'course_content.UploadSession': ('file_path',),
+}
+
+_SHA256 = re.compile(r'[0-9a-f]{64}')
+_EXTENSION = re.compile(r'\.[a-z0-9]{1,10}')
+
+
+def blob_name(sha256, original_name):
+    """Storage name for content with this hash; keeps a sane extension for content types"""
+    ext = os.path.splitext(original_name or '')[1].lower()
+    return f'{BLOB_DIR}/{sha256[:2]}/{sha256}{ext if _EXTENSION.fullmatch(ext) else ""}'
+
+
+def storage_name(value):
+    """
+    The storage name that a file field value refers to.
+
+    Args:
+        value: A storage name, an absolute path under MEDIA_ROOT, a media URL
+            (relative or absolute) or a FieldFile
+
+    Returns:
+        The name relative to MEDIA_ROOT, or None for empty values and files
+        stored elsewhere
+    """
+    value = getattr(value, 'name', value) or ''
+    parsed = urlparse(value)
+    path = parsed.path
+    media_root = str(settings.MEDIA_ROOT).rstrip('/') + '/'
+    media_url = urlparse(settings.MEDIA_URL or '').path
+    if path.startswith(media_root):
+        return path[len(media_root):] or None
+    if media_url not in ('', '/') and path.startswith(media_url):
+        return path[len(media_url):] or None
+    if parsed.netloc or path.startswith('/'):
+        return None
+    return path or None
+
+
+def blob_sha(value):
+    """The SHA-256 of the blob a file field value points at, or None"""
+    name = storage_name(value)
+    if not name or not name.startswith(f'{BLOB_DIR}/'):
+        return None
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return stem if _SHA256.fullmatch(stem) else None
+
+
+def references(values):
+    """The set of blob hashes among some file field values"""
+    return {sha for sha in map(blob_sha, values) if sha}
+
+
+def add_blob(sha256, size, content_type, original_name, part_path=None, fileobj=None, storage=default_storage,
+             keep_part=False):
+    """
+    Store hashed content, or reuse the copy already stored.
+
+    Pass either `part_path`, a finished part file on the storage's filesystem,
+    which is hard-linked or renamed into place and never copied, or
+    `fileobj` for storages without local paths. With `keep_part` the part
+    file is left where it is (copied if it cannot be linked), for callers
+    that remove it themselves once nothing points at it.
+
+    Returns:
+        The MediaBlob
+    """
+    from .models import MediaBlob
+
+    while True:
+        blob, created = MediaBlob.objects.get_or_create(sha256=sha256, defaults={
+            'name': blob_name(sha256, original_name), 'size': size, 'content_type': (content_type or '')[:100],
+        })
+        # Restart the grace period so the blob survives until its new row exists. When
+        # collect_garbage() deleted the row meanwhile, the update matches nothing: start over.
+        if created or MediaBlob.objects.filter(pk=blob.pk).update(last_used_at=timezone.now()):
+            break
+
+    if part_path is None:
+        if not storage.exists(blob.name):
+            storage.save(blob.name, File(fileobj, name=blob.name))
+        return blob
+
+    target = storage.path(blob.name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(part_path, target)
+    except FileExistsError:
+        # The same bytes are already on disk
+        pass
+    except OSError:
+        # No hard links on this filesystem
+        if keep_part:
+            shutil.copyfile(part_path, f'{target}.tmp')
+            os.replace(f'{target}.tmp', target)
+        else:
+            os.replace(part_path, target)
+    if not keep_part and os.path.exists(part_path):
+        os.unlink(part_path)
+    if storage.file_permissions_mode is not None:
+        os.chmod(target, storage.file_permissions_mode)
+    return blob
+
+
+def adjust_references(added=(), removed=()):
+    """Count new references to blobs and release old ones"""
+    from .models import MediaBlob
+
+    now = timezone.now()
+    if added:
+        MediaBlob.objects.filter(sha256__in=added).update(ref_count=F('ref_count') + 1, last_used_at=now)
+    if removed:
+        MediaBlob.objects.filter(sha256__in=removed, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1, last_used_at=now
+        )
+
+
+def recount_references():
+    """
+    Rebuild every ref_count from the referencing rows.
+
+    Returns:
+        The number of blobs whose count was wrong
+    """
+    from .models import MediaBlob
+
+    counts = Counter()
+    for label, fields in REFERENCE_FIELDS.items():
+        for values in apps.get_model(label)._default_manager.values_list(*fields).iterator():
+            counts.update(references(values))
+
+    changed = 0
+    for pk, sha256, ref_count in MediaBlob.objects.values_list('pk', 'sha256', 'ref_count').iterator():
+        if counts[sha256] != ref_count:
+            MediaBlob.objects.filter(pk=pk).update(ref_count=counts[sha256])
+            changed += 1
+    return changed
+
+
+def collect_garbage(grace=GC_GRACE, storage=default_storage):
+    """
+    Delete blobs that nothing has referenced for `grace`, with their previews.
+
+    Returns:
+        (blobs, bytes) freed
+    """
+    from .models import MediaBlob
+    from .previews import discard_preview
+
+    cutoff = timezone.now() - grace
+    unused = MediaBlob.objects.filter(ref_count=0, last_used_at__lt=cutoff)
+    blobs = freed = 0
+    for pk in list(unused.values_list('pk', flat=True)):
+        # The file goes while the row is locked, so an upload of the same content either
+        # claimed the row first and is kept, or waits and then links a fresh file
+        with transaction.atomic():
+            blob = unused.select_for_update().filter(pk=pk).first()
+            if blob is None:
+                continue
+            storage.delete(blob.name)
+            blob.delete()
+        discard_preview(blob.sha256, storage)
+        blobs += 1
+        freed += blob.size
+    return blobs, freed
+
+
+def repoint(value, old_name, new_name):
+    """Rewrite a file field value from one storage name to another, keeping its form"""
+    for old, new in ((old_name, new_name), (quote(old_name), quote(new_name))):
+        if value.endswith(old):
+            return value[:-len(old)] + new
+    return value
+
+
+def hash_file(path):
+    """(SHA-256, size) of a file, read in chunks"""
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+def _remove_file(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def dedupe_existing(dry_run=False, storage=default_storage):
+    """
+    Move files that rows reference outside the blob store into it.
+
+    Each file is linked into the store, unless its content is already there,
+    and its rows are repointed with queryset updates. The old file is removed
+    only once that transaction commits, so an interrupted run leaves every
+    row pointing at a file and can simply be repeated. The updates skip the
+    counting signals, so call recount_references() afterwards. Files no row
+    references are left alone.
+
+    Returns:
+        (files moved, of which duplicates, bytes freed by the duplicates)
+    """
+    from course_organizer.media import content_type_for
+    from .models import MediaBlob
+
+    referrers = defaultdict(list)
+    for label, fields in REFERENCE_FIELDS.items():
+        model = apps.get_model(label)
+        for pk, *values in model._default_manager.values_list('pk', *fields).iterator():
+            for field, value in zip(fields, values):
+                name = storage_name(value)
+                if name and not name.startswith(f'{BLOB_DIR}/'):
+                    referrers[name].append((model, pk, field, value))
+
+    files = duplicates = freed = 0
+    seen = set()
+    for name, rows in referrers.items():
+        try:
+            path = storage.path(name)
+        except SuspiciousFileOperation:
+            continue
+        if not os.path.isfile(path):
+            continue
+        sha256, size = hash_file(path)
+        files += 1
+        if sha256 in seen or MediaBlob.objects.filter(sha256=sha256).exists():
+            duplicates += 1
+            freed += size
+        seen.add(sha256)
+        if dry_run:
+            continue
+
+        with transaction.atomic():
+            blob = add_blob(sha256, size, content_type_for(name), name, path, storage=storage, keep_part=True)
+            for model, pk, field, value in rows:
+                model._default_manager.filter(pk=pk).update(**{field: repoint(value, name, blob.name)})
+            transaction.on_commit(partial(_remove_file, path))
+    return files, duplicates, freed
@@ -0,0 +1,27 @@
+"""Background jobs for course_content, run by manage.py run_jobs"""
+from course_api.job_queue import enqueue, job_handler
+
+
+@job_handler('purge_upload_session')
+def purge_upload_session(job):
+    """Delete a resumable upload once it expires, releasing the file of a finished one"""
+    from django.utils import timezone
+    from .models import UploadSession
+    from .resumable import discard_session
+
+    session = UploadSession.objects.filter(pk=job.payload['session_id']).first()
+    if session is None:
+        # Deleted already
+        return
+    if session.expires_at > timezone.now():
+        # Every chunk pushes the expiry back; check again then
+        enqueue('purge_upload_session', job.payload, run_at=session.expires_at)
+        return
+    discard_session(session)
+
+
+@job_handler('generate_preview')
+def generate_preview(job):
+    """Render a stored document's thumbnail, page count and text"""
+    from .previews import generate
+    generate(job.payload['sha256'])
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Move uploaded course files into the content-addressed blob store, merging duplicates, '
+        'then rebuild blob reference counts and delete blobs nothing uses'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be merged without changing anything')
+        parser.add_argument('--keep-unused', action='store_true', help='Do not delete unreferenced blobs')
+
+    def handle(self, *args, **options):
+        from course_content.blobs import collect_garbage, dedupe_existing, recount_references
+
+        files, duplicates, freed = dedupe_existing(dry_run=options['dry_run'])
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(
+            f"{verb} {files} file(s) into the blob store; {duplicates} duplicate(s), "
+            f"{freed / 1024 / 1024:.1f} MB freed"
+        )
+        if options['dry_run']:
+            return
+
+        self.stdout.write(f"Corrected {recount_references()} blob reference count(s)")
+        if not options['keep_unused']:
+            blobs, gc_freed = collect_garbage()
+            self.stdout.write(f"Deleted {blobs} unused blob(s), {gc_freed / 1024 / 1024:.1f} MB freed")
+        self.stdout.write(self.style.SUCCESS('Media store deduplicated'))
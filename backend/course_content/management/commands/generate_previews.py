@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Queue thumbnails, page counts and text extraction for documents that have no preview yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry', action='store_true',
+                            help='Also re-render failed and unsupported previews (e.g. after installing poppler-utils)')
+
+    def handle(self, *args, **options):
+        from django.apps import apps
+        from course_api.job_queue import enqueue_many
+        from course_content.models import DocumentPreview
+        from course_content.previews import PREVIEW_FIELDS, PREVIEW_MODELS, queue_preview
+
+        queued = 0
+        if options['retry']:
+            retry = DocumentPreview.objects.filter(status__in=['failed', 'unsupported'])
+            hashes = list(retry.values_list('sha256', flat=True))
+            retry.update(status='pending', error='')
+            enqueue_many('generate_preview', [{'sha256': sha} for sha in hashes])
+            queued += len(hashes)
+
+        for label in PREVIEW_MODELS:
+            for values in apps.get_model(label)._default_manager.values_list(*PREVIEW_FIELDS).iterator():
+                queued += sum(queue_preview(value) for value in values)
+
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} preview(s); run_jobs workers will render them"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Delete expired resumable upload sessions and part files left behind by interrupted uploads'
+
+    def handle(self, *args, **options):
+        from course_content.resumable import purge_expired_sessions
+
+        sessions, orphans = purge_expired_sessions()
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {sessions} expired upload session(s) and {orphans} orphaned part file(s)"
+        ))
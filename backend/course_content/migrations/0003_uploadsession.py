@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:10
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course_content', '0002_alter_announcement_file_url_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(max_length=100)),
+                ('length', models.BigIntegerField(help_text='Total size announced with Upload-Length, in bytes')),
+                ('offset', models.BigIntegerField(default=0, help_text='Bytes received so far')),
+                ('metadata', models.JSONField(blank=True, default=dict, help_text='Decoded Upload-Metadata')),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('complete', 'Complete')], default='uploading', max_length=20)),
+                ('file_path', models.CharField(blank=True, help_text='Storage name once complete', max_length=500)),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('expires_at', models.DateTimeField(help_text='Deleted by the purge job if still incomplete at this time')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='uploadsession_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course_content', '0004_mediablob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentPreview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(help_text="Hash of the document's content", max_length=64, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('unsupported', 'Unsupported'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('page_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('thumbnail', models.CharField(blank=True, help_text='Storage name of the PNG thumbnail', max_length=500)),
+                ('thumbnail_webp', models.CharField(blank=True, help_text='Storage name of the WebP thumbnail', max_length=500)),
+                ('text', models.TextField(blank=True, help_text='Extracted text, truncated')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:10
+
+from collections import Counter
+
+from django.db import migrations
+from django.db.models import F
+
+
+def count_session_references(apps, schema_editor):
+    """Finished upload sessions now hold a reference to their blob; add the ones that exist"""
+    from course_content.blobs import references
+
+    UploadSession = apps.get_model('course_content', 'UploadSession')
+    MediaBlob = apps.get_model('course_content', 'MediaBlob')
+
+    counts = Counter()
+    for (file_path,) in UploadSession.objects.exclude(file_path='').values_list('file_path').iterator():
+        counts.update(references([file_path]))
+    for sha256, count in counts.items():
+        MediaBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course_content', '0005_documentpreview'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_session_references, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from course_api.models import Course
 from directory.models import AcademicYear, Semester
 
@@ -179,4 +182,85 @@ class Announcement(BaseContentModel):
     class Meta:
         ordering = ['-priority', '-created_at']
         verbose_name = "Announcement"
-        verbose_name_plural = "Announcements"
\ No newline at end of file
+        verbose_name_plural = "Announcements"
+
+class UploadSession(models.Model):
+    """A resumable (tus-style) upload; see course_content.resumable"""
+
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    length = models.BigIntegerField(help_text="Total size announced with Upload-Length, in bytes")
+    offset = models.BigIntegerField(default=0, help_text="Bytes received so far")
+    metadata = models.JSONField(default=dict, blank=True, help_text="Decoded Upload-Metadata")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    file_path = models.CharField(max_length=500, blank=True, help_text="Storage name once complete")
+    sha256 = models.CharField(max_length=64, blank=True)
+    expires_at = models.DateTimeField(help_text="Deleted by the purge job if still incomplete at this time")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='uploadsession_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.length})"
+
+    @property
+    def file_url(self):
+        if not self.file_path:
+            return ''
+        from django.core.files.storage import default_storage
+        return default_storage.url(self.file_path)
+
+
+class MediaBlob(models.Model):
+    """A stored file, named by its SHA-256; see course_content.blobs"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=500, help_text="Storage name, course_content/blobs/<aa>/<sha256><ext>")
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField(default=0, help_text="Rows whose file fields point at this blob")
+    last_used_at = models.DateTimeField(default=timezone.now, help_text="Last upload or reference change")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'last_used_at'], name='mediablob_gc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+class DocumentPreview(models.Model):
+    """Thumbnail, page count and text of one stored document; see course_content.previews"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('unsupported', 'Unsupported'),
+        ('failed', 'Failed'),
+    ]
+
+    sha256 = models.CharField(max_length=64, unique=True, help_text="Hash of the document's content")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    page_count = models.PositiveIntegerField(null=True, blank=True)
+    thumbnail = models.CharField(max_length=500, blank=True, help_text="Storage name of the PNG thumbnail")
+    thumbnail_webp = models.CharField(max_length=500, blank=True, help_text="Storage name of the WebP thumbnail")
+    text = models.TextField(blank=True, help_text="Extracted text, truncated")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.status})"
@@ -0,0 +1,222 @@
+"""
+Previews for uploaded documents: a first-page thumbnail, the page count and the text.
+
+Saving a ``Material``, ``PastPaper`` or ``CourseOutline`` whose file is in the
+blob store queues a ``generate_preview`` job for the file's content hash
+(see ``course_content.signals``). A pool of
+``run_jobs --kind generate_preview --batch-size 1`` workers renders them,
+while the general worker runs with ``--exclude-kind generate_preview`` so
+slow documents never hold up other jobs. The pool's workers claim jobs with
+SKIP LOCKED, and rendering happens in subprocesses, so each worker keeps a
+core busy.
+
+Results are kept once per content hash in ``DocumentPreview``. The same PDF
+posted in several places is rendered once, and uploading it again is never
+re-rendered. Thumbnails are stored as PNG and WebP under
+``course_content/previews/``. List serializers add a ``preview`` field,
+loaded for a whole page in one query. The extracted text is added to the
+document's search entry.
+
+Renderers are picked by what is installed:
+
+* PDF: poppler-utils (``pdfinfo``, ``pdftoppm``, ``pdftotext``)
+* Word and PowerPoint: LibreOffice converts to PDF, then as above
+* Images: Pillow
+
+Without the tool a file needs, its preview is marked ``unsupported`` and
+clients keep showing the file type icon. ``manage.py generate_previews``
+queues previews for existing documents, or retries failed ones.
+"""
+import io
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image
+
+from .blobs import blob_sha, storage_name
+
+PREVIEW_DIR = 'course_content/previews'
+PREVIEW_MODELS = ('course_content.Material', 'course_content.PastPaper', 'course_content.CourseOutline')
+PREVIEW_FIELDS = ('file_path', 'file_url')
+THUMBNAIL_SIZE = (480, 680)
+MAX_TEXT_PAGES = 50
+MAX_TEXT_CHARS = 100_000
+RENDER_TIMEOUT = 120
+DOCUMENT_KINDS = {
+    '.pdf': 'pdf',
+    '.doc': 'office', '.docx': 'office', '.ppt': 'office', '.pptx': 'office',
+    '.png': 'image', '.jpg': 'image', '.jpeg': 'image', '.gif': 'image', '.webp': 'image',
+}
+
+
+class PreviewUnavailable(Exception):
+    """No renderer for this kind of document is installed"""
+
+
+def document_kind(name):
+    return DOCUMENT_KINDS.get(os.path.splitext(name or '')[1].lower())
+
+
+def preview_key(obj):
+    """The content hash of the document a row points at, or None"""
+    for field in PREVIEW_FIELDS:
+        sha = blob_sha(getattr(obj, field, ''))
+        if sha:
+            return sha
+    return None
+
+
+def queue_preview(value):
+    """Queue a preview for the blob a file field value points at, unless it has one"""
+    from course_api.job_queue import enqueue
+    from .models import DocumentPreview
+
+    sha = blob_sha(value)
+    if sha is None or document_kind(storage_name(value)) is None:
+        return False
+    _, created = DocumentPreview.objects.get_or_create(sha256=sha)
+    if created:
+        enqueue('generate_preview', {'sha256': sha})
+    return created
+
+
+def _run(*args):
+    return subprocess.run(args, check=True, capture_output=True, timeout=RENDER_TIMEOUT).stdout
+
+
+def render_pdf(path, workdir):
+    """(first page image, page count, text) of a PDF"""
+    if not shutil.which('pdftoppm'):
+        raise PreviewUnavailable('poppler-utils is not installed')
+    info = _run('pdfinfo', path).decode(errors='replace')
+    pages = re.search(r'^Pages:\s+(\d+)', info, re.MULTILINE)
+    page = os.path.join(workdir, 'page')
+    _run('pdftoppm', '-png', '-singlefile', '-f', '1', '-l', '1', '-scale-to', str(THUMBNAIL_SIZE[1]), path, page)
+    text = _run('pdftotext', '-l', str(MAX_TEXT_PAGES), '-enc', 'UTF-8', path, '-').decode(errors='replace')
+    return Image.open(f'{page}.png'), int(pages.group(1)) if pages else None, text
+
+
+def render_office(path, workdir):
+    """Convert a Word or PowerPoint file to PDF with LibreOffice, then render that"""
+    soffice = shutil.which('soffice') or shutil.which('libreoffice')
+    if not soffice:
+        raise PreviewUnavailable('LibreOffice is not installed')
+    # A profile per run, so parallel workers do not fight over LibreOffice's lock
+    _run(soffice, f'-env:UserInstallation=file://{workdir}/profile', '--headless',
+         '--convert-to', 'pdf', '--outdir', workdir, path)
+    return render_pdf(os.path.join(workdir, os.path.splitext(os.path.basename(path))[0] + '.pdf'), workdir)
+
+
+def render_image(path, workdir):
+    image = Image.open(path)
+    # Lets JPEG decode at a reduced scale instead of full resolution
+    image.draft('RGB', THUMBNAIL_SIZE)
+    return image, 1, ''
+
+
+RENDERERS = {'pdf': render_pdf, 'office': render_office, 'image': render_image}
+
+
+def _save_thumbnails(image, sha256, storage):
+    image.thumbnail(THUMBNAIL_SIZE)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    else:
+        image = image.convert('RGB')
+
+    names = []
+    for ext, options in (('png', {'optimize': True}), ('webp', {'quality': 80, 'method': 4})):
+        buffer = io.BytesIO()
+        image.save(buffer, ext.upper(), **options)
+        name = f'{PREVIEW_DIR}/{sha256[:2]}/{sha256}.{ext}'
+        storage.delete(name)
+        names.append(storage.save(name, ContentFile(buffer.getvalue())))
+    return names
+
+
+def generate(sha256, storage=default_storage):
+    """
+    Render the preview for one blob and refresh the search entries that use it.
+
+    Returns:
+        The DocumentPreview, or None when the blob or preview no longer exists
+    """
+    from .models import DocumentPreview, MediaBlob
+
+    preview = DocumentPreview.objects.filter(sha256=sha256).first()
+    blob = MediaBlob.objects.filter(sha256=sha256).first()
+    if preview is None or blob is None:
+        return None
+
+    renderer = RENDERERS.get(document_kind(blob.name))
+    try:
+        if renderer is None:
+            raise PreviewUnavailable(f'No previews for {os.path.splitext(blob.name)[1] or "this file type"}')
+        with tempfile.TemporaryDirectory() as workdir:
+            image, page_count, text = renderer(storage.path(blob.name), workdir)
+            with image:
+                preview.thumbnail, preview.thumbnail_webp = _save_thumbnails(image, sha256, storage)
+    except PreviewUnavailable as e:
+        preview.status, preview.error = 'unsupported', str(e)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError, Image.DecompressionBombError) as e:
+        # A broken or hostile file fails the same way on every retry
+        preview.status, preview.error = 'failed', str(e)[:1000]
+    else:
+        preview.status, preview.error = 'ready', ''
+        preview.page_count = page_count
+        preview.text = ' '.join(text.replace('\x00', '').split())[:MAX_TEXT_CHARS]
+    preview.save()
+
+    if preview.status == 'ready':
+        reindex_documents(sha256)
+    return preview
+
+
+def reindex_documents(sha256):
+    """Refresh the search entries of every row using this blob, now that its text is known"""
+    from search.engine import index_object
+
+    for label in PREVIEW_MODELS:
+        model = apps.get_model(label)
+        for obj in model._default_manager.filter(Q(file_path__contains=sha256) | Q(file_url__contains=sha256)):
+            index_object(obj)
+
+
+def document_text(obj):
+    """Extracted text of the document a row points at, for search"""
+    from .models import DocumentPreview
+
+    sha = preview_key(obj)
+    if sha is None:
+        return ''
+    return DocumentPreview.objects.filter(sha256=sha, status='ready').values_list('text', flat=True).first() or ''
+
+
+def previews_for(objs):
+    """DocumentPreviews for some rows, keyed by content hash, in one query"""
+    from .models import DocumentPreview
+
+    keys = {key for key in map(preview_key, objs) if key}
+    if not keys:
+        return {}
+    return {p.sha256: p for p in DocumentPreview.objects.filter(sha256__in=keys).defer('text', 'error')}
+
+
+def discard_preview(sha256, storage=default_storage):
+    """Delete a blob's preview and its thumbnails"""
+    from .models import DocumentPreview
+
+    for preview in DocumentPreview.objects.filter(sha256=sha256):
+        for name in filter(None, (preview.thumbnail, preview.thumbnail_webp)):
+            storage.delete(name)
+        preview.delete()
@@ -0,0 +1,224 @@
+"""
+Resumable uploads for large files, following the tus 1.0 protocol.
+
+Supports the core protocol plus the creation, expiration and termination
+extensions:
+
+* ``POST uploads/`` with ``Upload-Length`` (and ``Upload-Metadata`` carrying
+  base64 ``filename`` and ``filetype``) opens an ``UploadSession``. The type
+  and size limits are checked here, before any bytes are sent.
+* ``HEAD uploads/<id>/`` reports ``Upload-Offset``, so a client whose
+  connection dropped knows where to continue.
+* ``PATCH uploads/<id>/`` with ``Upload-Offset`` appends a chunk. Bytes that
+  arrive before a dropped connection are kept. A retried chunk that starts
+  behind the stored offset only has its new tail written, so repeating a
+  PATCH is harmless. A chunk that starts past the stored offset is a 409.
+* ``DELETE uploads/<id>/`` abandons the upload.
+
+Every chunk is written in place into one part file per session. When the
+last byte arrives, the SHA-256 is computed in one streaming read and the
+part file is linked into the blob store (``course_content.blobs``), so the
+upload is never copied. The session's ``file_path`` can then go on a
+``Recording`` or other content.
+
+Sessions expire ``SESSION_TTL`` after their last chunk. A
+``purge_upload_session`` job deletes each expired session and its part
+file. A finished session counts as a reference to its blob until then, so
+garbage collection keeps the file while the session still hands it out.
+``manage.py purge_upload_sessions`` sweeps everything left over, including
+part files orphaned by crashed workers.
+"""
+import base64
+import binascii
+import fcntl
+import hashlib
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import UnreadablePostError
+from django.utils import timezone
+
+from .blobs import add_blob
+from .uploads import INCOMING_DIR, UploadRejected, check_content_type
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,expiration,termination'
+RESUMABLE_DIR = 'course_content/.resumable'
+MAX_RESUMABLE_SIZE = 4 * 1024 * 1024 * 1024
+SESSION_TTL = timedelta(hours=24)
+CHUNK_SIZE = 64 * 1024
+
+
+def max_resumable_size():
+    return getattr(settings, 'COURSE_CONTENT_MAX_RESUMABLE_SIZE', MAX_RESUMABLE_SIZE)
+
+
+def parse_metadata(header):
+    """Decode an Upload-Metadata header: comma-separated "key base64value" pairs"""
+    metadata = {}
+    for pair in filter(None, (p.strip() for p in (header or '').split(','))):
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode() if value else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadRejected(f'Invalid Upload-Metadata value for {key}')
+    return metadata
+
+
+def part_path(session, storage=default_storage):
+    return storage.path(f'{RESUMABLE_DIR}/{session.pk}.part')
+
+
+def create_session(user, length, metadata, storage=default_storage):
+    """
+    Open a resumable upload.
+
+    Raises:
+        UploadRejected: When the announced type or size is not allowed
+    """
+    from course_api.job_queue import enqueue
+    from course_organizer.media import content_type_for
+    from .models import UploadSession
+
+    filename = os.path.basename(metadata.get('filename') or '')
+    if not filename:
+        raise UploadRejected('Upload-Metadata must include a filename')
+    content_type = metadata.get('filetype') or content_type_for(filename)
+    check_content_type(content_type)
+    if length < 0:
+        raise UploadRejected('Invalid Upload-Length')
+    limit = max_resumable_size()
+    if length > limit:
+        raise UploadRejected(f'File size too large. Maximum size is {limit // (1024 * 1024)}MB', status_code=413)
+
+    session = UploadSession.objects.create(
+        uploaded_by=user, filename=filename[:255], content_type=content_type[:100], length=length,
+        metadata=metadata, expires_at=timezone.now() + SESSION_TTL,
+    )
+    path = part_path(session, storage)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    enqueue('purge_upload_session', {'session_id': str(session.pk)}, run_at=session.expires_at)
+    if length == 0:
+        _finalize(session, storage)
+    return session
+
+
+def append_chunk(session, offset, stream, content_length, storage=default_storage):
+    """
+    Write one PATCH body into the session's part file, finalising on the last byte.
+
+    Concurrent PATCHes for one upload are serialised by an exclusive lock on
+    the part file, not on the session row, so no transaction stays open while
+    the body arrives. The offset is then advanced with a conditional update.
+
+    Returns:
+        The updated UploadSession
+
+    Raises:
+        UploadRejected: On an offset conflict or a chunk past Upload-Length
+    """
+    from .models import UploadSession
+
+    try:
+        f = open(part_path(session, storage), 'r+b')
+    except FileNotFoundError:
+        # Finalised (the part file moved into the blob store) or purged meanwhile
+        return UploadSession.objects.get(pk=session.pk)
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        session = UploadSession.objects.get(pk=session.pk)
+        if session.status == 'complete':
+            return session
+        if offset < 0 or offset > session.offset:
+            raise UploadRejected('Upload-Offset does not match the current offset', status_code=409)
+        if offset + content_length > session.length:
+            raise UploadRejected('Chunk extends past Upload-Length', status_code=413)
+
+        # A retried chunk: the first `skip` bytes are already stored
+        skip = session.offset - offset
+        remaining = content_length
+        written = 0
+        f.seek(session.offset)
+        while remaining:
+            try:
+                chunk = stream.read(min(CHUNK_SIZE, remaining))
+            except (OSError, UnreadablePostError):
+                # Client went away; keep what arrived so it can resume from there
+                break
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            if skip:
+                dropped = min(skip, len(chunk))
+                chunk, skip = chunk[dropped:], skip - dropped
+            f.write(chunk)
+            written += len(chunk)
+        f.flush()
+
+        now = timezone.now()
+        advanced = UploadSession.objects.filter(pk=session.pk, offset=session.offset, status='uploading').update(
+            offset=session.offset + written, expires_at=now + SESSION_TTL, updated_at=now,
+        )
+        if not advanced:
+            raise UploadRejected('Upload-Offset does not match the current offset', status_code=409)
+        session.offset += written
+        session.expires_at = now + SESSION_TTL
+        session.updated_at = now
+        if session.offset == session.length:
+            _finalize(session, storage)
+    return session
+
+
+def _finalize(session, storage):
+    path = part_path(session, storage)
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    blob = add_blob(hasher.hexdigest(), session.length, session.content_type, session.filename, path, storage=storage)
+    session.file_path = blob.name
+    session.sha256 = blob.sha256
+    session.status = 'complete'
+    session.save(update_fields=['file_path', 'sha256', 'status', 'updated_at'])
+
+
+def discard_session(session, storage=default_storage):
+    """Delete an upload session and its part file (completed files are kept)"""
+    try:
+        os.unlink(part_path(session, storage))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def purge_expired_sessions(storage=default_storage, now=None):
+    """
+    Delete sessions past their expiry, and part files nothing refers to.
+
+    Returns:
+        (sessions, orphaned part files) deleted
+    """
+    from .models import UploadSession
+
+    now = now or timezone.now()
+    sessions = 0
+    for session in UploadSession.objects.filter(expires_at__lte=now):
+        discard_session(session, storage)
+        sessions += 1
+
+    live = {f'{pk}.part' for pk in UploadSession.objects.filter(status='uploading').values_list('pk', flat=True)}
+    cutoff = time.time() - SESSION_TTL.total_seconds()
+    orphans = 0
+    for directory in (RESUMABLE_DIR, INCOMING_DIR):
+        root = storage.path(directory)
+        if not os.path.isdir(root):
+            continue
+        for entry in os.scandir(root):
+            if entry.name not in live and entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                orphans += 1
+    return sessions, orphans
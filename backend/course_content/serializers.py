@@ -1,11 +1,40 @@
+from django.core.files.storage import default_storage
+from django.db import models
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import CourseOutline, PastPaper, Recording, Material, Assignment, Announcement
 from course_api.models import Course
 from directory.models import AcademicYear, Semester
+from .previews import preview_key, previews_for
 
 
-class CourseOutlineSerializer(serializers.ModelSerializer):
+class PreviewListSerializer(serializers.ListSerializer):
+    """Loads the previews for a whole page of documents in one query"""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.context['previews'] = previews_for(items)
+        return super().to_representation(items)
+
+
+class DocumentPreviewMixin(serializers.Serializer):
+    """Adds a `preview` field; set Meta.list_serializer_class = PreviewListSerializer"""
+    preview = serializers.SerializerMethodField()
+
+    def get_preview(self, obj):
+        previews = self.context.get('previews')
+        if previews is None:
+            previews = previews_for([obj])
+        preview = previews.get(preview_key(obj))
+        if preview is None:
+            return None
+        data = {'status': preview.status, 'page_count': preview.page_count}
+        for key, name in (('thumbnail_url', preview.thumbnail), ('thumbnail_webp_url', preview.thumbnail_webp)):
+            data[key] = default_storage.url(name) if name else None
+        return data
+
+
+class CourseOutlineSerializer(DocumentPreviewMixin, serializers.ModelSerializer):
     """Serializer for course outline documents"""
     course_name = serializers.CharField(source='course.name', read_only=True)
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
@@ -21,16 +50,17 @@ class CourseOutlineSerializer(serializers.ModelSerializer):
             'semester', 'semester_display', 'title', 'description', 'file_url',
             'file_path', 'material_type', 'material_type_display', 'is_published',
             'uploaded_by', 'uploaded_by_name', 'created_at', 'updated_at',
-            'file_size_display'
+            'file_size_display', 'preview'
         ]
         read_only_fields = ['uploaded_by', 'created_at', 'updated_at']
+        list_serializer_class = PreviewListSerializer
 
     def get_file_size_display(self, obj):
         # This would need to be implemented based on how you store file sizes
         return "N/A"
 
 
-class PastPaperSerializer(serializers.ModelSerializer):
+class PastPaperSerializer(DocumentPreviewMixin, serializers.ModelSerializer):
     """Serializer for past examination papers"""
     course_name = serializers.CharField(source='course.name', read_only=True)
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
@@ -46,9 +76,10 @@ class PastPaperSerializer(serializers.ModelSerializer):
             'semester', 'semester_display', 'title', 'description', 'file_url',
             'file_path', 'exam_type', 'exam_type_display', 'exam_date', 'is_published',
             'uploaded_by', 'uploaded_by_name', 'created_at', 'updated_at',
-            'file_size_display'
+            'file_size_display', 'preview'
         ]
         read_only_fields = ['uploaded_by', 'created_at', 'updated_at']
+        list_serializer_class = PreviewListSerializer
 
     def get_academic_year_display(self, obj):
         return str(obj.academic_year)
@@ -98,7 +129,7 @@ class RecordingSerializer(serializers.ModelSerializer):
         return "N/A"
 
 
-class MaterialSerializer(serializers.ModelSerializer):
+class MaterialSerializer(DocumentPreviewMixin, serializers.ModelSerializer):
     """Serializer for supplementary course materials"""
     course_name = serializers.CharField(source='course.name', read_only=True)
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
@@ -114,9 +145,10 @@ class MaterialSerializer(serializers.ModelSerializer):
             'semester', 'semester_display', 'title', 'description', 'file_url',
             'file_path', 'material_type', 'material_type_display', 'lesson_date',
             'lesson_order', 'topic', 'is_published', 'uploaded_by', 'uploaded_by_name',
-            'created_at', 'updated_at', 'file_size_display'
+            'created_at', 'updated_at', 'file_size_display', 'preview'
         ]
         read_only_fields = ['uploaded_by', 'created_at', 'updated_at']
+        list_serializer_class = PreviewListSerializer
 
     def get_academic_year_display(self, obj):
         return str(obj.academic_year)
@@ -0,0 +1,77 @@
+"""Keep MediaBlob reference counts and document previews in step with the rows that point at blobs"""
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save, pre_save
+from .blobs import REFERENCE_FIELDS, adjust_references, references
+from .previews import PREVIEW_FIELDS, PREVIEW_MODELS, queue_preview
+
+
+def connect_signals():
+    for label in REFERENCE_FIELDS:
+        model = apps.get_model(label)
+        pre_save.connect(remember_references, sender=model, dispatch_uid=f'blob_refs_before_{label}')
+        post_save.connect(count_references, sender=model, dispatch_uid=f'blob_refs_after_{label}')
+        post_delete.connect(release_references, sender=model, dispatch_uid=f'blob_refs_release_{label}')
+    pre_save.connect(
+        store_group_material_file, sender=apps.get_model('course_api.GroupMaterial'),
+        dispatch_uid='blob_store_group_material',
+    )
+    for label in PREVIEW_MODELS:
+        post_save.connect(queue_previews, sender=apps.get_model(label), dispatch_uid=f'queue_preview_{label}')
+
+
+def _fields(sender):
+    return REFERENCE_FIELDS[sender._meta.label]
+
+
+def remember_references(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Note which blobs the row pointed at before this save"""
+    fields = _fields(sender)
+    if raw or (update_fields is not None and not set(fields).intersection(update_fields)):
+        instance._blob_refs_before = None
+        return
+    before = set()
+    if not instance._state.adding:
+        row = sender._default_manager.filter(pk=instance.pk).values_list(*fields).first()
+        before = references(row or ())
+    instance._blob_refs_before = before
+
+
+def count_references(sender, instance, raw=False, **kwargs):
+    before = getattr(instance, '_blob_refs_before', None)
+    if before is None:
+        return
+    after = references(getattr(instance, field) for field in _fields(sender))
+    adjust_references(added=after - before, removed=before - after)
+    instance._blob_refs_before = None
+
+
+def release_references(sender, instance, **kwargs):
+    adjust_references(removed=references(getattr(instance, field) for field in _fields(sender)))
+
+
+def store_group_material_file(sender, instance, raw=False, **kwargs):
+    """Put a newly attached study group file in the blob store instead of group_materials/"""
+    from course_organizer.media import content_type_for
+    from .uploads import StreamingWriter
+
+    file = instance.file
+    if raw or not file or file._committed:
+        return
+    # Group materials have never had the course content type and size limits
+    writer = StreamingWriter(file.storage, limited=False)
+    try:
+        for chunk in file.chunks():
+            writer.write(chunk)
+    except BaseException:
+        writer.discard()
+        raise
+    content_type = getattr(file.file, 'content_type', None) or content_type_for(file.name)
+    instance.file = writer.commit(file.name, content_type).name
+
+
+def queue_previews(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Have the workers render a preview of a newly attached document"""
+    if raw or (update_fields is not None and not set(PREVIEW_FIELDS).intersection(update_fields)):
+        return
+    for field in PREVIEW_FIELDS:
+        queue_preview(getattr(instance, field))
@@ -0,0 +1,195 @@
+import hashlib
+import io
+import os
+from datetime import timedelta
+from unittest import mock
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from course_api.models import GroupMaterial
+from course_api.tests.test_models import CourseContentFactory, CourseFactory
+from course_api.tests.test_study_groups import StudyGroupFactory
+from course_content.blobs import (
+    BLOB_DIR, blob_sha, collect_garbage, dedupe_existing, recount_references, storage_name,
+)
+from course_content.models import Material, MediaBlob
+from course_content.tests.test_uploads import MediaRootMixin
+from directory.models import AcademicYear
+from directory.tests.test_models import SemesterFactory, StudentClassFactory, UserFactory
+
+PDF = b'%PDF-1.4 week one notes' * 100
+SHA = hashlib.sha256(PDF).hexdigest()
+BLOB = f'{BLOB_DIR}/{SHA[:2]}/{SHA}.pdf'
+
+
+class BlobFixtures(MediaRootMixin):
+    def setUp(self):
+        super().setUp()
+        self.user = UserFactory(user_type='admin')
+        self.year = AcademicYear.get_or_create_2025_2026()
+        self.course = CourseFactory(academic_year=self.year)
+        self.semester = SemesterFactory(academic_year=self.year)
+        student_class = StudentClassFactory(academic_year=self.year)
+        self.group = StudyGroupFactory(created_by=self.user, student_class=student_class)
+
+    def material(self, title='Week 1', **kwargs):
+        return Material.objects.create(
+            course=self.course, academic_year=self.year, semester=self.semester, uploaded_by=self.user,
+            title=title, material_type='pdf', **kwargs,
+        )
+
+    def group_material(self, data=PDF, name='week1.pdf', **kwargs):
+        return GroupMaterial.objects.create(
+            group=self.group, uploaded_by=self.user, title='Week 1',
+            file=SimpleUploadedFile(name, data, content_type='application/pdf'), **kwargs,
+        )
+
+    def write(self, name, data=PDF):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, files in os.walk(self.media_root) for name in files
+        )
+
+
+@pytest.mark.django_db
+class TestBlobStore(BlobFixtures, APITestCase):
+    """Test cases for the content-addressed upload store and its reference counts"""
+
+    def test_uploads_of_the_same_content_share_one_file(self):
+        """Test that uploading identical bytes twice stores them once under their hash"""
+        self.client.force_authenticate(self.user)
+        paths = set()
+        for name in ('notes.pdf', 'notes (1).pdf'):
+            upload = SimpleUploadedFile(name, PDF, content_type='application/pdf')
+            response = self.client.post(reverse('course_content:upload_course_content_file'), {'file': upload},
+                                        format='multipart')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.data['filename'], name)
+            paths.add(response.data['file_path'])
+        self.assertEqual(paths, {BLOB})
+        self.assertEqual(self.stored_files(), [BLOB])
+        self.assertEqual(MediaBlob.objects.get().size, len(PDF))
+
+    def test_reference_counts_follow_saves_and_deletes(self):
+        """Test counting across file_path, file_url and GroupMaterial.file, then garbage collection"""
+        shared = self.group_material()
+        self.assertEqual(shared.file.name, BLOB)
+        self.assertEqual(self.stored_files(), [BLOB])
+
+        material = self.material(file_path=BLOB, file_url=f'/media/{BLOB}')
+        legacy = CourseContentFactory(course=self.course, uploaded_by=self.user,
+                                      file_url=f'https://co.riverlearn.co.ke/media/{BLOB}')
+        self.assertEqual(MediaBlob.objects.get().ref_count, 3)
+
+        material.file_path = material.file_url = ''
+        material.save()
+        legacy.delete()
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+        shared.delete()
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.ref_count, 0)
+
+        # Unreferenced blobs survive the grace period so fresh uploads can still be attached
+        self.assertEqual(collect_garbage(), (0, 0))
+        MediaBlob.objects.update(last_used_at=blob.last_used_at - timedelta(days=2))
+        self.assertEqual(collect_garbage(), (1, len(PDF)))
+        self.assertEqual(self.stored_files(), [])
+
+    def test_recount_repairs_drift(self):
+        """Test that recount_references rebuilds counts changed behind the signals' back"""
+        self.group_material()
+        Material.objects.bulk_create([
+            Material(course=self.course, academic_year=self.year, semester=self.semester, uploaded_by=self.user,
+                     title=f'Copy {i}', material_type='pdf', file_path=BLOB)
+            for i in range(2)
+        ])
+        self.assertEqual(recount_references(), 1)
+        self.assertEqual(MediaBlob.objects.get().ref_count, 3)
+
+    def test_dedupe_media_moves_existing_files_into_the_store(self):
+        """Test that the command merges legacy copies and repoints every form of reference"""
+        other = b'%PDF-1.4 week two' * 50
+        first = self.write('course_content/20250101_120000_notes.pdf')
+        self.write('course_content/20250301_090000_notes_copy.pdf')
+        self.write('group_materials/week2.pdf', other)
+        self.write('profiles/avatar.png', b'not referenced')
+
+        material = self.material(file_path=first, file_url='/media/course_content/20250101_120000_notes.pdf')
+        legacy = CourseContentFactory(course=self.course, uploaded_by=self.user,
+                                      file_path='course_content/20250301_090000_notes_copy.pdf',
+                                      file_url='https://youtube.com/watch?v=lecture')
+        GroupMaterial.objects.bulk_create([
+            GroupMaterial(group=self.group, uploaded_by=self.user, title='Week 2', file='group_materials/week2.pdf'),
+        ])
+
+        call_command('dedupe_media', '--dry-run', stdout=io.StringIO())
+        self.assertFalse(MediaBlob.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('dedupe_media', stdout=io.StringIO())
+        other_sha = hashlib.sha256(other).hexdigest()
+        other_blob = f'{BLOB_DIR}/{other_sha[:2]}/{other_sha}.pdf'
+        material.refresh_from_db()
+        legacy.refresh_from_db()
+        self.assertEqual(material.file_path, os.path.join(self.media_root, BLOB))
+        self.assertEqual(material.file_url, f'/media/{BLOB}')
+        self.assertEqual(legacy.file_path, BLOB)
+        self.assertEqual(legacy.file_url, 'https://youtube.com/watch?v=lecture')
+        self.assertEqual(GroupMaterial.objects.get().file.name, other_blob)
+        self.assertEqual(self.stored_files(), sorted([BLOB, other_blob, 'profiles/avatar.png']))
+        self.assertEqual(dict(MediaBlob.objects.values_list('sha256', 'ref_count')), {SHA: 2, other_sha: 1})
+
+    def test_interrupted_dedupe_keeps_old_files_until_rows_move(self):
+        """Test that a failure before the rows are repointed leaves them pointing at an existing file"""
+        old = 'course_content/20250101_120000_notes.pdf'
+        self.write(old)
+        material = self.material(file_path=old)
+
+        with mock.patch('course_content.blobs.repoint', side_effect=RuntimeError('killed')):
+            with self.assertRaises(RuntimeError), self.captureOnCommitCallbacks(execute=True):
+                dedupe_existing()
+        material.refresh_from_db()
+        self.assertEqual(material.file_path, old)
+        self.assertTrue(os.path.isfile(os.path.join(self.media_root, old)))
+        self.assertFalse(MediaBlob.objects.exists())
+
+        # A rerun finishes the job, reusing the file the first run linked
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(dedupe_existing(), (1, 0, 0))
+        material.refresh_from_db()
+        self.assertEqual(material.file_path, BLOB)
+        self.assertEqual(self.stored_files(), [BLOB])
+
+
+class TestBlobReferences(MediaRootMixin, TestCase):
+    """Test cases for recognising blob references in file field values"""
+
+    def test_reference_forms(self):
+        """Test names, media paths and URLs, and values that are not blobs"""
+        self.assertEqual(blob_sha(BLOB), SHA)
+        self.assertEqual(blob_sha(os.path.join(self.media_root, BLOB)), SHA)
+        self.assertEqual(blob_sha(f'https://co.riverlearn.co.ke/media/{BLOB}'), SHA)
+        self.assertIsNone(blob_sha('course_content/20250101_notes.pdf'))
+        self.assertIsNone(blob_sha(f'{BLOB_DIR}/ab/not-a-hash.pdf'))
+        self.assertIsNone(storage_name('https://youtube.com/watch?v=lecture'))
+        self.assertIsNone(storage_name('/etc/passwd'))
+        self.assertIsNone(storage_name(''))
+
+    def test_blob_urls_are_served_as_immutable(self):
+        """Test that serve_media marks content-addressed files as never changing"""
+        path = os.path.join(self.media_root, BLOB)
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(PDF)
+        with self.settings(MEDIA_ACCEL_REDIRECT_PREFIX=''):
+            self.assertIn('immutable', self.client.get(f'/media/{BLOB}')['Cache-Control'])
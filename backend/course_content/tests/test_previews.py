@@ -0,0 +1,121 @@
+import hashlib
+import io
+import os
+from unittest import mock
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APITestCase
+from course_api.job_queue import run_pending
+from course_api.models import BackgroundJob
+from course_content.blobs import BLOB_DIR, add_blob
+from course_content.models import DocumentPreview
+from course_content.previews import RENDERERS
+from course_content.tests.test_blobs import BlobFixtures
+from search.engine import search
+
+
+def png_bytes(size=(1200, 1600), color='navy'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+class TestDocumentPreviews(BlobFixtures, APITestCase):
+    """Test cases for the background thumbnail, page count and text pipeline"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def store(self, data, name):
+        """Put a file in the blob store the way an upload would, returning its storage name"""
+        sha = hashlib.sha256(data).hexdigest()
+        part = self.write(f'course_content/.incoming/{sha}.part', data)
+        return add_blob(sha, len(data), '', name, part).name
+
+    def run_previews(self):
+        return run_pending(kinds=['generate_preview'])
+
+    def test_image_preview_is_rendered_once_per_content(self):
+        """Test that saves queue one job per hash and the worker stores PNG and WebP thumbnails"""
+        name = self.store(png_bytes(), 'diagram.png')
+        self.material(file_path=name, file_url=f'/media/{name}')
+        self.material(title='Same diagram again', file_path=name)
+        self.assertEqual(BackgroundJob.objects.filter(kind='generate_preview').count(), 1)
+        self.assertEqual(DocumentPreview.objects.get().status, 'pending')
+
+        self.assertEqual(self.run_previews(), (1, 0))
+        preview = DocumentPreview.objects.get()
+        self.assertEqual((preview.status, preview.page_count), ('ready', 1))
+        for thumbnail, fmt in ((preview.thumbnail, 'PNG'), (preview.thumbnail_webp, 'WEBP')):
+            with Image.open(os.path.join(self.media_root, thumbnail)) as image:
+                self.assertEqual(image.format, fmt)
+                self.assertLessEqual(image.size, (480, 680))
+
+    def test_list_views_include_previews_without_extra_queries(self):
+        """Test that a page of materials loads its previews in one query"""
+        for i in range(3):
+            name = self.store(png_bytes(color=(i, 0, 0)), f'slide{i}.png')
+            self.material(title=f'Slide {i}', file_path=name)
+        self.material(title='External link', file_url='https://youtube.com/watch?v=lecture')
+        self.run_previews()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('course_content:material_list'))
+        results = response.data['results'] if 'results' in response.data else response.data
+        previews = [m['preview'] for m in results]
+        self.assertEqual(sum(1 for p in previews if p and p['status'] == 'ready'), 3)
+        self.assertIn(None, previews)
+        ready = next(p for p in previews if p)
+        self.assertTrue(ready['thumbnail_webp_url'].startswith('/media/course_content/previews/'))
+        self.assertEqual(sum('documentpreview' in q['sql'] for q in queries.captured_queries), 1)
+
+    def test_extracted_text_feeds_search(self):
+        """Test that text from the document is searchable once the preview is ready"""
+        def fake_pdf(path, workdir):
+            return Image.new('RGB', (600, 800), 'white'), 12, 'Duty of care in\x00 negligence:\n\fDonoghue v Stevenson'
+
+        name = self.store(b'%PDF-1.4 tort law', 'tort.pdf')
+        material = self.material(title='Week 3 reading', file_path=name)
+        self.assertEqual(search('donoghue'), [])
+
+        with mock.patch.dict(RENDERERS, {'pdf': fake_pdf}):
+            self.run_previews()
+        preview = DocumentPreview.objects.get()
+        self.assertEqual(preview.page_count, 12)
+        self.assertEqual(preview.text, 'Duty of care in negligence: Donoghue v Stevenson')
+        self.assertEqual([r['id'] for r in search('donoghue')], [material.pk])
+
+    def test_unrenderable_documents_are_not_retried(self):
+        """Test that missing tools and broken files settle instead of failing the job"""
+        pdf = self.store(b'%PDF-1.4 outline', 'outline.pdf')
+        broken = self.store(b'not really a png', 'broken.png')
+        self.material(file_path=pdf)
+        self.material(title='Broken', file_path=broken)
+        self.material(title='Lecture', file_path=self.store(b'video bytes', 'lecture.mp4'))
+
+        with mock.patch('course_content.previews.shutil.which', return_value=None):
+            self.assertEqual(self.run_previews(), (2, 0))
+        statuses = dict(DocumentPreview.objects.values_list('sha256', 'status'))
+        self.assertEqual(statuses[hashlib.sha256(b'%PDF-1.4 outline').hexdigest()], 'unsupported')
+        self.assertEqual(statuses[hashlib.sha256(b'not really a png').hexdigest()], 'failed')
+        self.assertEqual(len(statuses), 2)
+
+    def test_garbage_collection_removes_previews(self):
+        """Test that deleting an unused blob deletes its preview and thumbnails"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from course_content.blobs import collect_garbage
+        from course_content.models import MediaBlob
+
+        material = self.material(file_path=self.store(png_bytes(), 'diagram.png'))
+        self.run_previews()
+        material.delete()
+        MediaBlob.objects.update(last_used_at=timezone.now() - timedelta(days=2))
+        collect_garbage()
+        self.assertFalse(DocumentPreview.objects.exists())
+        self.assertEqual([f for f in self.stored_files() if not f.startswith(BLOB_DIR)], [])
@@ -0,0 +1,193 @@
+import base64
+import fcntl
+import io
+import hashlib
+import os
+import time
+from datetime import timedelta
+import pytest
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from course_api.job_queue import run_pending
+from course_content.blobs import collect_garbage, recount_references
+from course_content.models import MediaBlob, UploadSession
+from course_content.resumable import (
+    INCOMING_DIR, RESUMABLE_DIR, UploadRejected, append_chunk, part_path, purge_expired_sessions,
+)
+from course_content.tests.test_uploads import MediaRootMixin
+from directory.tests.test_models import UserFactory
+
+
+def metadata(**values):
+    return ','.join(f'{key} {base64.b64encode(value.encode()).decode()}' for key, value in values.items())
+
+
+@pytest.mark.django_db
+class TestResumableUploads(MediaRootMixin, APITestCase):
+    """Test cases for the tus-style resumable upload endpoints"""
+
+    def setUp(self):
+        super().setUp()
+        self.data = os.urandom(300 * 1024)
+        self.user = UserFactory(user_type='admin')
+        self.client.force_authenticate(self.user)
+
+    def create(self, length=None, **meta):
+        meta = meta or {'filename': 'Lecture 12.mp4', 'filetype': 'video/mp4'}
+        return self.client.post(
+            reverse('course_content:upload_session_create'),
+            HTTP_UPLOAD_LENGTH=str(len(self.data) if length is None else length),
+            HTTP_UPLOAD_METADATA=metadata(**meta),
+        )
+
+    def patch(self, location, offset, chunk):
+        return self.client.generic(
+            'PATCH', location, chunk, content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_chunked_upload_resumes_and_finalises_in_place(self):
+        """Test that chunks append, HEAD reports progress and the last chunk moves the file into place"""
+        response = self.create()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Tus-Resumable'], '1.0.0')
+        self.assertEqual(response['Upload-Offset'], '0')
+        location = response['Location']
+
+        self.assertEqual(self.patch(location, 0, self.data[:100 * 1024]).status_code, 204)
+        head = self.client.head(location)
+        self.assertEqual(head['Upload-Offset'], str(100 * 1024))
+        self.assertEqual(head['Upload-Length'], str(len(self.data)))
+        self.assertEqual(head['Cache-Control'], 'no-store')
+
+        response = self.patch(location, 100 * 1024, self.data[100 * 1024:])
+        self.assertEqual(response['Upload-Offset'], str(len(self.data)))
+
+        status = self.client.get(location).data
+        self.assertEqual(status['status'], 'complete')
+        self.assertEqual(status['sha256'], hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(status['file_path'], f"course_content/blobs/{status['sha256'][:2]}/{status['sha256']}.mp4")
+        with open(os.path.join(self.media_root, status['file_path']), 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, RESUMABLE_DIR)), [])
+
+    def test_retried_chunks_are_idempotent(self):
+        """Test that resending bytes already stored only writes the new tail"""
+        location = self.create()['Location']
+        self.patch(location, 0, self.data[:1000])
+        # The client never saw the response and sends the chunk again, then more
+        self.assertEqual(self.patch(location, 0, self.data[:1000])['Upload-Offset'], '1000')
+        self.assertEqual(self.patch(location, 500, self.data[500:4000])['Upload-Offset'], '4000')
+        self.patch(location, 4000, self.data[4000:])
+        self.assertEqual(self.client.get(location).data['sha256'], hashlib.sha256(self.data).hexdigest())
+
+    def test_offset_gaps_and_overruns_are_refused(self):
+        """Test that a chunk past the stored offset is a 409 and one past the length a 413"""
+        location = self.create()['Location']
+        response = self.patch(location, 10, self.data[10:20])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '0')
+        self.assertEqual(self.patch(location, 0, self.data + b'extra').status_code, 413)
+        response = self.client.generic('PATCH', location, b'x', content_type='application/octet-stream',
+                                       HTTP_UPLOAD_OFFSET='0')
+        self.assertEqual(response.status_code, 415)
+
+    def test_body_is_read_under_a_file_lock_outside_any_transaction(self):
+        """Test that a slow body holds only the part file lock and a moved offset is a 409"""
+        session = UploadSession.objects.get(pk=self.create()['Location'].rstrip('/').rsplit('/', 1)[-1])
+        depth = len(connection.savepoint_ids)
+        seen = []
+
+        class SlowBody(io.BytesIO):
+            def read(self, size=-1):
+                with open(part_path(session), 'rb') as other:
+                    try:
+                        fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        seen.append(len(connection.savepoint_ids))
+                return super().read(size)
+
+        session = append_chunk(session, 0, SlowBody(self.data[:1000]), 1000)
+        self.assertEqual(session.offset, 1000)
+        self.assertTrue(seen)
+        self.assertEqual(set(seen), {depth})
+
+        class RacedBody(io.BytesIO):
+            def read(self, size=-1):
+                UploadSession.objects.filter(pk=session.pk).update(offset=2000)
+                return super().read(size)
+
+        with self.assertRaises(UploadRejected) as raised:
+            append_chunk(session, 1000, RacedBody(self.data[1000:1500]), 500)
+        self.assertEqual(raised.exception.status_code, 409)
+        self.assertEqual(UploadSession.objects.get(pk=session.pk).offset, 2000)
+
+    def test_creation_checks_type_size_and_permissions(self):
+        """Test that limits are enforced before any bytes are sent"""
+        response = self.create(filename='setup.exe', filetype='application/x-msdownload')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'File type not allowed')
+
+        with self.settings(COURSE_CONTENT_MAX_RESUMABLE_SIZE=1024 * 1024):
+            self.assertEqual(self.create(length=2 * 1024 * 1024).status_code, 413)
+
+        self.assertEqual(self.create(filetype='video/mp4').status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+
+        self.client.force_authenticate(UserFactory(user_type='student'))
+        self.assertEqual(self.create().status_code, 403)
+
+    def test_sessions_are_private_and_can_be_terminated(self):
+        """Test that other users cannot see a session and DELETE removes its part file"""
+        location = self.create()['Location']
+        session = UploadSession.objects.get()
+        self.client.force_authenticate(UserFactory(user_type='admin'))
+        self.assertEqual(self.client.head(location).status_code, 404)
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.delete(location).status_code, 204)
+        self.assertFalse(os.path.exists(part_path(session)))
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_finished_upload_holds_its_blob_until_the_session_expires(self):
+        """Test that garbage collection keeps a finished upload's file while the session hands it out"""
+        location = self.create()['Location']
+        self.patch(location, 0, self.data)
+        file_path = self.client.get(location).data['file_path']
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+        MediaBlob.objects.update(last_used_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(collect_garbage(), (0, 0))
+        self.assertEqual(recount_references(), 0)
+
+        UploadSession.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(purge_expired_sessions(), (1, 0))
+        self.assertEqual(MediaBlob.objects.get().ref_count, 0)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, file_path)))
+
+    def test_expired_sessions_are_purged(self):
+        """Test the expiry job, its sliding deadline and the orphan sweep"""
+        location = self.create()['Location']
+        session = UploadSession.objects.get()
+        self.patch(location, 0, self.data[:1000])
+
+        # Run before the session expires: the job re-queues itself for the new expiry
+        from course_api.models import BackgroundJob
+        BackgroundJob.objects.update(run_at=timezone.now())
+        self.assertEqual(run_pending(kinds=['purge_upload_session']), (1, 0))
+        requeued = BackgroundJob.objects.get(kind='purge_upload_session', status='pending')
+        self.assertEqual(requeued.run_at, UploadSession.objects.get().expires_at)
+
+        UploadSession.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        BackgroundJob.objects.filter(pk=requeued.pk).update(run_at=timezone.now())
+        self.assertEqual(run_pending(kinds=['purge_upload_session']), (1, 0))
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(os.path.exists(part_path(session)))
+
+        stale = os.path.join(self.media_root, INCOMING_DIR, 'crashed.part')
+        os.makedirs(os.path.dirname(stale))
+        open(stale, 'wb').close()
+        os.utime(stale, (time.time() - 2 * 86400,) * 2)
+        self.assertEqual(purge_expired_sessions(), (0, 1))
+        self.assertFalse(os.path.exists(stale))
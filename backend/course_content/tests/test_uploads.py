@@ -0,0 +1,120 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import pytest
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from course_content.uploads import (
+    INCOMING_DIR, StreamingUploadHandler, UploadRejected, store_upload,
+)
+from directory.tests.test_models import UserFactory
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, COURSE_CONTENT_MAX_UPLOAD_SIZE=1024 * 1024)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def incoming(self):
+        path = os.path.join(self.media_root, INCOMING_DIR)
+        return os.listdir(path) if os.path.isdir(path) else []
+
+
+@pytest.mark.django_db
+class TestUploadEndpoints(MediaRootMixin, APITestCase):
+    """Test cases for the streaming course content upload endpoints"""
+
+    def setUp(self):
+        super().setUp()
+        self.data = os.urandom(200 * 1024)
+        self.admin = UserFactory(user_type='admin')
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, url_name, data=None, name='lecture.mp4', content_type='video/mp4'):
+        upload = SimpleUploadedFile(name, self.data if data is None else data, content_type=content_type)
+        return self.client.post(reverse(url_name), {'file': upload}, format='multipart')
+
+    def test_course_api_upload_streams_to_storage(self):
+        """Test that the file lands in course_content/ with its size and SHA-256"""
+        response = self.upload('upload_course_content_file')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['sha256'], hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(response.data['file_size'], len(self.data))
+        self.assertEqual(response.data['filename'], 'lecture.mp4')
+        self.assertEqual(response.data['file_url'], f"/media/course_content/blobs/{response.data['sha256'][:2]}/"
+                                                    f"{response.data['sha256']}.mp4")
+        with open(response.data['file_path'], 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(self.incoming(), [])
+
+    def test_course_content_upload_shares_the_pipeline(self):
+        """Test that the course_content endpoint stores files the same way"""
+        response = self.upload('course_content:upload_course_content_file', name='Week 1 notes.pdf',
+                               content_type='application/pdf')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['filename'], 'Week 1 notes.pdf')
+        self.assertEqual(response.data['sha256'], hashlib.sha256(self.data).hexdigest())
+        with open(os.path.join(self.media_root, response.data['file_path']), 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_limits(self):
+        """Test that bad types, oversized files and empty requests are rejected without leftovers"""
+        response = self.upload('upload_course_content_file', content_type='application/x-msdownload')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'File type not allowed')
+
+        response = self.upload('upload_course_content_file', data=os.urandom(1200 * 1024))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Maximum size is 1MB', response.data['error'])
+
+        response = self.client.post(reverse('upload_course_content_file'), {}, format='multipart')
+        self.assertEqual(response.data['error'], 'No file provided')
+        self.assertEqual([files for _, _, files in os.walk(self.media_root) if files], [])
+
+    def test_students_cannot_upload_to_course_api(self):
+        """Test that the permission check still runs before the body is read"""
+        self.client.force_authenticate(UserFactory(user_type='student'))
+        self.assertEqual(self.upload('upload_course_content_file').status_code, 403)
+
+
+class TestStreamingUploadHandler(MediaRootMixin, TestCase):
+    """Test cases for the upload handler's early checks"""
+
+    def test_oversized_body_is_not_read(self):
+        """Test that a Content-Length over the limit is refused before reading"""
+        handler = StreamingUploadHandler()
+        body = mock.Mock(spec=io.BytesIO)
+        post, files = handler.handle_raw_input(body, {}, 10 * 1024 * 1024, b'boundary')
+        body.read.assert_not_called()
+        self.assertFalse(files)
+        self.assertIsInstance(handler.error, UploadRejected)
+
+    def test_chunks_past_the_limit_stop_the_upload(self):
+        """Test that a body larger than it claimed is cut off at the limit"""
+        from django.core.files.uploadhandler import StopUpload
+
+        handler = StreamingUploadHandler()
+        self.assertIsNone(handler.handle_raw_input(None, {}, 1024, b'boundary'))
+        handler.new_file('file', 'lecture.mp4', 'video/mp4', None)
+        handler.receive_data_chunk(b'x' * 800 * 1024, 0)
+        with self.assertRaises(StopUpload):
+            handler.receive_data_chunk(b'x' * 300 * 1024, 800 * 1024)
+        handler.upload_complete()
+        self.assertEqual(self.incoming(), [])
+
+    def test_files_parsed_elsewhere_are_streamed_through_the_writer(self):
+        """Test the fallback for uploads that did not go through the handler"""
+        stored = store_upload(SimpleUploadedFile('scan.png', b'png-bytes', content_type='image/png'))
+        self.assertEqual(stored.sha256, hashlib.sha256(b'png-bytes').hexdigest())
+        self.assertEqual(stored.size, 9)
+        with open(stored.path, 'rb') as f:
+            self.assertEqual(f.read(), b'png-bytes')
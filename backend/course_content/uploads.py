@@ -0,0 +1,258 @@
+"""
+Streaming upload pipeline for course content files.
+
+``receive_upload()`` installs ``StreamingUploadHandler`` on the request
+before the body is parsed. The handler checks the limits as early as they
+can be known:
+
+* a ``Content-Length`` over the size limit is refused before any of the
+  body is read;
+* a disallowed content type is refused as soon as the file's part header
+  arrives;
+* the size is checked again on every chunk, so a lying client is cut off
+  at the limit.
+
+Accepted chunks go straight into a part file inside the storage directory,
+while the SHA-256 and the size are computed on the way through. Finishing
+the upload hands the part file to the content-addressed blob store
+(``course_content.blobs``), which links it into place, or drops it when the
+same content is already stored. Memory use stays at one chunk regardless
+of file size.
+
+If the body was already parsed by Django's own handlers (for example by a
+CSRF check reading ``request.POST``), the uploaded file is streamed
+through the same hashing writer instead.
+"""
+import hashlib
+import os
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+INCOMING_DIR = 'course_content/.incoming'
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+# Room for the multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+ALLOWED_CONTENT_TYPES = (
+    'audio/', 'video/', 'image/',
+    'application/pdf',
+    'application/msword',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.ms-powerpoint',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+)
+
+
+class UploadRejected(Exception):
+    """The upload breaks a limit; the message is safe to show to the user"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def max_upload_size():
+    return getattr(settings, 'COURSE_CONTENT_MAX_UPLOAD_SIZE', MAX_UPLOAD_SIZE)
+
+
+def check_content_type(content_type):
+    if not any((content_type or '').startswith(t) for t in ALLOWED_CONTENT_TYPES):
+        raise UploadRejected('File type not allowed')
+
+
+def check_size(size):
+    limit = max_upload_size()
+    if size > limit:
+        raise UploadRejected(f'File size too large. Maximum size is {limit // (1024 * 1024)}MB')
+
+
+class StoredUpload:
+    """A file that has been written to storage"""
+
+    def __init__(self, name, size, sha256, content_type, original_name, storage=default_storage):
+        self.name = name
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+        self.original_name = original_name
+        self.storage = storage
+
+    @property
+    def url(self):
+        return self.storage.url(self.name)
+
+    @property
+    def path(self):
+        """Filesystem path, or the storage name for storages without one"""
+        try:
+            return self.storage.path(self.name)
+        except NotImplementedError:
+            return self.name
+
+
+class StreamingWriter:
+    """Writes chunks to a part file while hashing and counting them"""
+
+    def __init__(self, storage=default_storage, limited=True):
+        self.storage = storage
+        self.limited = limited
+        self.size = 0
+        self.hasher = hashlib.sha256()
+        try:
+            self.part_path = storage.path(f'{INCOMING_DIR}/{uuid.uuid4().hex}.part')
+            os.makedirs(os.path.dirname(self.part_path), exist_ok=True)
+            self.file = open(self.part_path, 'wb+')
+        except NotImplementedError:
+            # Remote storage: spool locally, then hand the file to storage.save
+            self.part_path = None
+            self.file = tempfile.NamedTemporaryFile(suffix='.part')
+
+    def write(self, chunk):
+        if self.limited:
+            check_size(self.size + len(chunk))
+        self.file.write(chunk)
+        self.hasher.update(chunk)
+        self.size += len(chunk)
+
+    @property
+    def sha256(self):
+        return self.hasher.hexdigest()
+
+    def commit(self, original_name, content_type):
+        """Add the part file to the blob store and return the StoredUpload"""
+        from .blobs import add_blob
+
+        self.file.flush()
+        self.file.seek(0)
+        if self.part_path is None:
+            blob = add_blob(self.sha256, self.size, content_type, original_name, fileobj=self.file, storage=self.storage)
+        else:
+            blob = add_blob(self.sha256, self.size, content_type, original_name, self.part_path, storage=self.storage)
+        self.file.close()
+        return StoredUpload(blob.name, self.size, self.sha256, content_type, original_name, self.storage)
+
+    def discard(self):
+        self.file.close()
+        if self.part_path and os.path.exists(self.part_path):
+            os.unlink(self.part_path)
+
+
+class StreamedUploadedFile(UploadedFile):
+    """What StreamingUploadHandler puts in request.FILES"""
+
+    def __init__(self, writer, name, content_type, charset=None, content_type_extra=None):
+        writer.file.seek(0)
+        super().__init__(writer.file, name, content_type, writer.size, charset, content_type_extra)
+        self.writer = writer
+
+    @property
+    def sha256(self):
+        return self.writer.sha256
+
+
+class StreamingUploadHandler(FileUploadHandler):
+    """Upload handler that enforces the limits and streams one field to storage"""
+
+    def __init__(self, request=None, upload_field='file', storage=default_storage):
+        super().__init__(request)
+        self.upload_field = upload_field
+        self.storage = storage
+        self.writer = None
+        self.active = False
+        self.error = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        try:
+            check_size(content_length - MULTIPART_OVERHEAD)
+        except UploadRejected as e:
+            self.error = e
+            # Parsed as empty, without reading the body
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        # Only the first file in the upload field is kept; other parts are skipped
+        self.active = field_name == self.upload_field and self.writer is None
+        if not self.active:
+            return
+        try:
+            check_content_type(self.content_type)
+        except UploadRejected as e:
+            self.error = e
+            raise StopUpload(connection_reset=True)
+        self.writer = StreamingWriter(self.storage)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.active:
+            try:
+                self.writer.write(raw_data)
+            except UploadRejected as e:
+                self.error = e
+                raise StopUpload(connection_reset=True)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+        return StreamedUploadedFile(
+            self.writer, self.file_name, self.content_type, self.charset, self.content_type_extra
+        )
+
+    def upload_complete(self):
+        if self.error and self.writer is not None:
+            self.writer.discard()
+
+
+def store_upload(uploaded_file, storage=default_storage):
+    """
+    Write an uploaded file to the blob store under course_content/blobs/.
+
+    Files received by StreamingUploadHandler are already on disk and are only
+    linked into place; anything else is streamed through a StreamingWriter.
+
+    Raises:
+        UploadRejected: When the file breaks the type or size limits
+    """
+    check_content_type(uploaded_file.content_type)
+    if isinstance(uploaded_file, StreamedUploadedFile):
+        return uploaded_file.writer.commit(uploaded_file.name, uploaded_file.content_type)
+
+    check_size(uploaded_file.size or 0)
+    writer = StreamingWriter(storage)
+    try:
+        for chunk in uploaded_file.chunks():
+            writer.write(chunk)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.commit(uploaded_file.name, uploaded_file.content_type)
+
+
+def receive_upload(request, field_name='file', storage=default_storage):
+    """
+    Parse the request body with StreamingUploadHandler and store the file.
+
+    Call this before anything reads request.data or request.FILES.
+
+    Returns:
+        StoredUpload, or None when the request has no file in `field_name`
+
+    Raises:
+        UploadRejected: When the file breaks the type or size limits
+    """
+    handler = StreamingUploadHandler(request, field_name, storage)
+    request.upload_handlers = [handler]
+    uploaded_file = request.FILES.get(field_name)
+    if handler.error:
+        raise handler.error
+    if uploaded_file is None:
+        return None
+    return store_upload(uploaded_file, storage)
@@ -4,7 +4,7 @@ from .views import (
     PastPaperListView, PastPaperCreateView, PastPaperDetailView,
     MaterialListView, MaterialCreateView, MaterialDetailView,
     AssignmentListView, AssignmentCreateView, AssignmentDetailView,
-    upload_course_content_file
+    upload_course_content_file, create_upload_session, upload_session
 )
 
 app_name = 'course_content'
@@ -32,4 +32,8 @@ urlpatterns = [
     
     # File upload endpoint
     path('upload-file/', upload_course_content_file, name='upload_course_content_file'),
+
+    # Resumable (tus) upload endpoints
+    path('uploads/', create_upload_session, name='upload_session_create'),
+    path('uploads/<uuid:session_id>/', upload_session, name='upload_session'),
 ]
@@ -5,3 +5,4 @@ from .material_views import *
 from .assignment_views import *
 from .announcement_views import *
 from .file_upload_views import *
+from .resumable_upload_views import *
@@ -1,4 +1,5 @@
 from rest_framework import generics, permissions
+from search.engine import rank_queryset
 from ..models import Material
 from ..serializers import MaterialSerializer, MaterialCreateSerializer
 
@@ -26,6 +27,11 @@ class MaterialListView(generics.ListAPIView):
         if semester:
             queryset = queryset.filter(semester=semester)
         
+        # Full-text search, ranked by relevance
+        query = self.request.query_params.get('q', '').strip()
+        if query:
+            return rank_queryset(queryset, query, 'material')
+        
         return queryset.order_by('-created_at')
 
 
@@ -0,0 +1,103 @@
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from ..models import UploadSession
+from ..resumable import (
+    TUS_EXTENSIONS, TUS_VERSION, append_chunk, create_session, discard_session,
+    max_resumable_size, parse_metadata,
+)
+from ..uploads import UploadRejected
+
+
+def _tus_response(data=None, status_code=status.HTTP_204_NO_CONTENT, session=None, **headers):
+    response = Response(data, status=status_code)
+    response['Tus-Resumable'] = TUS_VERSION
+    response['Cache-Control'] = 'no-store'
+    if session is not None:
+        response['Upload-Offset'] = str(session.offset)
+        response['Upload-Length'] = str(session.length)
+        if session.status == 'uploading':
+            response['Upload-Expires'] = http_date(session.expires_at.timestamp())
+    for name, value in headers.items():
+        response[name.replace('_', '-')] = value
+    return response
+
+
+def _header_int(request, name):
+    try:
+        value = int(request.META[name])
+    except (KeyError, ValueError):
+        return None
+    return value if value >= 0 else None
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def create_upload_session(request):
+    """Start a resumable (tus) upload (admin and class rep only)"""
+    user = request.user
+    has_permission = user.is_admin or (hasattr(user, 'class_rep_role') and user.class_rep_role.is_active)
+    if not has_permission:
+        return Response({'error': 'Only administrators and class representatives can upload files'},
+                        status=status.HTTP_403_FORBIDDEN)
+
+    length = _header_int(request, 'HTTP_UPLOAD_LENGTH')
+    if length is None:
+        return _tus_response({'error': 'Upload-Length header required'}, status.HTTP_400_BAD_REQUEST)
+    try:
+        session = create_session(user, length, parse_metadata(request.META.get('HTTP_UPLOAD_METADATA')))
+    except UploadRejected as e:
+        return _tus_response({'error': str(e)}, e.status_code, Tus_Max_Size=str(max_resumable_size()))
+
+    location = request.build_absolute_uri(reverse('course_content:upload_session', args=[session.pk]))
+    return _tus_response(
+        None, status.HTTP_201_CREATED, session,
+        Location=location, Tus_Version=TUS_VERSION, Tus_Extension=TUS_EXTENSIONS,
+    )
+
+
+@api_view(['GET', 'HEAD', 'PATCH', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session(request, session_id):
+    """Query, continue or abandon a resumable upload"""
+    session = UploadSession.objects.filter(pk=session_id, uploaded_by=request.user).first()
+    if session is None:
+        return _tus_response({'error': 'Upload not found'}, status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'HEAD':
+        return _tus_response(None, status.HTTP_200_OK, session)
+
+    if request.method == 'GET':
+        return _tus_response({
+            'id': str(session.pk),
+            'filename': session.filename,
+            'content_type': session.content_type,
+            'offset': session.offset,
+            'length': session.length,
+            'status': session.status,
+            'file_url': session.file_url,
+            'file_path': session.file_path,
+            'sha256': session.sha256,
+            'expires_at': session.expires_at,
+        }, status.HTTP_200_OK, session)
+
+    if request.method == 'DELETE':
+        discard_session(session)
+        return _tus_response()
+
+    if request.content_type != 'application/offset+octet-stream':
+        return _tus_response({'error': 'Content-Type must be application/offset+octet-stream'},
+                             status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+    offset = _header_int(request, 'HTTP_UPLOAD_OFFSET')
+    content_length = _header_int(request, 'CONTENT_LENGTH')
+    if offset is None or content_length is None:
+        return _tus_response({'error': 'Upload-Offset and Content-Length headers required'},
+                             status.HTTP_400_BAD_REQUEST)
+    try:
+        # The raw WSGI body, so the chunk is never buffered whole
+        session = append_chunk(session, offset, request._request, content_length)
+    except UploadRejected as e:
+        return _tus_response({'error': str(e)}, e.status_code, session)
+    return _tus_response(session=session)
@@ -0,0 +1,204 @@
+"""
+Media file delivery.
+
+Views decide whether a file may be served and then hand it to
+``serve_file()``, which does the HTTP side in one of two modes:
+
+* With ``MEDIA_ACCEL_REDIRECT_PREFIX`` set (e.g. ``/protected-media/``), the
+  response is an empty ``X-Accel-Redirect`` to an ``internal`` nginx location
+  aliased to ``MEDIA_ROOT``. nginx then streams the file, including range
+  requests, and the gunicorn worker is free as soon as the headers are out.
+* Otherwise Django streams the file itself. It answers single-range
+  ``Range`` requests with ``206 Partial Content`` (honouring ``If-Range``),
+  so recordings can be seeked without downloading them again.
+
+Both modes send ``ETag`` and ``Last-Modified`` and answer conditional GETs
+with ``304``. The ETag is built from the file's size and mtime, so it costs
+one ``stat()``. Content types come from the precomputed ``CONTENT_TYPES`` map.
+
+``manage.py benchmark_media_delivery`` compares the two modes.
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+CHUNK_SIZE = 64 * 1024
+CACHE_CONTROL = 'private, max-age=3600'
+# For content-addressed files, whose bytes never change under their name
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+DEFAULT_CONTENT_TYPE = 'application/octet-stream'
+
+CONTENT_TYPES = {
+    # Images
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.ico': 'image/x-icon',
+    '.svg': 'image/svg+xml',
+    # Documents
+    '.pdf': 'application/pdf',
+    '.doc': 'application/msword',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.ppt': 'application/vnd.ms-powerpoint',
+    '.pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    '.xls': 'application/vnd.ms-excel',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.txt': 'text/plain; charset=utf-8',
+    '.csv': 'text/csv; charset=utf-8',
+    '.zip': 'application/zip',
+    # Recordings
+    '.mp4': 'video/mp4',
+    '.m4v': 'video/mp4',
+    '.webm': 'video/webm',
+    '.mov': 'video/quicktime',
+    '.mkv': 'video/x-matroska',
+    '.mp3': 'audio/mpeg',
+    '.m4a': 'audio/mp4',
+    '.wav': 'audio/wav',
+    '.ogg': 'audio/ogg',
+    '.oga': 'audio/ogg',
+}
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def content_type_for(path):
+    """Content type for a file name, from its extension"""
+    return CONTENT_TYPES.get(os.path.splitext(path)[1].lower(), DEFAULT_CONTENT_TYPE)
+
+
+def resolve_media_path(path):
+    """Absolute path of a file under MEDIA_ROOT; 404 for anything outside it"""
+    try:
+        return safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range`` header.
+
+    Returns:
+        (start, end) inclusive, None to ignore the header and send the whole
+        file (missing, malformed or multi-range), or False when the range
+        cannot be satisfied
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            return False
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size:
+        return False
+    return start, end
+
+
+def _read_range(file_path, start, length):
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _range_applies(request, etag, last_modified):
+    """If-Range: only honour the range while the client's copy is current"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def serve_file(request, file_path, filename=None, as_attachment=False, content_type=None,
+               cache_control=CACHE_CONTROL):
+    """
+    Send a file that the caller has already checked the user may see.
+
+    Args:
+        request: The incoming request
+        file_path: Absolute path of the file (under MEDIA_ROOT for X-Accel-Redirect)
+        filename: Name for Content-Disposition (defaults to the file's own)
+        as_attachment: Ask the browser to download instead of display
+        content_type: Override the type from CONTENT_TYPES
+        cache_control: Cache-Control header to send
+
+    Raises:
+        Http404: When the file does not exist
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        raise Http404("File not found")
+    if not os.path.isfile(file_path):
+        raise Http404("File not found")
+
+    size = stat.st_size
+    etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': cache_control,
+    }
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        for name, value in headers.items():
+            not_modified[name] = value
+        return not_modified
+
+    headers['Content-Disposition'] = content_disposition_header(
+        as_attachment, filename or os.path.basename(file_path)
+    )
+    content_type = content_type or content_type_for(filename or file_path)
+
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '')
+    if accel_prefix:
+        relative = os.path.relpath(file_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(f"{accel_prefix.rstrip('/')}/{relative}")
+    else:
+        byte_range = None
+        if request.method == 'GET' and _range_applies(request, etag, stat.st_mtime):
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        if byte_range is False:
+            response = HttpResponse(status=416, content_type=content_type)
+            response['Content-Range'] = f'bytes */{size}'
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(file_path, start, end - start + 1), status=206, content_type=content_type
+            )
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        else:
+            # FileResponse lets the WSGI server use sendfile() for the whole file
+            response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -55,6 +55,7 @@ INSTALLED_APPS = [
     'communication',
     'school',
     'ai_chat',
+    'search',
 ]
 
 MIDDLEWARE = [
@@ -120,6 +121,31 @@ else:
         },
     }
 
+# Study group chat presence registry
+# In-memory is per-process; Redis keeps presence consistent across Daphne workers
+if DEBUG:
+    PRESENCE_BACKEND = 'course_api.presence.InMemoryPresenceBackend'
+else:
+    PRESENCE_BACKEND = 'course_api.presence.RedisPresenceBackend'
+PRESENCE_REDIS_URL = config('PRESENCE_REDIS_URL', default='redis://redis:6379/1')
+PRESENCE_TTL_SECONDS = config('PRESENCE_TTL_SECONDS', default=60, cast=int)
+
+# Cache
+# Shared through Redis in production so invalidations reach every worker
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('CACHE_REDIS_URL', default='redis://redis:6379/2'),
+        },
+    }
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -188,6 +214,13 @@ STATIC_ROOT = BASE_DIR / 'static' / 'browser'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Internal nginx location aliased to MEDIA_ROOT (e.g. '/protected-media/'); when set,
+# serve_media answers with X-Accel-Redirect and nginx streams the file
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+# Largest course content upload, in bytes (lecture recordings stream to disk, so this is not a memory bound)
+COURSE_CONTENT_MAX_UPLOAD_SIZE = int(os.environ.get('COURSE_CONTENT_MAX_UPLOAD_SIZE', 50 * 1024 * 1024))
+# Largest resumable (tus) upload; each PATCH chunk must still fit nginx's client_max_body_size
+COURSE_CONTENT_MAX_RESUMABLE_SIZE = int(os.environ.get('COURSE_CONTENT_MAX_RESUMABLE_SIZE', 4 * 1024 * 1024 * 1024))
 
 # Custom User Model
 AUTH_USER_MODEL = 'directory.User'
@@ -338,3 +371,7 @@ LOGGING = {
 # Daily.co Video Call Configuration
 DAILY_API_KEY = os.getenv('DAILY_API_KEY', '')
 DAILY_DOMAIN = os.getenv('DAILY_DOMAIN', 'daily.co')
+DAILY_API_BASE_URL = os.getenv('DAILY_API_BASE_URL', 'https://api.daily.co/v1')
+# Seconds to wait for a connection and for a response from the Daily.co API
+DAILY_CONNECT_TIMEOUT = float(os.getenv('DAILY_CONNECT_TIMEOUT', '3.05'))
+DAILY_READ_TIMEOUT = float(os.getenv('DAILY_READ_TIMEOUT', '10'))
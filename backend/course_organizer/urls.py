@@ -53,6 +53,7 @@ urlpatterns = [
     path('api/communication/', include('communication.urls')),
     path('api/school/', include('school.urls')),
     path('api/ai-chat/', include('ai_chat.urls')),
+    path('api/search/', include('search.urls')),
     # Direct favicon routes for better browser compatibility
     path('favicon.ico', views.serve_favicon),
     path('favicon.svg', views.serve_favicon_svg),
@@ -4,6 +4,7 @@ from django.views.decorators.clickjacking import xframe_options_exempt
 from django.views.static import serve
 import os
 from django.conf import settings
+from .media import CACHE_CONTROL, IMMUTABLE_CACHE_CONTROL, resolve_media_path, serve_file
 
 def serve_angular_app(request):
     """Serve the Angular application for all non-API routes"""
@@ -22,24 +23,17 @@ def serve_angular_app(request):
 @xframe_options_exempt
 def serve_pdf(request, path):
     """Serve PDF files with iframe embedding allowed"""
-    file_path = os.path.join(settings.MEDIA_ROOT, path)
-    
-    if not os.path.exists(file_path):
-        raise Http404("File not found")
+    file_path = resolve_media_path(path)
     
     # Check if it's a PDF file
     if not file_path.lower().endswith('.pdf'):
         raise Http404("File not found")
     
-    try:
-        response = FileResponse(open(file_path, 'rb'), content_type='application/pdf')
-        response['Content-Disposition'] = 'inline; filename="' + os.path.basename(file_path) + '"'
-        # Remove X-Frame-Options header completely to allow iframe embedding
-        if 'X-Frame-Options' in response:
-            del response['X-Frame-Options']
-        return response
-    except Exception as e:
-        raise Http404("Error serving file")
+    response = serve_file(request, file_path, content_type='application/pdf')
+    # Remove X-Frame-Options header completely to allow iframe embedding
+    if 'X-Frame-Options' in response:
+        del response['X-Frame-Options']
+    return response
 
 def serve_favicon(request):
     """Serve favicon.ico directly"""
@@ -62,32 +56,10 @@ def serve_favicon_svg(request):
         raise Http404("Favicon SVG not found")
 
 def serve_media(request, path):
-    """Serve media files (images, documents, etc.)"""
-    file_path = os.path.join(settings.MEDIA_ROOT, path)
-    
-    if not os.path.exists(file_path):
-        raise Http404("File not found")
-    
-    try:
-        # Determine content type based on file extension
-        content_type = 'application/octet-stream'  # default
-        if file_path.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-            content_type = 'image/' + file_path.split('.')[-1].lower()
-            if content_type == 'image/jpg':
-                content_type = 'image/jpeg'
-        elif file_path.lower().endswith('.ico'):
-            content_type = 'image/x-icon'
-        elif file_path.lower().endswith('.svg'):
-            content_type = 'image/svg+xml'
-        elif file_path.lower().endswith('.pdf'):
-            content_type = 'application/pdf'
-        elif file_path.lower().endswith(('.doc', '.docx')):
-            content_type = 'application/msword'
-        elif file_path.lower().endswith(('.ppt', '.pptx')):
-            content_type = 'application/vnd.ms-powerpoint'
-        
-        response = FileResponse(open(file_path, 'rb'), content_type=content_type)
-        response['Content-Disposition'] = 'inline; filename="' + os.path.basename(file_path) + '"'
-        return response
-    except Exception as e:
-        raise Http404("Error serving file")
+    """Serve media files (images, documents, recordings, etc.)"""
+    from course_content.blobs import BLOB_DIR
+
+    file_path = resolve_media_path(path)
+    # Any access check belongs here; serve_file (or nginx, via X-Accel-Redirect) only moves the bytes
+    immutable = path.startswith(f'{BLOB_DIR}/')
+    return serve_file(request, file_path, cache_control=IMMUTABLE_CACHE_CONTROL if immutable else CACHE_CONTROL)
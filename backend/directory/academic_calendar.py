@@ -0,0 +1,152 @@
+"""
+Process-wide snapshot of the academic calendar.
+
+The active ``AcademicYear``, its semesters and the active semester are read
+with two queries into a ``CalendarSnapshot`` that every thread of the process
+shares. ``AcademicYear.get_current_academic_year()`` and the other calendar
+lookups serve from it, so a request that asks for the current year many times
+(class year of study, course visibility, user saves) pays for it once.
+
+Saving or deleting an ``AcademicYear`` or ``Semester`` drops the local
+snapshot and, once the transaction commits, bumps a version stamp in the
+Django cache. Other workers compare that stamp at most every
+``CHECK_INTERVAL`` seconds. Bulk ``update()`` calls bypass signals and must
+call ``invalidate_academic_calendar()`` themselves; ``TTL_SECONDS`` bounds
+staleness if one is missed.
+"""
+import copy
+import threading
+import time
+from datetime import date
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'academic_calendar_version'
+CHECK_INTERVAL = 1.0
+TTL_SECONDS = 300
+
+
+class CalendarSnapshot:
+    """Active academic year and semesters, loaded together"""
+
+    def __init__(self, academic_year, semesters, active_semester, version):
+        self.academic_year = academic_year
+        self.semesters = semesters
+        self.active_semester = active_semester
+        self.version = version
+
+    def get_semester(self, semester_type):
+        """The active year's semester of a type (1, 2 or 3), or None"""
+        return next((s for s in self.semesters if s.semester_type == semester_type), None)
+
+    def semester_on(self, day):
+        """The active year's semester whose date range contains day, or None"""
+        return next((s for s in self.semesters if s.start_date <= day <= s.end_date), None)
+
+
+_snapshot = None
+_loaded_at = 0.0
+_checked_at = 0.0
+_generation = 0  # bumped on local invalidation; part of the version when the cache is process-local
+_lock = threading.Lock()
+
+
+def _load(version):
+    from django.db.models import Q
+    from .models import AcademicYear, Semester
+
+    academic_year = AcademicYear.objects.filter(is_active=True).first()
+    rows = Semester.objects.filter(
+        Q(academic_year=academic_year) | Q(is_active=True) if academic_year else Q(is_active=True)
+    ).select_related('academic_year').order_by('semester_type')
+    semesters, active_semester = [], None
+    for semester in rows:
+        if academic_year and semester.academic_year_id == academic_year.pk:
+            semester.academic_year = academic_year
+            semesters.append(semester)
+        if semester.is_active and active_semester is None:
+            active_semester = semester
+    return CalendarSnapshot(academic_year, semesters, active_semester, version)
+
+
+def get_calendar():
+    """Return the current snapshot, reloading it when stale"""
+    global _snapshot, _loaded_at, _checked_at
+    now = time.monotonic()
+    with _lock:
+        snapshot, generation = _snapshot, _generation
+        fresh = snapshot is not None and now - _loaded_at < TTL_SECONDS
+        if fresh and now - _checked_at < CHECK_INTERVAL:
+            return snapshot
+
+    version = (cache.get(VERSION_KEY), generation)
+    if fresh and snapshot.version == version:
+        with _lock:
+            _checked_at = now
+        return snapshot
+
+    snapshot = _load(version)
+    with _lock:
+        # A concurrent invalidation wins over what was just read
+        if _generation == generation:
+            _snapshot, _loaded_at, _checked_at = snapshot, now, now
+    return snapshot
+
+
+def reset_academic_calendar():
+    """Forget this process's snapshot (e.g. after a rolled-back test transaction)"""
+    global _snapshot, _generation
+    with _lock:
+        _snapshot = None
+        _generation += 1
+
+
+def invalidate_academic_calendar():
+    """Drop the snapshot here now, and in every worker once the change commits"""
+    reset_academic_calendar()
+    transaction.on_commit(lambda: (reset_academic_calendar(), cache.set(VERSION_KEY, time.time_ns(), None)))
+
+
+def get_current_academic_year():
+    """A copy of the active AcademicYear, or None"""
+    academic_year = get_calendar().academic_year
+    return copy.copy(academic_year) if academic_year else None
+
+
+def get_current_semester():
+    """A copy of the active Semester, or None"""
+    semester = get_calendar().active_semester
+    return copy.copy(semester) if semester else None
+
+
+def get_semester(academic_year, semester_type):
+    """A semester of an academic year, from the snapshot when it is the active year"""
+    snapshot = get_calendar()
+    if academic_year is not None and snapshot.academic_year and academic_year.pk == snapshot.academic_year.pk:
+        semester = snapshot.get_semester(semester_type)
+        return copy.copy(semester) if semester else None
+    from .models import Semester
+    return Semester.objects.filter(academic_year=academic_year, semester_type=semester_type).first()
+
+
+def semester_progress(semester=None, today=None):
+    """
+    Progress figures for a semester (the active one by default), without queries.
+
+    Returns:
+        Dict with percentage, status, days_elapsed, total_days and
+        days_remaining, or None when there is no such semester
+    """
+    semester = semester or get_calendar().active_semester
+    if semester is None:
+        return None
+    today = today or date.today()
+    return {
+        'semester_id': semester.pk,
+        'percentage': semester.get_progress_percentage(today),
+        'status': semester.get_progress_status(today),
+        'days_elapsed': semester.get_days_elapsed(today),
+        'total_days': semester.get_total_days(),
+        'days_remaining': semester.get_days_remaining(today),
+    }
@@ -53,9 +53,25 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
     
+    actions = ['approve_users']
+    
     def get_full_name(self, obj):
         return obj.get_full_name()
     get_full_name.short_description = 'Full Name'
+    
+    def approve_users(self, request, queryset):
+        """Approve selected pending users and queue their approval emails in one batch"""
+        from course_api.email_service import send_registration_approval_emails
+        
+        users = list(queryset.filter(status='pending'))
+        # updated_at marks this approval, so its emails are keyed apart from any earlier one
+        now = timezone.now()
+        User.objects.filter(pk__in=[u.pk for u in users]).update(status='approved', is_active=True, updated_at=now)
+        for user in users:
+            user.status, user.is_active, user.updated_at = 'approved', True, now
+        queued = sum(send_registration_approval_emails(users).values())
+        self.message_user(request, f"Successfully approved {len(users)} users; {queued} approval emails queued.")
+    approve_users.short_description = "Approve selected pending users"
 
 
 @admin.register(Student)
@@ -130,15 +146,20 @@ class RegistrationRequestAdmin(admin.ModelAdmin):
     
     def approve_requests(self, request, queryset):
         """Approve selected registration requests"""
-        approved_count = 0
+        from course_api.email_service import send_registration_approval_emails
+        
+        approved = []
         for req in queryset.filter(status='pending'):
             try:
-                req.approve(request.user)
-                approved_count += 1
+                approved.append(req.approve(request.user))
             except ValidationError as e:
                 self.message_user(request, f"Error approving {req.full_name}: {e}", level='ERROR')
         
-        self.message_user(request, f"Successfully approved {approved_count} registration requests.")
+        # One outbox batch for the whole wave instead of an email per approval
+        queued = sum(send_registration_approval_emails(approved).values())
+        self.message_user(
+            request, f"Successfully approved {len(approved)} registration requests; {queued} approval emails queued."
+        )
     approve_requests.short_description = "Approve selected requests"
     
     def reject_requests(self, request, queryset):
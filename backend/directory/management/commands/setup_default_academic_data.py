@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from directory.models import AcademicYear, Semester, User
+from directory.academic_calendar import invalidate_academic_calendar
 from course_api.models import Course
 from datetime import date
 
@@ -57,6 +58,8 @@ class Command(BaseCommand):
             # Deactivate other academic years and semesters
             AcademicYear.objects.exclude(id=academic_year.id).update(is_active=False)
             Semester.objects.exclude(id=semester.id).update(is_active=False)
+            # update() sends no signals
+            invalidate_academic_calendar()
 
             self.stdout.write(
                 self.style.SUCCESS('Successfully set up default academic data!')
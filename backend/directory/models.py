@@ -31,14 +31,18 @@ class AcademicYear(models.Model):
     
     @classmethod
     def get_current_academic_year(cls):
-        """Get the currently active academic year"""
-        return cls.objects.filter(is_active=True).first()
+        """Get the currently active academic year (from the process-wide calendar snapshot)"""
+        from .academic_calendar import get_current_academic_year
+        return get_current_academic_year()
 
     @classmethod
     def get_or_create_2025_2026(cls):
         """Compatibility helper used across commands/components.
         Ensures the 2025/2026 academic year exists and returns it (sets active if newly created).
         """
+        current = cls.get_current_academic_year()
+        if current and (current.year_start, current.year_end) == (2025, 2026):
+            return current
         obj, created = cls.objects.get_or_create(
             year_start=2025,
             year_end=2026,
@@ -82,10 +86,9 @@ class Semester(models.Model):
         """Get formatted semester name"""
         return f"{self.academic_year} - {self.get_semester_type_display()}"
     
-    def get_progress_percentage(self):
+    def get_progress_percentage(self, today=None):
         """Calculate semester progress as a percentage"""
-        from datetime import date
-        today = date.today()
+        today = today or date.today()
         total_days = (self.end_date - self.start_date).days
         
         if today < self.start_date:
@@ -96,10 +99,9 @@ class Semester(models.Model):
             days_elapsed = (today - self.start_date).days
             return round((days_elapsed / total_days) * 100, 1)
     
-    def get_progress_status(self):
+    def get_progress_status(self, today=None):
         """Get semester progress status"""
-        from datetime import date
-        today = date.today()
+        today = today or date.today()
         
         if today < self.start_date:
             return "Not Started"
@@ -108,10 +110,9 @@ class Semester(models.Model):
         else:
             return "In Progress"
     
-    def get_days_elapsed(self):
+    def get_days_elapsed(self, today=None):
         """Get number of days elapsed in the semester"""
-        from datetime import date
-        today = date.today()
+        today = today or date.today()
         
         if today < self.start_date:
             return 0
@@ -124,10 +125,9 @@ class Semester(models.Model):
         """Get total number of days in the semester"""
         return (self.end_date - self.start_date).days
     
-    def get_days_remaining(self):
+    def get_days_remaining(self, today=None):
         """Get number of days remaining in the semester"""
-        from datetime import date
-        today = date.today()
+        today = today or date.today()
         
         if today < self.start_date:
             return self.get_total_days()
@@ -33,20 +33,27 @@ class SemesterSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
     
+    def _progress(self, obj):
+        """Progress figures from the calendar helper, computed once per semester"""
+        from .academic_calendar import semester_progress
+        if getattr(obj, '_progress', None) is None:
+            obj._progress = semester_progress(obj)
+        return obj._progress
+    
     def get_progress_percentage(self, obj):
-        return obj.get_progress_percentage()
+        return self._progress(obj)['percentage']
     
     def get_progress_status(self, obj):
-        return obj.get_progress_status()
+        return self._progress(obj)['status']
     
     def get_days_elapsed(self, obj):
-        return obj.get_days_elapsed()
+        return self._progress(obj)['days_elapsed']
     
     def get_total_days(self, obj):
-        return obj.get_total_days()
+        return self._progress(obj)['total_days']
     
     def get_days_remaining(self, obj):
-        return obj.get_days_remaining()
+        return self._progress(obj)['days_remaining']
 
 
 class ClassSerializer(serializers.ModelSerializer):
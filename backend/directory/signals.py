@@ -1,8 +1,9 @@
-"""Signals for tracking user login/logout events"""
+"""Signals for tracking user login/logout events and keeping the academic calendar fresh"""
 from django.contrib.auth.signals import user_logged_in, user_logged_out, user_login_failed
 from django.dispatch import receiver
-from django.db.models.signals import post_save
-from .models import LoginHistory
+from django.db.models.signals import post_delete, post_save
+from .academic_calendar import invalidate_academic_calendar
+from .models import AcademicYear, LoginHistory, Semester
 from .utils import get_client_ip, parse_user_agent, get_location_from_ip
 
 
@@ -107,3 +108,12 @@ def check_suspicious_activity(sender, instance, created, **kwargs):
                 f"Total attempts in last hour: {failed_attempts}"
             )
             # You could send an email alert here or trigger other actions
+
+
+@receiver(post_save, sender=AcademicYear)
+@receiver(post_delete, sender=AcademicYear)
+@receiver(post_save, sender=Semester)
+@receiver(post_delete, sender=Semester)
+def academic_calendar_changed(sender, instance, **kwargs):
+    """Reload the academic calendar snapshot in every worker"""
+    invalidate_academic_calendar()
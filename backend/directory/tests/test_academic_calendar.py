@@ -0,0 +1,68 @@
+import pytest
+from datetime import date
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from directory.academic_calendar import get_calendar, get_current_semester, get_semester, semester_progress
+from directory.models import AcademicYear, Semester
+from directory.tests.test_models import UserFactory
+
+
+@pytest.mark.django_db
+class TestAcademicCalendar(TestCase):
+    """Test cases for the process-wide academic calendar snapshot"""
+
+    def setUp(self):
+        self.year = AcademicYear.get_or_create_2025_2026()
+        self.first = Semester.objects.create(
+            academic_year=self.year, semester_type=1,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 10), is_active=True
+        )
+        self.second = Semester.objects.create(
+            academic_year=self.year, semester_type=2,
+            start_date=date(2026, 1, 10), end_date=date(2026, 4, 30)
+        )
+
+    def test_snapshot_serves_repeat_lookups(self):
+        """Test that the active year and semesters are read once"""
+        self.assertEqual(AcademicYear.get_current_academic_year(), self.year)
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(5):
+                AcademicYear.get_current_academic_year()
+                AcademicYear.get_or_create_2025_2026()
+            semester = get_semester(self.year, 2)
+            UserFactory()
+        self.assertEqual(semester, self.second)
+        self.assertFalse([q for q in queries if 'directory_academicyear' in q['sql'] or 'directory_semester' in q['sql']])
+
+    def test_saves_refresh_the_snapshot(self):
+        """Test that activating another year or semester is seen immediately"""
+        self.assertEqual(get_current_semester(), self.first)
+        self.first.is_active = False
+        self.first.save()
+        self.second.is_active = True
+        self.second.save()
+        self.assertEqual(get_current_semester(), self.second)
+
+        next_year = AcademicYear.objects.create(year_start=2026, year_end=2027, is_active=True)
+        self.year.is_active = False
+        self.year.save()
+        self.assertEqual(AcademicYear.get_current_academic_year(), next_year)
+        self.assertEqual(get_calendar().semesters, [])
+
+    def test_returned_objects_are_copies(self):
+        """Test that callers cannot mutate the shared snapshot"""
+        AcademicYear.get_current_academic_year().year_start = 1999
+        self.assertEqual(AcademicYear.get_current_academic_year().year_start, 2025)
+
+    def test_semester_progress(self):
+        """Test that progress helpers compute from the snapshot without queries"""
+        get_calendar()
+        with CaptureQueriesContext(connection) as queries:
+            progress = semester_progress(today=date(2025, 10, 21))
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(progress['semester_id'], self.first.id)
+        self.assertEqual(progress['status'], 'In Progress')
+        self.assertEqual(progress['days_elapsed'], 50)
+        self.assertEqual(progress['days_remaining'], 50)
+        self.assertEqual(progress['percentage'], 50.0)
@@ -13,6 +13,8 @@ from school.models import Class as StudentClass
 from directory.tests.test_models import UserFactory, AcademicYearFactory, SemesterFactory, StudentClassFactory
 import uuid
 from django.core import mail
+from course_api.email_outbox import drain
+from course_api.models import EmailOutbox
 from rest_framework.reverse import reverse as drf_reverse
 
 User = get_user_model()
@@ -45,7 +47,13 @@ class TestUserRegistrationAPI(APITestCase):
         response = self.client.post(self.registration_url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(User.objects.filter(email='test@students.uonbi.ac.ke').exists())
-        # Assert admin notification email sent
+        # Emails are queued in the outbox, not sent during the request
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            set(EmailOutbox.objects.values_list('category', flat=True)), {'verification', 'admin_notification'}
+        )
+        # Assert admin notification email sent once the outbox drains
+        drain()
         self.assertGreaterEqual(len(mail.outbox), 1)
         admin_emails = [m for m in mail.outbox if 'admin@riverlearn.co.ke' in m.to]
         self.assertGreaterEqual(len(admin_emails), 1)
@@ -78,6 +86,7 @@ class TestUserRegistrationAPI(APITestCase):
 
         resp = self.client.post(self.registration_request_url, payload, format='json')
         self.assertIn(resp.status_code, [status.HTTP_201_CREATED, status.HTTP_200_OK])
+        drain()
         self.assertGreaterEqual(len(mail.outbox), 1)
         admin_emails = [m for m in mail.outbox if 'admin@riverlearn.co.ke' in m.to]
         self.assertGreaterEqual(len(admin_emails), 1)
@@ -291,3 +300,41 @@ class TestSemesterAPI(APITestCase):
         # Check that our created active semester is in the list
         active_semester_ids = [sem['id'] for sem in active_semesters]
         self.assertIn(active_semester.id, active_semester_ids)
+
+    def test_current_semester_is_served_from_the_calendar_snapshot(self):
+        """Test that the current semester and its progress need no semester queries once loaded"""
+        url = reverse('current_semester')
+        Semester.objects.update(is_active=False)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        academic_year = AcademicYearFactory(year_start=2024, year_end=2025)
+        semester = SemesterFactory(academic_year=academic_year, semester_type=1, is_active=True)
+        self.assertEqual(self.client.get(url).data['id'], semester.id)
+        with self.assertNumQueries(1):  # token authentication only
+            response = self.client.get(url)
+        self.assertEqual(response.data['total_days'], semester.get_total_days())
+        self.assertEqual(response.data['days_remaining'], semester.get_days_remaining())
+
+
+@pytest.mark.django_db
+class TestBulkApproval(TestCase):
+    """Test cases for approving registrations in waves from the admin"""
+
+    def setUp(self):
+        self.admin = UserFactory(is_staff=True, is_superuser=True)
+        self.client.force_login(self.admin)
+
+    def test_admin_action_approves_users_and_queues_emails_together(self):
+        """Test that the bulk action approves pending users and queues one approval email each"""
+        pending = [UserFactory(status='pending', is_active=False) for _ in range(3)]
+        rejected = UserFactory(status='rejected')
+        response = self.client.post(reverse('admin:directory_user_changelist'), {
+            'action': 'approve_users', '_selected_action': [u.pk for u in pending + [rejected]],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(User.objects.filter(pk__in=[u.pk for u in pending], status='approved', is_active=True).count(), 3)
+        self.assertEqual(User.objects.get(pk=rejected.pk).status, 'rejected')
+        self.assertEqual(
+            set(EmailOutbox.objects.filter(category='approval').values_list('to_email', flat=True)),
+            {u.email for u in pending},
+        )
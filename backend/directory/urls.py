@@ -14,6 +14,7 @@ urlpatterns = [
     
     # Semesters
     path('semesters/', views.SemesterListView.as_view(), name='semesters'),
+    path('semesters/current/', views.current_semester, name='current_semester'),
     
     # Classes
     path('classes/', views.ClassListView.as_view(), name='classes'),
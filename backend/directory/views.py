@@ -3,7 +3,6 @@ from rest_framework.decorators import api_view, permission_classes, authenticati
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
-from django.db.models import Q
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
@@ -29,7 +28,7 @@ class AcademicYearListView(generics.ListAPIView):
 
 class SemesterListView(generics.ListAPIView):
     """List all semesters, optionally filtered by academic year"""
-    queryset = Semester.objects.all()
+    queryset = Semester.objects.select_related('academic_year')
     serializer_class = SemesterSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -41,6 +40,17 @@ class SemesterListView(generics.ListAPIView):
         return queryset
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def current_semester(request):
+    """The active semester with its progress, served from the academic calendar snapshot"""
+    from .academic_calendar import get_current_semester
+    semester = get_current_semester()
+    if semester is None:
+        return Response({'error': 'No active semester'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(SemesterSerializer(semester).data)
+
+
 class ClassListView(generics.ListAPIView):
     """List all classes"""
     queryset = Class.objects.all()
@@ -177,7 +187,8 @@ class RegistrationRequestListView(generics.ListCreateAPIView):
                 last_name=data.get('last_name', ''),
                 email=data.get('email', ''),
                 registration_number=data.get('registration_number', None),
-                source="registration_request"
+                source="registration_request",
+                record_id=serializer.instance.pk,
             )
         except Exception:
             # Don't block creation if email fails
@@ -326,9 +337,14 @@ def approve_registration_request(request, pk):
         reg_request = RegistrationRequest.objects.get(pk=pk)
         user = reg_request.approve(request.user)
         
+        # Queue the approval email (sent by the outbox worker)
+        from course_api.email_service import send_registration_approval_email
+        email_sent = send_registration_approval_email(user)
+        
         return Response({
             'message': 'Registration request approved successfully',
-            'user': UserSerializer(user).data
+            'user': UserSerializer(user).data,
+            'email_sent': email_sent,
         })
     except RegistrationRequest.DoesNotExist:
         return Response({'error': 'Registration request not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -377,7 +393,8 @@ def register_student(request):
                 last_name=user.last_name,
                 email=user.email,
                 registration_number=user.registration_number,
-                source="student_signup"
+                source="student_signup",
+                record_id=user.id,
             )
         except Exception:
             pass
@@ -403,21 +420,18 @@ def search_users(request):
     if not query:
         return Response({'error': 'Search query is required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Build search query
-    search_query = Q(first_name__icontains=query) | Q(last_name__icontains=query) | \
-                   Q(email__icontains=query) | Q(registration_number__icontains=query)
-    
+    # Ranked lookup on the search index (name, email, registration number)
+    from search.engine import rank_queryset
+    users = User.objects.all()
     if user_type:
-        search_query &= Q(user_type=user_type)
-    
-    users = User.objects.filter(search_query)
+        users = users.filter(user_type=user_type)
     
     # Limit results and apply permissions
     if not request.user.is_admin:
         # Non-admins can only see approved users
         users = users.filter(status='approved')
     
-    users = users[:50]  # Limit to 50 results
+    users = rank_queryset(users, query, 'user')[:50]  # Limit to 50 results
     
     serializer = UserSerializer(users, many=True)
     return Response(serializer.data)
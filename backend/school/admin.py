@@ -29,6 +29,10 @@ class SchoolAdmin(admin.ModelAdmin):
         count = obj.total_students
         return format_html('<span style="color: green;">{}</span>', count)
     total_students_display.short_description = 'Total Students'
+    total_students_display.admin_order_field = 'student_total'
+
+    def get_queryset(self, request):
+        return School.with_student_totals(super().get_queryset(request))
 
 
 class FacultyInline(admin.TabularInline):
@@ -130,11 +134,12 @@ class ClassAdmin(admin.ModelAdmin):
         count = obj.student_count
         return format_html('<span style="color: blue;">{}</span>', count)
     student_count_display.short_description = 'Students'
+    student_count_display.admin_order_field = 'student_total'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
+        return Class.with_student_counts(super().get_queryset(request).select_related(
             'department', 'department__faculty', 'department__faculty__school', 'academic_year'
-        )
+        ))
 
 
 @admin.register(Program)
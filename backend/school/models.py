@@ -3,6 +3,12 @@ from django.core.exceptions import ValidationError
 from directory.models import AcademicYear
 
 
+def _student_total(class_path, active_filters):
+    """Count of students reached through class_path, skipping inactive levels on the way"""
+    from django.db.models import Count, Q
+    return Count(f'{class_path}students', filter=Q(**active_filters, **{f'{class_path}is_active': True}))
+
+
 class School(models.Model):
     """Model representing a school (e.g., School of Law, School of Medicine)"""
     
@@ -22,12 +28,18 @@ class School(models.Model):
     @property
     def total_students(self):
         """Get total number of students across all classes in this school"""
-        total = 0
-        for faculty in self.faculties.filter(is_active=True):
-            for department in faculty.departments.filter(is_active=True):
-                for class_obj in department.classes.filter(is_active=True):
-                    total += class_obj.student_count
-        return total
+        if hasattr(self, 'student_total'):
+            return self.student_total
+        return School.with_student_totals(School.objects.filter(pk=self.pk)).get().student_total
+
+    @classmethod
+    def with_student_totals(cls, queryset=None):
+        """Annotate student_total: students in the school's active faculties, departments and classes"""
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.annotate(student_total=_student_total('faculties__departments__classes__', {
+            'faculties__is_active': True,
+            'faculties__departments__is_active': True,
+        }))
 
 
 class Faculty(models.Model):
@@ -53,6 +65,21 @@ class Faculty(models.Model):
     def display_name(self):
         """Get formatted faculty name"""
         return f"{self.school.name} - {self.name}"
+    
+    @property
+    def total_students(self):
+        """Get total number of students across the faculty's active departments and classes"""
+        if hasattr(self, 'student_total'):
+            return self.student_total
+        return Faculty.with_student_totals(Faculty.objects.filter(pk=self.pk)).get().student_total
+    
+    @classmethod
+    def with_student_totals(cls, queryset=None):
+        """Annotate student_total for each faculty"""
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.annotate(student_total=_student_total('departments__classes__', {
+            'departments__is_active': True,
+        }))
 
 
 class Department(models.Model):
@@ -83,6 +110,19 @@ class Department(models.Model):
     def school(self):
         """Get the school this department belongs to"""
         return self.faculty.school
+    
+    @property
+    def total_students(self):
+        """Get total number of students across the department's active classes"""
+        if hasattr(self, 'student_total'):
+            return self.student_total
+        return Department.with_student_totals(Department.objects.filter(pk=self.pk)).get().student_total
+    
+    @classmethod
+    def with_student_totals(cls, queryset=None):
+        """Annotate student_total for each department"""
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.annotate(student_total=_student_total('classes__', {}))
 
 
 class Class(models.Model):
@@ -136,8 +176,17 @@ class Class(models.Model):
     @property
     def student_count(self):
         """Get number of students in this class"""
+        if hasattr(self, 'student_total'):
+            return self.student_total
         return self.students.count()
     
+    @classmethod
+    def with_student_counts(cls, queryset=None):
+        """Annotate student_total for each class (read back through student_count)"""
+        from django.db.models import Count
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.annotate(student_total=Count('students'))
+    
     def clean(self):
         """Validate class data"""
         # Ensure only one default class per department
@@ -0,0 +1,95 @@
+"""
+School -> Faculty -> Department -> Class tree with student counts.
+
+The whole tree is read with one grouped query that walks the hierarchy with
+outer joins and counts students per class; totals for departments, faculties
+and schools are summed while the rows are folded into nested dicts. Inactive
+nodes are skipped along with everything below them, which matches what
+``School.total_students`` counts.
+
+The serialized tree is cached under a version stamp that ``school.signals``
+bumps whenever a node is saved or deleted or a user changes class.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import Count
+
+VERSION_KEY = 'school_org_tree_version'
+TTL_SECONDS = 600
+
+CLASS_PATH = 'faculties__departments__classes'
+
+
+def invalidate_org_tree():
+    """Drop the cached tree in every worker"""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def build_org_tree():
+    """Nested schools with per-node student totals, from a single query"""
+    from .models import School
+
+    rows = School.objects.filter(is_active=True).values(
+        'id', 'name', 'code',
+        'faculties__id', 'faculties__name', 'faculties__code', 'faculties__is_active',
+        'faculties__departments__id', 'faculties__departments__name',
+        'faculties__departments__code', 'faculties__departments__is_active',
+        f'{CLASS_PATH}__id', f'{CLASS_PATH}__name', f'{CLASS_PATH}__program',
+        f'{CLASS_PATH}__graduation_year', f'{CLASS_PATH}__is_active',
+    ).annotate(
+        student_count=Count(f'{CLASS_PATH}__students')
+    ).order_by('name', 'faculties__name', 'faculties__departments__name', f'-{CLASS_PATH}__graduation_year')
+
+    schools = {}
+    for row in rows:
+        school = schools.setdefault(row['id'], {
+            'id': row['id'], 'name': row['name'], 'code': row['code'],
+            'total_students': 0, 'faculties': {},
+        })
+        if row['faculties__id'] is None or not row['faculties__is_active']:
+            continue
+        faculty = school['faculties'].setdefault(row['faculties__id'], {
+            'id': row['faculties__id'], 'name': row['faculties__name'], 'code': row['faculties__code'],
+            'total_students': 0, 'departments': {},
+        })
+        if row['faculties__departments__id'] is None or not row['faculties__departments__is_active']:
+            continue
+        department = faculty['departments'].setdefault(row['faculties__departments__id'], {
+            'id': row['faculties__departments__id'], 'name': row['faculties__departments__name'],
+            'code': row['faculties__departments__code'], 'total_students': 0, 'classes': [],
+        })
+        if row[f'{CLASS_PATH}__id'] is None or not row[f'{CLASS_PATH}__is_active']:
+            continue
+        count = row['student_count']
+        department['classes'].append({
+            'id': row[f'{CLASS_PATH}__id'], 'name': row[f'{CLASS_PATH}__name'],
+            'program': row[f'{CLASS_PATH}__program'], 'graduation_year': row[f'{CLASS_PATH}__graduation_year'],
+            'student_count': count,
+        })
+        department['total_students'] += count
+        faculty['total_students'] += count
+        school['total_students'] += count
+
+    tree = []
+    for school in schools.values():
+        faculties = []
+        for faculty in school['faculties'].values():
+            faculty['departments'] = list(faculty['departments'].values())
+            faculties.append(faculty)
+        school['faculties'] = faculties
+        tree.append(school)
+    return {
+        'schools': tree,
+        'total_students': sum(school['total_students'] for school in tree),
+    }
+
+
+def get_org_tree():
+    """The org tree, from cache when possible"""
+    key = f'school_org_tree:{cache.get(VERSION_KEY) or 0}'
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_org_tree()
+        cache.set(key, tree, TTL_SECONDS)
+    return tree
@@ -0,0 +1,28 @@
+"""Signals keeping the cached org tree in step with the hierarchy and class membership"""
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Class, Department, Faculty, School
+from .org_tree import invalidate_org_tree
+
+
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+@receiver(post_save, sender=Faculty)
+@receiver(post_delete, sender=Faculty)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+def hierarchy_changed(sender, instance, **kwargs):
+    """A node was added, renamed, (de)activated or removed"""
+    invalidate_org_tree()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def student_class_changed(sender, instance, update_fields=None, **kwargs):
+    """Student counts change when users join, leave or move between classes"""
+    if update_fields is not None and 'student_class' not in update_fields:
+        return
+    invalidate_org_tree()
@@ -0,0 +1,120 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from directory.models import AcademicYear
+from school.models import School
+from school.org_tree import build_org_tree, get_org_tree
+from directory.tests.test_models import (
+    UserFactory, SchoolFactory, FacultyFactory, DepartmentFactory, StudentClassFactory
+)
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'org-tree-tests'}}
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+class TestOrgTree(TestCase):
+    """Test cases for hierarchy student totals and the cached org tree"""
+
+    def setUp(self):
+        cache.clear()
+        year = AcademicYear.get_or_create_2025_2026()
+        self.school = SchoolFactory()
+        self.faculty = FacultyFactory(school=self.school)
+        self.department = DepartmentFactory(faculty=self.faculty)
+        self.first = StudentClassFactory(department=self.department, academic_year=year, graduation_year=2029)
+        self.second = StudentClassFactory(department=self.department, academic_year=year, graduation_year=2030)
+        self.closed = StudentClassFactory(
+            department=self.department, academic_year=year, graduation_year=2031, is_active=False
+        )
+        self.closed_faculty = FacultyFactory(school=self.school, is_active=False)
+        hidden = StudentClassFactory(
+            department=DepartmentFactory(faculty=self.closed_faculty), academic_year=year
+        )
+        for student_class, count in ((self.first, 3), (self.second, 2), (self.closed, 4), (hidden, 5)):
+            for _ in range(count):
+                UserFactory(user_type='student', student_class=student_class)
+
+    def test_totals_skip_inactive_nodes(self):
+        """Test that totals roll up through active faculties, departments and classes only"""
+        self.assertEqual(self.school.total_students, 5)
+        self.assertEqual(self.faculty.total_students, 5)
+        self.assertEqual(self.department.total_students, 5)
+        self.assertEqual(School.with_student_totals().get(pk=self.school.pk).total_students, 5)
+
+        tree = build_org_tree()
+        self.assertEqual(tree['total_students'], 5)
+        [school] = tree['schools']
+        [faculty] = school['faculties']
+        [department] = faculty['departments']
+        self.assertEqual(
+            sorted((c['id'], c['student_count']) for c in department['classes']),
+            [(self.first.id, 3), (self.second.id, 2)]
+        )
+
+    def test_admin_changelists_read_annotated_totals(self):
+        """Test that the school and class changelists count students without a query per row"""
+        self.client.force_login(UserFactory(is_staff=True, is_superuser=True))
+        urls = [reverse('admin:school_school_changelist'), reverse('admin:school_class_changelist')]
+        with CaptureQueriesContext(connection) as queries:
+            responses = [self.client.get(url) for url in urls]
+        self.assertContains(responses[0], '<span style="color: green;">5</span>', html=True)
+        self.assertContains(responses[1], '<span style="color: blue;">4</span>', html=True)
+
+        year = AcademicYear.get_or_create_2025_2026()
+        SchoolFactory()
+        for graduation_year in (2032, 2033):
+            UserFactory(user_type='student', student_class=StudentClassFactory(
+                department=self.department, academic_year=year, graduation_year=graduation_year
+            ))
+        with CaptureQueriesContext(connection) as more_queries:
+            for url in urls:
+                self.client.get(url)
+        self.assertEqual(len(more_queries), len(queries))
+
+    def test_tree_is_one_query_and_cached(self):
+        """Test that the tree is built in one query and then served from cache"""
+        with CaptureQueriesContext(connection) as queries:
+            get_org_tree()
+        self.assertEqual(len([q for q in queries if 'school_school' in q['sql']]), 1)
+        with CaptureQueriesContext(connection) as queries:
+            get_org_tree()
+        self.assertEqual(len(queries), 0)
+
+    def test_invalidated_by_membership_and_hierarchy_changes(self):
+        """Test that joining a class or deactivating a node refreshes the tree"""
+        self.assertEqual(get_org_tree()['total_students'], 5)
+        UserFactory(user_type='student', student_class=self.second)
+        self.assertEqual(get_org_tree()['total_students'], 6)
+        self.second.is_active = False
+        self.second.save()
+        self.assertEqual(get_org_tree()['total_students'], 3)
+
+
+@pytest.mark.django_db
+class TestSchoolViews(APITestCase):
+    """Test cases for school endpoints that report student totals"""
+
+    def setUp(self):
+        self.year = AcademicYear.get_or_create_2025_2026()
+        self.client.force_authenticate(UserFactory())
+
+    def test_school_list_queries_do_not_grow(self):
+        """Test that listing schools does not query per school"""
+        for _ in range(4):
+            StudentClassFactory(academic_year=self.year)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('school-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), 3)
+
+    def test_org_tree_endpoint(self):
+        """Test that the org tree endpoint returns the nested tree"""
+        StudentClassFactory(academic_year=self.year)
+        response = self.client.get(reverse('org-tree'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['schools']), 1)
@@ -19,6 +19,9 @@ urlpatterns = [
     path('classes/<int:pk>/', views.ClassDetailView.as_view(), name='class-detail'),
     path('classes/default/', views.get_default_class, name='default-class'),
     
+    # Organisation tree with student counts
+    path('org-tree/', views.get_org_tree, name='org-tree'),
+    
     # Programs
     path('programs/', views.ProgramListView.as_view(), name='program-list'),
     path('programs/<int:pk>/', views.ProgramDetailView.as_view(), name='program-detail'),
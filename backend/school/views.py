@@ -12,21 +12,21 @@ from .serializers import (
 
 class SchoolListView(generics.ListAPIView):
     """List all schools"""
-    queryset = School.objects.filter(is_active=True)
+    queryset = School.with_student_totals(School.objects.filter(is_active=True))
     serializer_class = SchoolSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
 class SchoolDetailView(generics.RetrieveAPIView):
     """Get school details"""
-    queryset = School.objects.filter(is_active=True)
+    queryset = School.with_student_totals(School.objects.filter(is_active=True))
     serializer_class = SchoolSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
 class FacultyListView(generics.ListAPIView):
     """List faculties"""
-    queryset = Faculty.objects.filter(is_active=True)
+    queryset = Faculty.objects.filter(is_active=True).select_related('school')
     serializer_class = FacultySerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -47,7 +47,7 @@ class FacultyDetailView(generics.RetrieveAPIView):
 
 class DepartmentListView(generics.ListAPIView):
     """List departments"""
-    queryset = Department.objects.filter(is_active=True)
+    queryset = Department.objects.filter(is_active=True).select_related('faculty__school')
     serializer_class = DepartmentSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -73,7 +73,9 @@ class DepartmentDetailView(generics.RetrieveAPIView):
 
 class ClassListView(generics.ListAPIView):
     """List classes"""
-    queryset = Class.objects.filter(is_active=True)
+    queryset = Class.with_student_counts(
+        Class.objects.filter(is_active=True).select_related('department__faculty__school')
+    )
     serializer_class = ClassSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -95,11 +97,21 @@ class ClassListView(generics.ListAPIView):
 
 class ClassDetailView(generics.RetrieveAPIView):
     """Get class details"""
-    queryset = Class.objects.filter(is_active=True)
+    queryset = Class.with_student_counts(
+        Class.objects.filter(is_active=True).select_related('department__faculty__school')
+    )
     serializer_class = ClassSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_org_tree(request):
+    """Get the School -> Faculty -> Department -> Class tree with student counts"""
+    from .org_tree import get_org_tree as load_org_tree
+    return Response(load_org_tree())
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def get_default_class(request):
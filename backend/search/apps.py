@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+    verbose_name = 'Search'
+
+    def ready(self):
+        """Connect reindexing signals for every searchable model"""
+        from .signals import connect_signals
+        connect_signals()
@@ -0,0 +1,372 @@
+"""
+Full-text search over course content, study group materials and users.
+
+Every searchable object is mirrored into one ``SearchDocument`` row whenever
+it is saved or deleted (see ``search.signals``). Two backends query those rows:
+
+* ``PostgresSearchBackend`` ranks with ``SearchRank`` over a weighted
+  ``search_vector`` column (title A, body B) backed by a GIN index, and builds
+  highlights with ``SearchHeadline``.
+* ``InvertedIndexBackend`` is the portable fallback used on SQLite. It keeps
+  ``SearchTerm`` postings (term -> document, weight) and scores candidates
+  with BM25 in Python. Only postings for the query terms are read, so cost
+  follows the number of matches rather than the size of the catalogue.
+
+The last query word is treated as a prefix on both backends so the same call
+serves search-as-you-type. Use ``search()`` from views and AI tools alike.
+"""
+import html
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+
+from .models import SearchDocument, SearchTerm
+from .sources import CONTENT_KINDS, SOURCES, get_source
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 3.0
+MAX_TERM_LENGTH = 64
+SNIPPET_WORDS = 30
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+# Private use characters that ts_headline puts around matches, swapped for <mark> after escaping
+HEADLINE_START = '\ue000'
+HEADLINE_STOP = '\ue001'
+
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from has in is it its of on or that the to was were will with'.split()
+)
+WORD_RE = re.compile(r'\w+')
+
+
+def _fold(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def _stem(word):
+    """Very small plural stripper so 'papers'/'paper' and 'notes'/'note' meet"""
+    if len(word) <= 3 or not word.endswith('s') or word.endswith('ss'):
+        return word
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    # 'es' is a plural ending after a sibilant (boxes, classes, churches); cases, courses just add 's'
+    if word.endswith(('sses', 'xes', 'ches', 'shes')) and len(word) > 4:
+        return word[:-2]
+    return word[:-1]
+
+
+def tokenize(text):
+    """Normalized index terms for a piece of text, in order of appearance"""
+    return [
+        _stem(word)[:MAX_TERM_LENGTH]
+        for word in WORD_RE.findall(_fold(text))
+        if word not in STOP_WORDS
+    ]
+
+
+def parse_query(query):
+    """Split a query into exact terms and a trailing prefix (the word being typed)"""
+    words = [w for w in WORD_RE.findall(_fold(query)) if w not in STOP_WORDS]
+    if not words:
+        return [], None
+    # Stemmed like the index so a fully typed plural still matches its stem
+    prefix = _stem(words[-1])[:MAX_TERM_LENGTH]
+    terms = [_stem(w)[:MAX_TERM_LENGTH] for w in words[:-1]]
+    return list(dict.fromkeys(terms)), prefix
+
+
+def _matcher(terms, prefix):
+    patterns = [re.escape(t) for t in terms]
+    if prefix:
+        patterns.append(re.escape(prefix))
+    return re.compile(r'\b(' + '|'.join(patterns) + r')\w*', re.IGNORECASE) if patterns else None
+
+
+def highlight_document(title, body, terms, prefix):
+    """Highlight the body, or the title when the match is only there"""
+    matcher = _matcher(terms, prefix)
+    if body and matcher and matcher.search(_fold(body)):
+        return highlight(body, terms, prefix)
+    return highlight(title, terms, prefix)
+
+
+def highlight(text, terms, prefix, words=SNIPPET_WORDS):
+    """Escape text and wrap query matches in <mark>, centred on the first match"""
+    matcher = _matcher(terms, prefix)
+    if not text or not matcher:
+        return html.escape((text or '')[:300])
+    tokens = (text or '').split()
+    first = next((i for i, tok in enumerate(tokens) if matcher.search(_fold(tok))), 0)
+    start = max(0, first - words // 3)
+    snippet = html.escape(' '.join(tokens[start:start + words]))
+    snippet = matcher.sub(lambda m: f'{HIGHLIGHT_START}{m.group(0)}{HIGHLIGHT_STOP}', snippet)
+    if start > 0:
+        snippet = '… ' + snippet
+    if start + words < len(tokens):
+        snippet += ' …'
+    return snippet
+
+
+class InvertedIndexBackend:
+    """Portable inverted index stored in SearchTerm"""
+
+    k1 = 1.2
+    b = 0.75
+
+    def index(self, document):
+        weights = Counter()
+        for term in tokenize(document.title):
+            weights[term] += TITLE_WEIGHT
+        for term in tokenize(document.body):
+            weights[term] += 1
+        SearchTerm.objects.filter(document=document).delete()
+        SearchTerm.objects.bulk_create(
+            [SearchTerm(document=document, term=term, weight=weight) for term, weight in weights.items()]
+        )
+
+    def _postings(self, documents, terms, prefix):
+        """Posting rows (document_id, term, weight) for the query, restricted to matching documents"""
+        postings = SearchTerm.objects.filter(document__in=documents)
+        conditions = []
+        if terms:
+            conditions.append(postings.filter(term__in=terms))
+        if prefix:
+            # Range scan rather than LIKE so the (term, document) index is usable everywhere
+            conditions.append(postings.filter(term__gte=prefix, term__lt=prefix + '\uffff'))
+        rows = conditions[0]
+        for extra in conditions[1:]:
+            rows = rows | extra
+        return rows.values_list('document_id', 'term', 'weight')
+
+    def search(self, documents, query, limit):
+        terms, prefix = parse_query(query)
+        if not terms and not prefix:
+            return []
+
+        # Every query word must match; a posting can satisfy both an exact term and the prefix
+        matched = defaultdict(dict)  # document_id -> {query key: weight}
+        doc_freq = Counter()
+        for document_id, term, weight in self._postings(documents, terms, prefix):
+            keys = [('term', term)] if term in terms else []
+            if prefix and term.startswith(prefix):
+                keys.append(('prefix', prefix))
+            for key in keys:
+                previous = matched[document_id].get(key)
+                matched[document_id][key] = max(previous or 0, weight)
+                if previous is None:
+                    doc_freq[key] += 1
+
+        wanted = {('term', t) for t in terms} | ({('prefix', prefix)} if prefix else set())
+        candidates = {d: w for d, w in matched.items() if set(w) == wanted}
+        if not candidates:
+            return []
+
+        total = documents.count()
+        lengths = dict(
+            SearchDocument.objects.filter(id__in=candidates).values_list('id', 'body')
+        )
+        average = sum(len(b) for b in lengths.values()) / len(lengths) or 1
+        scores = {}
+        for document_id, weights in candidates.items():
+            norm = self.k1 * (1 - self.b + self.b * len(lengths[document_id]) / average)
+            score = 0.0
+            for key, tf in weights.items():
+                idf = math.log(1 + (total - doc_freq[key] + 0.5) / (doc_freq[key] + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + norm)
+            scores[document_id] = score
+
+        ranked = sorted(scores, key=lambda d: (-scores[d], d))[:limit]
+        by_id = SearchDocument.objects.in_bulk(ranked)
+        results = []
+        for document_id in ranked:
+            document = by_id[document_id]
+            document.rank = scores[document_id]
+            document.headline = highlight_document(document.title, document.body, terms, prefix)
+            results.append(document)
+        return results
+
+
+class PostgresSearchBackend:
+    """SearchVector/SearchRank over the GIN-indexed search_vector column"""
+
+    config = 'english'
+
+    def index(self, document):
+        from django.contrib.postgres.search import SearchVector
+        SearchDocument.objects.filter(pk=document.pk).update(
+            search_vector=(
+                SearchVector('title', weight='A', config=self.config)
+                + SearchVector('body', weight='B', config=self.config)
+            )
+        )
+
+    def _ts_query(self, query):
+        from django.contrib.postgres.search import SearchQuery
+        words = WORD_RE.findall(_fold(query))
+        if not words:
+            return None
+        # Raw tsquery: every word required, last one as a prefix
+        parts = [f"'{w}'" for w in words[:-1]] + [f"'{words[-1]}':*"]
+        return SearchQuery(' & '.join(parts), search_type='raw', config=self.config)
+
+    def search(self, documents, query, limit):
+        from django.contrib.postgres.search import SearchHeadline, SearchRank
+        from django.db.models import F
+        ts_query = self._ts_query(query)
+        if ts_query is None:
+            return []
+        ranked = documents.filter(search_vector=ts_query).annotate(
+            rank=SearchRank(F('search_vector'), ts_query),
+        ).order_by('-rank', 'id')[:limit]
+        results = list(ranked.annotate(
+            headline=SearchHeadline(
+                'body', ts_query, config=self.config,
+                start_sel=HEADLINE_START, stop_sel=HEADLINE_STOP, max_words=SNIPPET_WORDS,
+            ),
+        ))
+        for document in results:
+            document.headline = self.escape_headline(document.headline, document.title, query)
+        return results
+
+    @staticmethod
+    def escape_headline(headline, title, query):
+        """HTML-escape a ts_headline snippet, or highlight the title when the body did not match"""
+        if not headline or HEADLINE_START not in headline:
+            return highlight(title, *parse_query(query))
+        return (
+            html.escape(headline)
+            .replace(HEADLINE_START, HIGHLIGHT_START)
+            .replace(HEADLINE_STOP, HIGHLIGHT_STOP)
+        )
+
+
+_backend = None
+
+
+def get_backend():
+    """PostgreSQL full-text search when available, the inverted index otherwise"""
+    global _backend
+    if _backend is None:
+        _backend = PostgresSearchBackend() if connection.vendor == 'postgresql' else InvertedIndexBackend()
+    return _backend
+
+
+def index_object(obj, source=None):
+    """Create or refresh the search document for one object"""
+    source = source or get_source(type(obj))
+    if source is None:
+        return None
+    content_type = ContentType.objects.get_for_model(obj, for_concrete_model=False)
+    with transaction.atomic():
+        document, _ = SearchDocument.objects.update_or_create(
+            content_type=content_type,
+            object_id=obj.pk,
+            defaults=source.document_fields(obj),
+        )
+        get_backend().index(document)
+    return document
+
+
+def remove_object(obj):
+    """Drop an object's search document; postings go with it"""
+    content_type = ContentType.objects.get_for_model(obj, for_concrete_model=False)
+    SearchDocument.objects.filter(content_type=content_type, object_id=obj.pk).delete()
+
+
+def rebuild(kinds=None, stdout=None, missing_only=False):
+    """
+    Reindex every object of the given kinds (all kinds by default).
+
+    With `missing_only`, only objects that have no search document yet are
+    indexed: cheap enough to run on every deploy, so rows that existed before
+    the index (or were written with signals bypassed) become searchable.
+    """
+    count = 0
+    for source in SOURCES:
+        if kinds and source.kind not in kinds:
+            continue
+        queryset = source.get_queryset()
+        if missing_only:
+            content_type = ContentType.objects.get_for_model(source.model, for_concrete_model=False)
+            queryset = queryset.exclude(pk__in=SearchDocument.objects.filter(
+                content_type=content_type).values('object_id'))
+        for obj in queryset.iterator():
+            index_object(obj, source)
+            count += 1
+        if stdout:
+            stdout.write(f'Indexed {source.kind}')
+    return count
+
+
+def search(query, kinds=None, course_ids=None, group_ids=None, include_ungrouped=True,
+           published_only=True, material_type=None, object_ids=None, limit=20):
+    """
+    Ranked search across indexed content.
+
+    Args:
+        query: Free text; the last word matches as a prefix
+        kinds: Source kinds to include (defaults to all content kinds, i.e. not users)
+        course_ids: Restrict to documents of these courses
+        group_ids: Study groups whose private materials may be returned (None: no restriction)
+        include_ungrouped: With group_ids, also return documents that belong to no group
+        published_only: Skip unpublished content
+        material_type: Restrict to one material type
+        object_ids: Restrict to these source object ids, a list or a ``values('pk')`` queryset
+        limit: Maximum number of results
+
+    Returns:
+        List of dicts with kind, id, title, course_id, group_id, material_type,
+        url, score and an HTML-escaped ``highlight`` with <mark> around matches
+    """
+    from django.db.models import Q
+
+    documents = SearchDocument.objects.filter(kind__in=kinds or CONTENT_KINDS)
+    if course_ids is not None:
+        documents = documents.filter(course_id__in=course_ids)
+    if group_ids is not None:
+        group_filter = Q(group_id__in=group_ids)
+        if include_ungrouped:
+            group_filter |= Q(group__isnull=True)
+        documents = documents.filter(group_filter)
+    if published_only:
+        documents = documents.filter(is_published=True)
+    if material_type:
+        documents = documents.filter(material_type=material_type)
+    if object_ids is not None:
+        documents = documents.filter(object_id__in=object_ids)
+
+    return [
+        {
+            'kind': d.kind,
+            'id': d.object_id,
+            'title': d.title,
+            'description': d.body[:300],
+            'course_id': d.course_id,
+            'group_id': d.group_id,
+            'material_type': d.material_type,
+            'url': d.url,
+            'score': round(float(d.rank), 4),
+            'highlight': d.headline,
+        }
+        for d in get_backend().search(documents, query, limit)
+    ]
+
+
+def rank_queryset(queryset, query, kind, limit=500):
+    """Restrict a queryset of one source kind to search matches, best match first"""
+    from django.db.models import Case, IntegerField, When
+    # Rank only the queryset's own rows, so its filters apply before the limit does
+    matches = search(query, kinds=[kind], published_only=False,
+                     object_ids=queryset.order_by().values('pk'), limit=limit)
+    ids = [m['id'] for m in matches]
+    if not ids:
+        return queryset.none()
+    order = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)], output_field=IntegerField())
+    return queryset.filter(pk__in=ids).order_by(order)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from search.engine import rebuild
+from search.sources import SOURCES
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            action='append',
+            choices=[s.kind for s in SOURCES],
+            help='Only reindex this kind (may be repeated)',
+        )
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Only index objects that are not in the index yet (run on deploy)',
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild(kinds=options.get('kind'), stdout=self.stdout, missing_only=options['missing'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} objects'))
@@ -0,0 +1,42 @@
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """One searchable row per indexed object, denormalized for ranking and display"""
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    kind = models.CharField(max_length=30, help_text="Source kind, e.g. material or past_paper")
+    course = models.ForeignKey('course_api.Course', on_delete=models.CASCADE, null=True, blank=True, related_name='search_documents')
+    group = models.ForeignKey('course_api.StudyGroup', on_delete=models.CASCADE, null=True, blank=True, related_name='search_documents')
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True, help_text="Description, topic and other indexed text")
+    material_type = models.CharField(max_length=30, blank=True)
+    url = models.CharField(max_length=500, blank=True)
+    is_published = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained on PostgreSQL only; the GIN index is created by migration there
+    search_vector = SearchVectorField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['content_type', 'object_id']
+        indexes = [
+            models.Index(fields=['kind', 'course']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.title}"
+
+
+class SearchTerm(models.Model):
+    """Posting in the portable inverted index used when PostgreSQL full-text search is unavailable"""
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=64)
+    weight = models.FloatField(help_text="Term frequency, with title occurrences weighted higher")
+
+    class Meta:
+        unique_together = ['term', 'document']
+
+    def __str__(self):
+        return f"{self.term} -> {self.document_id}"
@@ -0,0 +1,37 @@
+"""Keep the search index current as indexed objects are saved and deleted"""
+import logging
+from django.db.models.signals import post_delete, post_save
+from .sources import SOURCES
+
+logger = logging.getLogger(__name__)
+
+
+def connect_signals():
+    for source in SOURCES:
+        post_save.connect(reindex_on_save, sender=source.model, dispatch_uid=f'search_index_{source.kind}')
+        post_delete.connect(unindex_on_delete, sender=source.model, dispatch_uid=f'search_unindex_{source.kind}')
+
+
+def reindex_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Refresh the object's search document unless none of its indexed fields changed"""
+    from .engine import index_object
+    from .sources import get_source
+    if raw:
+        return
+    source = get_source(sender)
+    if update_fields is not None and not source.indexed_fields.intersection(update_fields):
+        return
+    try:
+        index_object(instance, source)
+    except Exception:
+        # Search must never break the write that triggered it; rebuild_search_index repairs drift
+        logger.exception("Failed to index %s %s", source.kind, instance.pk)
+
+
+def unindex_on_delete(sender, instance, **kwargs):
+    """Remove the object's search document"""
+    from .engine import remove_object
+    try:
+        remove_object(instance)
+    except Exception:
+        logger.exception("Failed to remove %s %s from the search index", sender.__name__, instance.pk)
@@ -0,0 +1,146 @@
+"""
+Registry of the models that feed the search index.
+
+Each ``SearchSource`` knows how to turn one model instance into the fields of
+a ``SearchDocument``. Sources are declared by dotted model label so this module
+can be imported before the app registry is ready.
+"""
+from django.apps import apps
+
+
+class SearchSource:
+    """Maps a model onto SearchDocument fields"""
+
+    def __init__(self, model_label, kind, body_fields=('description',), published_field='is_published'):
+        self.model_label = model_label
+        self.kind = kind
+        self.body_fields = body_fields
+        self.published_field = published_field
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def indexed_fields(self):
+        """Model fields whose change requires reindexing"""
+        fields = {'title', 'file_url', 'file_path', 'material_type', 'course', 'course_id', *self.body_fields}
+        if self.published_field:
+            fields.add(self.published_field)
+        return fields
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    def title(self, obj):
+        return obj.title
+
+    def body(self, obj):
+        return '\n'.join(str(getattr(obj, f, '') or '') for f in self.body_fields)
+
+    def course_id(self, obj):
+        return getattr(obj, 'course_id', None)
+
+    def group_id(self, obj):
+        return None
+
+    def url(self, obj):
+        return getattr(obj, 'file_url', '') or getattr(obj, 'file_path', '') or ''
+
+    def is_published(self, obj):
+        return bool(getattr(obj, self.published_field)) if self.published_field else True
+
+    def document_fields(self, obj):
+        return {
+            'kind': self.kind,
+            'title': (self.title(obj) or '')[:255],
+            'body': self.body(obj),
+            'course_id': self.course_id(obj),
+            'group_id': self.group_id(obj),
+            'material_type': getattr(obj, 'material_type', '') or '',
+            'url': (self.url(obj) or '')[:500],
+            'is_published': self.is_published(obj),
+        }
+
+
+class DocumentSource(SearchSource):
+    """Uploaded documents, searchable by the text the preview pipeline extracted from the file too"""
+
+    def body(self, obj):
+        from course_content.previews import document_text
+        return '\n'.join(filter(None, [super().body(obj), document_text(obj)]))
+
+
+class GroupMaterialSource(SearchSource):
+    """Study group uploads are searchable by the group's members, under the group's course"""
+
+    @property
+    def indexed_fields(self):
+        return {'title', 'description', 'file', 'file_url', 'material_type', 'group', 'group_id'}
+
+    def get_queryset(self):
+        return self.model.objects.select_related('group')
+
+    def course_id(self, obj):
+        return obj.group.course_id
+
+    def group_id(self, obj):
+        return obj.group_id
+
+    def url(self, obj):
+        return obj.file_url or (obj.file.url if obj.file else '')
+
+
+class UserSource(SearchSource):
+    """People directory; kept out of content searches unless asked for explicitly"""
+
+    @property
+    def indexed_fields(self):
+        return {'first_name', 'last_name', 'email', 'registration_number', 'status', 'is_active'}
+
+    def title(self, obj):
+        return obj.get_full_name() or obj.email
+
+    def body(self, obj):
+        return '\n'.join(filter(None, [obj.email, obj.registration_number]))
+
+    def course_id(self, obj):
+        return None
+
+    def url(self, obj):
+        return ''
+
+    def is_published(self, obj):
+        return obj.is_active
+
+
+SOURCES = [
+    DocumentSource('course_content.Material', 'material', body_fields=('description', 'topic')),
+    DocumentSource('course_content.PastPaper', 'past_paper', body_fields=('description', 'exam_type')),
+    DocumentSource('course_content.CourseOutline', 'course_outline'),
+    SearchSource('course_content.Assignment', 'assignment', body_fields=('description', 'topic', 'instructions')),
+    SearchSource('course_content.Announcement', 'announcement'),
+    SearchSource('course_api.CourseContent', 'course_content', body_fields=('description', 'topic')),
+    SearchSource('course_api.CourseMaterial', 'course_material', body_fields=('description', 'topic'), published_field=None),
+    GroupMaterialSource('course_api.GroupMaterial', 'group_material', published_field=None),
+    UserSource('directory.User', 'user', published_field=None),
+]
+
+# Everything except people, i.e. what the UI and AI tools search by default
+CONTENT_KINDS = [s.kind for s in SOURCES if s.kind != 'user']
+
+
+def get_source(model):
+    """Return the source registered for a model class, or None"""
+    label = model._meta.label
+    for source in SOURCES:
+        if source.model_label == label:
+            return source
+    return None
+
+
+def get_source_for_kind(kind):
+    for source in SOURCES:
+        if source.kind == kind:
+            return source
+    return None
@@ -0,0 +1,196 @@
+import io
+import pytest
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from course_api.models import GroupMaterial, StudyGroupMembership
+from course_api.tests.test_models import CourseFactory
+from course_api.tests.test_study_groups import StudyGroupFactory
+from course_content.models import Material, PastPaper
+from directory.models import AcademicYear
+from directory.tests.test_models import UserFactory, SemesterFactory, StudentClassFactory
+from search.engine import (
+    HEADLINE_START, HEADLINE_STOP, PostgresSearchBackend, highlight, parse_query, rank_queryset, search, tokenize,
+)
+from search.models import SearchDocument
+
+
+class TestTokenizer(TestCase):
+    """Test cases for index term normalization"""
+
+    def test_tokenize_folds_case_accents_and_plurals(self):
+        """Test that terms are lower-cased, accent-folded and lightly stemmed"""
+        self.assertEqual(tokenize('The Contracts of Société'), ['contract', 'societe'])
+
+    def test_singular_and_plural_share_a_term(self):
+        """Test that plurals of words ending in 'e' keep the 'e', and sibilant plurals lose 'es'"""
+        for singular, plural in (('note', 'notes'), ('lecture', 'lectures'), ('case', 'cases'),
+                                 ('class', 'classes'), ('box', 'boxes'), ('study', 'studies')):
+            self.assertEqual(tokenize(plural), tokenize(singular))
+
+    def test_last_query_word_is_a_prefix(self):
+        """Test that the word being typed becomes the prefix"""
+        self.assertEqual(parse_query('law of contr'), (['law'], 'contr'))
+
+    def test_highlight_escapes_and_marks(self):
+        """Test that highlights are HTML-safe with matches wrapped in <mark>"""
+        self.assertEqual(
+            highlight('Offer <b>and</b> acceptance', ['offer'], 'accept'),
+            '<mark>Offer</mark> &lt;b&gt;and&lt;/b&gt; <mark>acceptance</mark>'
+        )
+
+    def test_postgres_headlines_are_escaped(self):
+        """Test that ts_headline output is escaped and title-only matches mark the title"""
+        escape = PostgresSearchBackend.escape_headline
+        headline = f'<script>x</script> {HEADLINE_START}Offer{HEADLINE_STOP} &'
+        self.assertEqual(escape(headline, 'Title', 'offer'),
+                         '&lt;script&gt;x&lt;/script&gt; <mark>Offer</mark> &amp;')
+        self.assertEqual(escape('Unrelated body', 'Offer <i>', 'offer'), '<mark>Offer</mark> &lt;i&gt;')
+        self.assertEqual(escape('', 'Offer', 'offer'), '<mark>Offer</mark>')
+
+
+@pytest.mark.django_db
+class TestSearchIndex(TestCase):
+    """Test cases for incremental indexing and ranked search"""
+
+    def setUp(self):
+        self.year = AcademicYear.get_or_create_2025_2026()
+        self.user = UserFactory()
+        self.course = CourseFactory(academic_year=self.year)
+        self.semester = SemesterFactory(academic_year=self.year)
+
+    def _material(self, title, description='', **kwargs):
+        return Material.objects.create(
+            course=self.course, academic_year=self.year, semester=self.semester,
+            title=title, description=description, material_type='pdf', uploaded_by=self.user, **kwargs
+        )
+
+    def test_save_indexes_and_delete_removes(self):
+        """Test that documents follow their source rows"""
+        material = self._material('Law of Contract', 'Offer and acceptance')
+        self.assertEqual([r['id'] for r in search('acceptance')], [material.id])
+
+        material.title = 'Law of Torts'
+        material.description = 'Negligence'
+        material.save()
+        self.assertEqual(search('acceptance'), [])
+        self.assertEqual([r['title'] for r in search('neglig')], ['Law of Torts'])
+
+        material.delete()
+        self.assertFalse(SearchDocument.objects.filter(kind='material').exists())
+
+    def test_results_are_ranked_with_title_matches_first(self):
+        """Test that title hits outrank body hits and every word must match"""
+        body_hit = self._material('Week 3 reading', 'Notes on contract formation')
+        title_hit = self._material('Contract formation', 'Week 2')
+        self._material('Contract remedies', 'Damages')
+        results = search('contract formation')
+        self.assertEqual([r['id'] for r in results], [title_hit.id, body_hit.id])
+        self.assertIn('<mark>', results[0]['highlight'])
+
+    def test_singular_query_finds_plural_text(self):
+        """Test that searching 'note' or 'lecture' finds documents that only use the plural"""
+        material = self._material('Lectures', 'Case notes')
+        for query in ('note', 'lecture', 'case notes', 'lectures'):
+            self.assertEqual([r['id'] for r in search(query)], [material.id], query)
+
+    def test_filters_kinds_courses_and_unpublished(self):
+        """Test that kind, course and publication filters apply"""
+        self._material('Evidence notes')
+        self._material('Evidence draft', is_published=False)
+        paper = PastPaper.objects.create(
+            course=self.course, academic_year=self.year, semester=self.semester,
+            title='Evidence final exam', uploaded_by=self.user
+        )
+        other_course = CourseFactory(academic_year=self.year)
+        self.assertEqual(len(search('evidence')), 2)
+        self.assertEqual([r['id'] for r in search('evidence', kinds=['past_paper'])], [paper.id])
+        self.assertEqual(search('evidence', course_ids=[other_course.id]), [])
+
+    def test_missing_rows_are_indexed_on_deploy(self):
+        """Test that rows written before the index existed become searchable with --missing"""
+        existing = self._material('Equity and trusts')
+        indexed = self._material('Equity notes')
+        SearchDocument.objects.filter(object_id=existing.id).delete()
+        self.assertEqual(list(rank_queryset(Material.objects.all(), 'equity', 'material')), [indexed])
+
+        out = io.StringIO()
+        call_command('rebuild_search_index', '--missing', '--kind', 'material', stdout=out)
+        self.assertIn('Indexed 1 objects', out.getvalue())
+        self.assertEqual({m.id for m in rank_queryset(Material.objects.all(), 'equity', 'material')},
+                         {existing.id, indexed.id})
+
+    def test_rank_queryset_filters_before_the_limit(self):
+        """Test that matches in other courses cannot push the caller's rows past the limit"""
+        mine = self._material('Week 4 reading', 'Hearsay and other evidence rules')
+        other_course = CourseFactory(academic_year=self.year)
+        for i in range(3):
+            Material.objects.create(
+                course=other_course, academic_year=self.year, semester=self.semester, uploaded_by=self.user,
+                title=f'Evidence {i}', description='Evidence evidence', material_type='pdf',
+            )
+        queryset = Material.objects.filter(course=self.course)
+        self.assertEqual(list(rank_queryset(queryset, 'evidence', 'material', limit=2)), [mine])
+
+    def test_group_materials_need_membership(self):
+        """Test that study group uploads only show up for listed groups"""
+        student_class = StudentClassFactory(academic_year=self.year)
+        group = StudyGroupFactory(created_by=self.user, student_class=student_class, course=self.course)
+        GroupMaterial.objects.create(group=group, title='Moot court bundle', uploaded_by=self.user)
+        self.assertEqual(search('moot', group_ids=[]), [])
+        self.assertEqual(len(search('moot', group_ids=[group.id])), 1)
+
+
+@pytest.mark.django_db
+class TestSearchAPI(TestCase):
+    """Test cases for the search endpoint and the views that use the index"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.year = AcademicYear.get_or_create_2025_2026()
+        self.user = UserFactory()
+        self.client.force_authenticate(self.user)
+        self.course = CourseFactory(academic_year=self.year)
+        self.semester = SemesterFactory(academic_year=self.year)
+        self.material = Material.objects.create(
+            course=self.course, academic_year=self.year, semester=self.semester,
+            title='Constitutional law', description='Separation of powers', material_type='pdf',
+            uploaded_by=self.user
+        )
+
+    def test_search_endpoint(self):
+        """Test that the endpoint returns ranked, highlighted results"""
+        response = self.client.get(reverse('search_content'), {'q': 'separation pow'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['kind'], 'material')
+        self.assertIn('<mark>', response.data['results'][0]['highlight'])
+
+    def test_search_endpoint_validates_input(self):
+        """Test that a query is required and users cannot be searched here"""
+        self.assertEqual(self.client.get(reverse('search_content')).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('search_content'), {'q': 'x', 'kind': 'user'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_material_list_search(self):
+        """Test that the materials list accepts ?q="""
+        url = reverse('course_content:material_list')
+        response = self.client.get(url, {'q': 'constitution'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([m['id'] for m in results], [self.material.id])
+        response = self.client.get(url, {'q': 'criminal'})
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual(results, [])
+
+    def test_chat_material_autocomplete(self):
+        """Test that the chat [[ autocomplete searches the group's course materials"""
+        student_class = StudentClassFactory(academic_year=self.year)
+        group = StudyGroupFactory(created_by=self.user, student_class=student_class, course=self.course)
+        StudyGroupMembership.objects.create(group=group, user=self.user)
+        url = reverse('chat_autocomplete', args=[group.id])
+        response = self.client.get(url, {'type': 'materials', 'q': 'separation'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([m['id'] for m in response.data], [f'course_{self.material.id}'])
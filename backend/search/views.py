@@ -0,0 +1,42 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from course_api.models import StudyGroupMembership
+from .engine import search
+from .sources import CONTENT_KINDS
+
+MAX_LIMIT = 50
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_content(request):
+    """
+    Ranked full-text search over course content and study group materials.
+    - ?q=<query>: Search text; the last word matches as a prefix
+    - ?kind=<kind>: Restrict to a content kind (repeatable)
+    - ?course_id=<id>: Restrict to a course
+    - ?limit=<n>: Maximum results (default 20, max 50)
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'Search query is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    kinds = request.query_params.getlist('kind') or CONTENT_KINDS
+    unknown = [k for k in kinds if k not in CONTENT_KINDS]
+    if unknown:
+        return Response({'error': f'Unknown kind: {", ".join(unknown)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        course_id = request.query_params.get('course_id')
+        course_ids = [int(course_id)] if course_id else None
+        limit = min(int(request.query_params.get('limit', 20)), MAX_LIMIT)
+    except ValueError:
+        return Response({'error': 'course_id and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Group materials are only visible to members of the group
+    group_ids = list(StudyGroupMembership.objects.filter(user=request.user).values_list('group_id', flat=True))
+    results = search(query, kinds=kinds, course_ids=course_ids, group_ids=group_ids,
+                     published_only=not request.user.is_admin, limit=max(limit, 1))
+    return Response({'query': query, 'count': len(results), 'results': results})
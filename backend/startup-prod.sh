@@ -46,6 +46,21 @@ else
     ls -la static/ || echo "Static directory does not exist"
 fi
 
+# Index rows the search index has not seen yet (e.g. everything that predates it)
+echo "🔎 Indexing new content for search..."
+python manage.py rebuild_search_index --missing || echo "Search indexing failed"
+
+# Start background job worker (announcement emails and other deferred work)
+echo "📬 Starting background job worker..."
+python manage.py run_jobs --exclude-kind generate_preview &
+echo "✉️  Starting email outbox worker..."
+python manage.py drain_email_outbox &
+# Document previews are CPU-bound and slow, so they get a pool of their own workers, one job at a time
+echo "🖼️  Starting ${PREVIEW_WORKERS:-2} preview worker(s)..."
+for _ in $(seq "${PREVIEW_WORKERS:-2}"); do
+    python manage.py run_jobs --kind generate_preview --batch-size 1 &
+done
+
 # Start gunicorn in background
 echo "🚀 Starting Gunicorn server..."
 gunicorn course_organizer.wsgi:application --config gunicorn.conf.py &
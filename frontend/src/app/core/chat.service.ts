@@ -149,6 +149,25 @@ export class ChatService {
               this.presence$.next(data);
               return;
             }
+            if (data.type === 'typing_batch') {
+              // Server-coalesced typing deltas; re-emit as per-user events, skipping myself
+              const myId = this.myUserId || this.getCurrentUserIdFromStorage();
+              for (const user of data.typing || []) {
+                if (Number(user.id) !== myId) {
+                  this.typing$.next({ type: 'typing', user, is_typing: true });
+                }
+              }
+              for (const id of data.stopped || []) {
+                this.typing$.next({ type: 'typing', user: { id: Number(id), name: '' }, is_typing: false });
+              }
+              return;
+            }
+            if (data.type === 'membership_revoked') {
+              // Removed from the group: the server closes the socket, do not reconnect
+              console.log('Chat: Membership revoked for group', data.group_id);
+              this.currentGroupId = null;
+              return;
+            }
             if (data.type === 'typing') {
               // Do not show typing banner for myself
               // Use the improved user ID detection method
@@ -15,6 +15,7 @@ export interface StudyGroup {
   updated_at: string;
   members_count: number;
   pending_requests: number;
+  my_role: 'member' | 'admin' | null;
 }
 
 export interface StudyGroupMembership {
@@ -96,10 +97,11 @@ export class GroupworkService {
   }
 
   // Messages persistence
-  listMessages(groupId: number, limit = 50) {
-    return this.http.get<Array<{ id: number; group: number; sender: number; sender_name: string; sender_profile_picture?: string | null; body: string; created_at: string; reply_to?: { id: number; sender_name: string; sender_profile_picture?: string | null; body: string; created_at: string } }>>(
-      `${this.baseUrl}/study-groups/${groupId}/messages/?limit=${limit}`
-    );
+  listMessages(groupId: number, limit = 50, before?: string) {
+    const cursor = before ? `&before=${encodeURIComponent(before)}` : '';
+    return this.http.get<any>(
+      `${this.baseUrl}/study-groups/${groupId}/messages/?limit=${limit}${cursor}`
+    ).pipe(this.unwrap<Array<{ id: number; group: number; sender: number; sender_name: string; sender_profile_picture?: string | null; body: string; created_at: string; reply_to?: { id: number; sender_name: string; sender_profile_picture?: string | null; body: string; created_at: string } }>>());
   }
 
   createMessage(groupId: number, body: string) {
@@ -907,7 +907,7 @@ export class StudyGroupDetailComponent implements OnInit, OnDestroy {
   onlineUserIds = new Set<number>();
   typingUsers = new Map<number, string>();
   private typingNotifyTimeout: any = null;
-  private typingClearTimeout: any = null;
+  private typingClearTimeouts = new Map<number, any>();
   private subscriptions: Subscription[] = [];
   currentGroupId: number | null = null;
   
@@ -1128,14 +1128,17 @@ export class StudyGroupDetailComponent implements OnInit, OnDestroy {
       if (evt.is_typing) {
         this.typingUsers.set(evt.user.id, evt.user.name);
         console.log('➕ Added typing user:', evt.user.name, 'Total typing:', this.typingUsers.size);
-        // Clear typing after 4s if no further events
-        if (this.typingClearTimeout) clearTimeout(this.typingClearTimeout);
-        this.typingClearTimeout = setTimeout(() => {
+        // Clear typing after 4s if no further events (the server refreshes active typers every 3s)
+        clearTimeout(this.typingClearTimeouts.get(evt.user.id));
+        this.typingClearTimeouts.set(evt.user.id, setTimeout(() => {
           this.typingUsers.delete(evt.user.id);
+          this.typingClearTimeouts.delete(evt.user.id);
           console.log('⏰ Cleared typing for:', evt.user.name, 'Remaining:', this.typingUsers.size);
           this.cdr.detectChanges();
-        }, 4000);
+        }, 4000));
       } else {
+        clearTimeout(this.typingClearTimeouts.get(evt.user.id));
+        this.typingClearTimeouts.delete(evt.user.id);
         this.typingUsers.delete(evt.user.id);
         console.log('➖ Removed typing user:', evt.user.name, 'Remaining:', this.typingUsers.size);
       }
@@ -1174,7 +1177,8 @@ export class StudyGroupDetailComponent implements OnInit, OnDestroy {
     
     // Clear timeouts
     if (this.typingNotifyTimeout) clearTimeout(this.typingNotifyTimeout);
-    if (this.typingClearTimeout) clearTimeout(this.typingClearTimeout);
+    this.typingClearTimeouts.forEach(timeout => clearTimeout(timeout));
+    this.typingClearTimeouts.clear();
     
     // Disconnect chat
     this.chat.disconnect();